@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Captive
+from .models import Captive, DuplicateCluster
 
 
 @admin.register(Captive)
@@ -14,3 +14,17 @@ class CaptiveAdmin(admin.ModelAdmin):
             if obj.picture
             else "No image"
         )
+
+
+@admin.register(DuplicateCluster)
+class DuplicateClusterAdmin(admin.ModelAdmin):
+    list_display = ("id", "score", "status", "member_names", "created_at")
+    list_editable = ("status",)
+    list_filter = ("status",)
+    filter_horizontal = ("members",)
+
+    def member_names(self, obj):
+        return ", ".join(f"{c.name} ({c.pk})" for c in obj.members.all())
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("members")
@@ -0,0 +1,32 @@
+import asyncio
+import hashlib
+import numpy as np
+from django.conf import settings
+
+STUB_DIMENSIONS = {"text": 1536, "face": 128}
+
+
+def stub_vector(seed_bytes: bytes, dim: int) -> list[float]:
+    seed = int.from_bytes(hashlib.sha256(seed_bytes).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32).tolist()
+
+
+async def create_embeddings(texts: list[str]) -> list[list]:
+    if settings.AI_STUB_LATENCY:
+        await asyncio.sleep(settings.AI_STUB_LATENCY)
+    return [stub_vector(text.encode(), STUB_DIMENSIONS["text"]) for text in texts]
+
+
+async def detect_faces_batch(images: list[bytes]) -> list[list[dict]]:
+    if settings.AI_STUB_LATENCY:
+        await asyncio.sleep(settings.AI_STUB_LATENCY)
+    return [
+        [
+            {
+                "embedding": stub_vector(image, STUB_DIMENSIONS["face"]),
+                "box": None,
+                "confidence": 1.0,
+            }
+        ]
+        for image in images
+    ]
@@ -1,42 +1,134 @@
-from openai import AsyncOpenAI
 from django.conf import settings
 import numpy as np
-from .models import Captive
+from .models import Captive, CaptiveFace
 from .serializers import CaptiveSerializer
+from .search import full_text_search
+from .embeddings import FACE_DIMENSION, MODEL_DIMENSIONS, parse_embedding
+from .vector_index import (
+    FACE_ORDER,
+    aggregate_faces,
+    normalize_rows,
+    top_k,
+    vector_indexes,
+)
+from .metrics import record_scan, stage
+from . import ai_stubs, providers
 from asgiref.sync import sync_to_async
+import heapq
 import io
-import tempfile
-from deepface import DeepFace
+import json
 from PIL import Image
+from django.db import transaction
 from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
 
-openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
 BATCH_SIZE = 1000
-MODEL_DIMENSIONS = {
-    "picture_embedded": 128,
-    "appearance_embedded": 1536,
+HYBRID_CANDIDATES = 200
+HYBRID_WEIGHTS = {"appearance": 1.0, "photo": 1.0, "text": 1.0}
+FACE_AGGREGATES = ("max", "mean")
+METADATA_FILTER_FIELDS = ("person_type", "region", "settlement", "brigade")
+METADATA_RANGE_FIELDS = {
+    "date_of_birth": parse_date,
+    "last_update": lambda value: parse_datetime(value) or parse_date(value),
 }
 
 
-async def create_embedding(text: str) -> list:
-    response = await openai_client.embeddings.create(
-        input=[text],
-        model="text-embedding-3-small",
-    )
-    return response.data[0].embedding
+async def create_embedding(text: str, hedge: bool = False) -> list:
+    embeddings = await create_embeddings([text], hedge)
+    return embeddings[0]
+
+
+async def create_embeddings(texts: list[str], hedge: bool = False) -> list[list]:
+    # hedge=True for searches a user is waiting on: a slow request is raced
+    # against a duplicate after OPENAI_HEDGE_AFTER seconds, and retries give
+    # up after OPENAI_SEARCH_RETRY_BUDGET seconds.
+    if settings.AI_BACKEND == "stub":
+        return await ai_stubs.create_embeddings(texts)
+    with stage("openai_embedding"):
+        if hedge:
+            response = await providers.openai_client().embeddings(
+                texts,
+                hedge_after=settings.OPENAI_HEDGE_AFTER,
+                retry_budget=settings.OPENAI_SEARCH_RETRY_BUDGET,
+            )
+        else:
+            response = await providers.openai_client().embeddings(texts)
+    return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
 
 
 async def create_photo_embedding(image_bytes: bytes) -> list[float]:
-    with Image.open(io.BytesIO(image_bytes)) as img:
-        with tempfile.NamedTemporaryFile(suffix=".jpg") as tmp:
-            img.save(tmp.name)
-            result = DeepFace.represent(
-                img_path=tmp.name,
-                model_name="SFace",
-                enforce_detection=False,
-                detector_backend="opencv",
+    faces = await detect_faces(image_bytes)
+    return faces[0]["embedding"] if faces else []
+
+
+async def create_photo_embeddings(images: list[bytes]) -> list[list[float]]:
+    return [
+        faces[0]["embedding"] if faces else []
+        for faces in await detect_faces_batch(images)
+    ]
+
+
+async def detect_faces(image_bytes: bytes) -> list[dict]:
+    faces = await detect_faces_batch([image_bytes])
+    return faces[0]
+
+
+async def detect_faces_batch(images: list[bytes]) -> list[list[dict]]:
+    if settings.AI_BACKEND == "stub":
+        return await ai_stubs.detect_faces_batch(images)
+    arrays = []
+    for image_bytes in images:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            # DeepFace expects BGR arrays, as read by OpenCV.
+            arrays.append(np.asarray(img.convert("RGB"))[:, :, ::-1])
+    with stage("deepface"):
+        results = providers.deepface().represent(
+            img_path=arrays,
+            model_name=providers.FACE_MODEL,
+            enforce_detection=False,
+            detector_backend=providers.FACE_DETECTOR,
+        )
+    if len(arrays) == 1:
+        results = [results]
+    return [
+        [
+            {
+                "embedding": np.asarray(face["embedding"], dtype=float)
+                .ravel()
+                .tolist(),
+                "box": {
+                    key: int(face["facial_area"][key]) for key in ("x", "y", "w", "h")
+                },
+                "confidence": float(face.get("face_confidence") or 0),
+            }
+            for face in faces
+        ]
+        for faces in results
+    ]
+
+
+def save_faces(captive: Captive, faces: list[dict], photo=None):
+    # Replaces the faces of one picture: the main one, or a gallery photo.
+    CaptiveFace.objects.filter(captive=captive, photo=photo).delete()
+    CaptiveFace.objects.bulk_create(
+        [
+            CaptiveFace(
+                captive=captive,
+                photo=photo,
+                face_index=i,
+                embedding=json.dumps(face["embedding"]),
+                x=face["box"]["x"] if face["box"] else None,
+                y=face["box"]["y"] if face["box"] else None,
+                width=face["box"]["w"] if face["box"] else None,
+                height=face["box"]["h"] if face["box"] else None,
+                confidence=face["confidence"],
             )
-            return result[0]["embedding"] if result else []
+            for i, face in enumerate(faces)
+        ]
+    )
+    transaction.on_commit(
+        lambda: vector_indexes.refresh([captive.pk], fields=("faces",))
+    )
 
 
 def apply_status_filter(qs, status: str):
@@ -47,79 +139,343 @@ def apply_status_filter(qs, status: str):
     return qs.filter(Q(status__in=statuses))
 
 
+def apply_metadata_filters(qs, filters):
+    qs = apply_status_filter(qs, filters.get("status", ""))
+    for field in METADATA_FILTER_FIELDS:
+        value = str(filters.get(field) or "").strip()
+        if value:
+            qs = qs.filter(**{field: value})
+
+    for field, parse in METADATA_RANGE_FIELDS.items():
+        for suffix, lookup in (("from", "gte"), ("to", "lte")):
+            raw = str(filters.get(f"{field}_{suffix}") or "").strip()
+            if not raw:
+                continue
+            value = parse(raw)
+            if value is None:
+                raise ValueError(f"Invalid value for {field}_{suffix}: {raw}")
+            qs = qs.filter(**{f"{field}__{lookup}": value})
+    return qs
+
+
 async def async_batches(qs, batch_size: int):
-    total = await sync_to_async(qs.count)()
+    with stage("db"):
+        total = await sync_to_async(qs.count)()
     for offset in range(0, total, batch_size):
-        batch = await sync_to_async(list)(qs[offset : offset + batch_size])
+        with stage("db"):
+            batch = await sync_to_async(list)(qs[offset : offset + batch_size])
         yield batch
 
 
-async def search_by_embedding(
-    query_embedding: list[float], request, status: str, field_name: str
+async def top_by_embedding(
+    query_embedding: list[float], qs, field_name: str, limit: int
 ) -> list:
+    top_matches = await top_many_by_embedding([query_embedding], qs, field_name, limit)
+    return top_matches[0]
+
+
+async def top_many_by_embedding(
+    query_embeddings: list[list[float]], qs, field_name: str, limit: int
+) -> list[list]:
     expected_dim = MODEL_DIMENSIONS[field_name]
-    query_vec = np.asarray(query_embedding, dtype=np.float32)
-    if len(query_vec) != expected_dim:
+    queries = query_matrix(query_embeddings, expected_dim, field_name)
+    mode = settings.VECTOR_SEARCH_MODES.get(field_name, "scan")
+    if mode == "scan":
+        qs = qs.exclude(**{f"{field_name}__isnull": True})
+        batches = async_batches(qs, BATCH_SIZE)
+    else:
+        batches = index_candidates(queries, qs, field_name, mode, limit)
+
+    top_matches = [[] for _ in queries]
+    scanned = skipped = 0
+    async for batch in batches:
+        captives, similarities = score_batch(batch, field_name, queries, expected_dim)
+        scanned += len(batch)
+        skipped += len(batch) - len(captives)
+        for matches, column in zip(top_matches, similarities.T):
+            matches.extend(
+                (float(column[i]), captives[i]) for i in top_k(column, limit)
+            )
+            matches.sort(key=lambda x: x[0], reverse=True)
+            del matches[limit:]
+    record_scan(field_name, scanned, skipped)
+    return top_matches
+
+
+def query_matrix(query_embeddings: list, expected_dim: int, field_name: str):
+    queries = np.asarray(query_embeddings, dtype=np.float32)
+    if queries.ndim != 2 or queries.shape[1] != expected_dim:
         raise ValueError(
             f"Query embedding dimension mismatch for {field_name}. "
-            f"Expected {expected_dim}, got {len(query_vec)}"
+            f"Expected {expected_dim}, got {queries.shape[-1]}"
+        )
+    return normalize_rows(queries)
+
+
+async def top_many_by_face(
+    query_embeddings: list[list[float]], qs, limit: int, aggregate: str = "max"
+) -> list[list]:
+    # Scores every stored face and aggregates them per Captive and query.
+    queries = query_matrix(query_embeddings, FACE_DIMENSION, "faces")
+    faces = CaptiveFace.objects.all()
+    if qs.query.has_filters():
+        faces = faces.filter(captive__in=qs)
+    mode = settings.VECTOR_SEARCH_MODES.get("faces", "scan")
+    if mode == "scan":
+        batches = face_batches(faces, BATCH_SIZE)
+    else:
+        batches = face_index_candidates(queries, qs, faces, mode, limit)
+
+    best = [{} for _ in queries]
+    scanned = skipped = 0
+    async for rows in batches:
+        captive_ids, similarities, invalid = score_faces(rows, queries, aggregate)
+        scanned += len(rows)
+        skipped += invalid
+        for i, column in enumerate(similarities.T):
+            found = best[i]
+            found.update(
+                (int(captive_ids[row]), float(column[row]))
+                for row in top_k(column, limit)
+            )
+            if len(found) > limit:
+                best[i] = dict(heapq.nlargest(limit, found.items(), key=lambda x: x[1]))
+    record_scan("faces", scanned, skipped)
+
+    ranked = [sorted(found.items(), key=lambda x: x[1], reverse=True) for found in best]
+    with stage("db"):
+        captives = await sync_to_async(qs.in_bulk)(
+            {pk for matches in ranked for pk, _ in matches}
+        )
+    return [
+        [(score, captives[pk]) for pk, score in matches if pk in captives]
+        for matches in ranked
+    ]
+
+
+async def face_batches(faces, batch_size: int):
+    # Keyset pages that never split one Captive's faces across batches, so
+    # every batch can aggregate whole galleries.
+    rows_qs = faces.order_by(*FACE_ORDER).values_list(
+        "captive_id", "photo_id", "embedding"
+    )
+    after = None
+    while True:
+        page = rows_qs if after is None else rows_qs.filter(captive_id__gt=after)
+        with stage("db"):
+            rows = await sync_to_async(list)(page[:batch_size])
+        if not rows:
+            return
+        if len(rows) == batch_size:
+            last = rows[-1][0]
+            complete = [row for row in rows if row[0] != last]
+            if complete:
+                rows = complete
+            else:
+                with stage("db"):
+                    rows = await sync_to_async(list)(rows_qs.filter(captive_id=last))
+        after = rows[-1][0]
+        yield rows
+
+
+async def face_index_candidates(queries: np.ndarray, qs, faces, mode: str, limit: int):
+    index = await sync_to_async(vector_indexes.get)("faces", mode)
+    allowed = None
+    if qs.query.has_filters():
+        with stage("db"):
+            allowed = await sync_to_async(list)(qs.values_list("pk", flat=True))
+    with stage("index_search"):
+        candidate_ids, _ = index.search_many(queries, max(limit, index.rerank), allowed)
+    pks = set().union(*(ids.tolist() for ids in candidate_ids))
+    rows = faces.filter(captive_id__in=pks).order_by(*FACE_ORDER)
+    with stage("db"):
+        batch = await sync_to_async(list)(
+            rows.values_list("captive_id", "photo_id", "embedding")
+        )
+    yield batch
+
+
+def score_faces(rows, queries: np.ndarray, aggregate: str = "max"):
+    captive_ids, photo_ids, vectors = [], [], []
+    with stage("parse_embedding"):
+        for captive_id, photo_id, vec_str in rows:
+            vec = parse_embedding(vec_str, FACE_DIMENSION)
+            if vec is not None:
+                captive_ids.append(captive_id)
+                photo_ids.append(photo_id or 0)
+                vectors.append(vec)
+    if not vectors:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(queries))), len(rows)
+
+    with stage("score"):
+        similarities = normalize_rows(np.array(vectors, dtype=np.float32)) @ queries.T
+        captive_ids, similarities = aggregate_faces(
+            np.array(captive_ids), np.array(photo_ids), similarities, aggregate
+        )
+    return captive_ids, similarities, len(rows) - len(vectors)
+
+
+async def index_candidates(
+    queries: np.ndarray, qs, field_name: str, mode: str, limit: int
+):
+    # Yields the candidate rows once; scoring them re-ranks exactly against
+    # the stored full-precision vectors.
+    index = await sync_to_async(vector_indexes.get)(field_name, mode)
+    allowed = None
+    if qs.query.has_filters():
+        with stage("db"):
+            allowed = await sync_to_async(list)(qs.values_list("pk", flat=True))
+    with stage("index_search"):
+        candidate_ids, _ = index.search_many(queries, max(limit, index.rerank), allowed)
+    pks = set().union(*(ids.tolist() for ids in candidate_ids))
+    with stage("db"):
+        batch = await sync_to_async(list)(qs.filter(pk__in=pks))
+    yield batch
+
+
+async def search_photo_batch(
+    embeddings: list[list[float]], qs, request, limit: int, aggregate: str = "max"
+) -> tuple[list, list]:
+    # One scoring pass for every photo; photos without a face get no matches.
+    valid = [i for i, embedding in enumerate(embeddings) if embedding]
+    per_photo = [[] for _ in embeddings]
+    if valid:
+        top_matches = await top_many_by_face(
+            [embeddings[i] for i in valid], qs, limit, aggregate
         )
-    query_norm = np.linalg.norm(query_vec)
-    query_vec = query_vec / query_norm if query_norm > 0 else query_vec
-    qs = Captive.objects.exclude(**{f"{field_name}__isnull": True})
-    qs = apply_status_filter(qs, status)
-    top_matches = []
-    async for batch in async_batches(qs, BATCH_SIZE):
-        batch_matches = await process_batch(batch, field_name, query_vec, expected_dim)
-        top_matches.extend(batch_matches)
-        top_matches.sort(key=lambda x: x[0], reverse=True)
-        top_matches = top_matches[:5]
+        for i, matches in zip(valid, top_matches):
+            per_photo[i] = matches
+
+    best = {}
+    for photo, matches in enumerate(per_photo):
+        for score, captive in matches:
+            if captive.pk not in best or score > best[captive.pk][0]:
+                best[captive.pk] = (score, captive, photo)
+    ranked = sorted(best.values(), key=lambda x: x[0], reverse=True)[:limit]
+
+    photo_results = await serialize_matches(per_photo, request)
+    items = {item["id"]: item for results in photo_results for item in results}
+    best_results = [
+        {**items[c.pk], "score": score, "photo": photo} for score, c, photo in ranked
+    ]
+    return photo_results, best_results
+
+
+async def search_faces(
+    embeddings: list[list[float]], qs, request, limit: int, aggregate: str = "max"
+):
+    return await serialize_matches(
+        await top_many_by_face(embeddings, qs, limit, aggregate), request
+    )
+
+
+async def serialize_matches(per_query: list[list], request) -> list[list]:
+    captives = {c.pk: c for matches in per_query for _, c in matches}
+    serialized = await serialize_results(list(captives.values()), request)
+    items = {pk: item for pk, item in zip(captives, serialized)}
+    return [
+        [{**items[c.pk], "score": score} for score, c in matches]
+        for matches in per_query
+    ]
+
+
+async def search_by_embedding(
+    query_embedding: list[float], request, status: str, field_name: str
+) -> list:
+    qs = apply_status_filter(Captive.objects.all(), status)
+    top_matches = await top_by_embedding(query_embedding, qs, field_name, 5)
     return await serialize_results([c for _, c in top_matches], request)
 
 
+async def top_by_text(qs, text: str, limit: int) -> list:
+    with stage("full_text"):
+        matches = await sync_to_async(list)(full_text_search(qs, text)[:limit])
+    if not matches:
+        return []
+    best_rank = max(c.rank for c in matches) or 1.0
+    return [(c.rank / best_rank, c) for c in matches]
+
+
+async def search_hybrid(
+    qs,
+    request,
+    weights: dict,
+    limit: int,
+    appearance_embedding: list | None = None,
+    photo_embedding: list | None = None,
+    text: str = "",
+) -> list:
+    signals = {}
+    if appearance_embedding:
+        signals["appearance"] = await top_by_embedding(
+            appearance_embedding, qs, "appearance_embedded", HYBRID_CANDIDATES
+        )
+    if photo_embedding:
+        top_matches = await top_many_by_face([photo_embedding], qs, HYBRID_CANDIDATES)
+        signals["photo"] = top_matches[0]
+    if text:
+        signals["text"] = await top_by_text(qs, text, HYBRID_CANDIDATES)
+
+    total_weight = sum(weights[name] for name in signals) or 1.0
+    captives, scores, breakdown = {}, {}, {}
+    for name, matches in signals.items():
+        for score, captive in matches:
+            captives[captive.pk] = captive
+            scores[captive.pk] = scores.get(captive.pk, 0.0) + weights[name] * score
+            breakdown.setdefault(captive.pk, {})[name] = score
+
+    ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+    results = await serialize_results([captives[pk] for pk in ranked], request)
+    for item, pk in zip(results, ranked):
+        item["score"] = scores[pk] / total_weight
+        item["scores"] = breakdown[pk]
+    return results
+
+
 async def process_batch(
     batch, field_name: str, query_vec: np.ndarray, expected_dim: int
 ):
+    valid_captives, similarities = score_batch(
+        batch, field_name, query_vec[np.newaxis, :], expected_dim
+    )
+    return list(zip(similarities[:, 0].tolist(), valid_captives))
+
+
+def score_batch(batch, field_name: str, queries: np.ndarray, expected_dim: int):
     valid_embeddings = []
     valid_captives = []
-    for captive in batch:
-        vec_str = getattr(captive, field_name)
-        vec = parse_embedding(vec_str, expected_dim)
+    with stage("parse_embedding"):
+        for captive in batch:
+            vec_str = getattr(captive, field_name)
+            vec = parse_embedding(vec_str, expected_dim)
 
-        if vec is not None:
-            valid_embeddings.append(vec)
-            valid_captives.append(captive)
+            if vec is not None:
+                valid_embeddings.append(vec)
+                valid_captives.append(captive)
     if not valid_embeddings:
-        return []
+        return [], np.empty((0, len(queries)), dtype=np.float32)
 
-    embeddings = np.array(valid_embeddings, dtype=np.float32)
-    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
-    norms[norms == 0] = 1.0
-    embeddings_norm = embeddings / norms
-    similarities = embeddings_norm.dot(query_vec)
-    return list(zip(similarities.tolist(), valid_captives))
-
-
-def parse_embedding(vec_str: str, expected_dim: int) -> np.ndarray | None:
-    if not vec_str or vec_str.strip() == "[]":
-        return None
-
-    vec = np.fromstring(vec_str.strip("[]"), sep=",", dtype=np.float32)
-    if len(vec) != expected_dim:
-        return None
-    return vec if vec.size > 0 else None
+    with stage("score"):
+        embeddings = normalize_rows(np.array(valid_embeddings, dtype=np.float32))
+        similarities = embeddings @ queries.T
+    return valid_captives, similarities
 
 
 async def serialize_results(captives, request):
-    return await sync_to_async(
-        lambda: CaptiveSerializer(
-            captives, many=True, context={"request": request}
-        ).data
-    )()
+    with stage("serialize"):
+        return await sync_to_async(
+            lambda: CaptiveSerializer(
+                captives, many=True, context={"request": request}
+            ).data
+        )()
 
 
-async def search_photo(embedding: list, request, status) -> list:
-    return await search_by_embedding(embedding, request, status, "picture_embedded")
+async def search_photo(
+    embedding: list, request, status, aggregate: str = "max"
+) -> list:
+    qs = apply_status_filter(Captive.objects.all(), status)
+    top_matches = await top_many_by_face([embedding], qs, 5, aggregate)
+    return await serialize_results([c for _, c in top_matches[0]], request)
 
 
 async def search_appearance(embedding: list, request, status) -> list:
@@ -14,3 +14,15 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.AI_WARMUP:
+    from backend.providers import warm_up_in_background
+
+    warm_up_in_background()
+
+if settings.CHANGE_NOTIFICATIONS:
+    from backend.notifications import change_listener
+
+    change_listener.start()
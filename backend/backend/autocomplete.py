@@ -0,0 +1,160 @@
+import bisect
+import heapq
+import threading
+import time
+from collections import Counter
+from .models import Captive
+from .search import APOSTROPHES
+
+AUTOCOMPLETE_FIELDS = ("name", "brigade", "region", "settlement")
+AUTOCOMPLETE_LIMIT = 10
+MAX_SCAN = 5000
+LATENCY_BUDGET = 0.002
+
+
+def normalize(value: str | None) -> str:
+    if not value:
+        return ""
+    return " ".join(APOSTROPHES.sub("", value).lower().split())
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.keys = []
+        self.counts = Counter()
+        self.spellings = {}
+
+    def add(self, value: str | None):
+        for key in self._count(value):
+            bisect.insort(self.keys, key)
+
+    def extend(self, values):
+        # For building: one sort at the end, where an insort per key is
+        # quadratic in the number of keys.
+        for value in values:
+            self.keys.extend(self._count(value))
+        self.keys.sort()
+
+    def _count(self, value: str | None) -> list[tuple[str, str]]:
+        # Counts the value; returns the keys to insert if it is new.
+        norm = normalize(value)
+        if not norm:
+            return []
+        new = self.counts[norm] == 0
+        if new:
+            self.spellings[norm] = Counter()
+        self.counts[norm] += 1
+        self.spellings[norm][value.strip()] += 1
+        return self._keys_for(norm) if new else []
+
+    def remove(self, value: str | None):
+        norm = normalize(value)
+        if not self.counts.get(norm):
+            return
+        self.counts[norm] -= 1
+        spellings = self.spellings[norm]
+        spellings[value.strip()] -= 1
+        if spellings[value.strip()] <= 0:
+            del spellings[value.strip()]
+        if self.counts[norm] > 0:
+            return
+        del self.counts[norm]
+        del self.spellings[norm]
+        for key in self._keys_for(norm):
+            i = bisect.bisect_left(self.keys, key)
+            if i < len(self.keys) and self.keys[i] == key:
+                del self.keys[i]
+
+    def lookup(self, prefix: str, limit: int, deadline: float) -> list[dict]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        matches = set()
+        start = bisect.bisect_left(self.keys, (prefix, ""))
+        for i in range(start, min(start + MAX_SCAN, len(self.keys))):
+            suffix, norm = self.keys[i]
+            if not suffix.startswith(prefix):
+                break
+            matches.add(norm)
+            if i % 256 == 0 and time.perf_counter() > deadline:
+                break
+        best = heapq.nlargest(limit, matches, key=lambda norm: self.counts[norm])
+        return [
+            {
+                "value": self.spellings[norm].most_common(1)[0][0],
+                "count": self.counts[norm],
+            }
+            for norm in best
+        ]
+
+    def _keys_for(self, norm: str) -> list[tuple[str, str]]:
+        words = norm.split(" ")
+        return [(" ".join(words[i:]), norm) for i in range(len(words))]
+
+
+class AutocompleteIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.indexes = None
+        self.rows = {}
+
+    def ensure_built(self):
+        if self.indexes is not None:
+            return
+        with self.lock:
+            if self.indexes is not None:
+                return
+            rows = {
+                row[0]: row[1:]
+                for row in Captive.objects.values_list(
+                    "pk", *AUTOCOMPLETE_FIELDS
+                ).iterator(chunk_size=2000)
+            }
+            indexes = {field: PrefixIndex() for field in AUTOCOMPLETE_FIELDS}
+            for i, field in enumerate(AUTOCOMPLETE_FIELDS):
+                indexes[field].extend(values[i] for values in rows.values())
+            self.rows = rows
+            self.indexes = indexes
+
+    def update(self, pk, values: tuple):
+        if self.indexes is None:
+            return
+        with self.lock:
+            old = self.rows.get(pk)
+            if old == values:
+                return
+            for field, old_value, new_value in zip(
+                AUTOCOMPLETE_FIELDS, old or (None,) * len(values), values
+            ):
+                if old_value != new_value:
+                    self.indexes[field].remove(old_value)
+                    self.indexes[field].add(new_value)
+            self.rows[pk] = values
+
+    def remove(self, pk):
+        if self.indexes is None:
+            return
+        with self.lock:
+            old = self.rows.pop(pk, None)
+            if old is None:
+                return
+            for field, value in zip(AUTOCOMPLETE_FIELDS, old):
+                self.indexes[field].remove(value)
+
+    def invalidate(self):
+        with self.lock:
+            self.indexes = None
+            self.rows = {}
+
+    def lookup(self, field: str, prefix: str, limit: int = AUTOCOMPLETE_LIMIT):
+        self.ensure_built()
+        deadline = time.perf_counter() + LATENCY_BUDGET
+        with self.lock:
+            return self.indexes[field].lookup(prefix, limit, deadline)
+
+
+autocomplete_index = AutocompleteIndex()
+
+
+def captive_values(captive) -> tuple:
+    return tuple(getattr(captive, field) for field in AUTOCOMPLETE_FIELDS)
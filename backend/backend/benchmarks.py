@@ -0,0 +1,278 @@
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from unittest import mock
+import numpy as np
+from django.conf import settings
+from django.test import override_settings
+from . import ai_tools
+from .ai_stubs import stub_vector
+from .models import Captive
+from .serializers import CaptiveSerializer
+
+BENCHMARK_SIZES = (10_000, 100_000, 1_000_000)
+POOL_SIZE = 1000
+STATUSES = [value for value, _ in Captive.STATUS_CHOICES]
+
+# What a fresh process does before serving: "lazy" is every manage.py command
+# and worker boot now, "eager" adds the AI imports the app used to pay at
+# import time, "warm" also builds the face models as AI_WARMUP does.
+STARTUP_SCENARIOS = {
+    "lazy": "",
+    "eager": "providers.deepface(); providers.openai_client()",
+    "warm": "providers.warm_up()",
+}
+# Read-path configurations for "manage.py loadtest", run one process each:
+# the DRF viewset without and with the connection pool, then the async views.
+READ_SCENARIOS = {
+    "sync": {"ASYNC_READS": "false", "DB_POOL_MAX_SIZE": "0"},
+    "sync_pooled": {"ASYNC_READS": "false"},
+    "async_pooled": {"ASYNC_READS": "true"},
+}
+READ_MIX = "detail=60,text_search=40"
+STARTUP_SCRIPT = """
+import json, resource, time
+start = time.perf_counter()
+import django
+django.setup()
+import backend.urls
+from backend import providers
+{code}
+print(json.dumps({{
+    "setup_seconds": time.perf_counter() - start,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+class SyntheticCaptives:
+    def __init__(self, rows: int, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.rows = rows
+        self.pools = {
+            field: [
+                json.dumps(vec.tolist())
+                for vec in rng.standard_normal((POOL_SIZE, dim)).astype(np.float32)
+            ]
+            for field, dim in ai_tools.MODEL_DIMENSIONS.items()
+        }
+
+    def captive(self, i: int) -> Captive:
+        return Captive(
+            id=i + 1,
+            name=f"Captive {i}",
+            person_type="military" if i % 3 else "civilian",
+            brigade=str(i % 150),
+            status=STATUSES[i % len(STATUSES)],
+            region=f"Region {i % 25}",
+            settlement=f"Settlement {i % 1000}",
+            circumstances="Synthetic benchmark record",
+            appearance="Synthetic appearance description",
+            appearance_embedded=self.pools["appearance_embedded"][i % POOL_SIZE],
+            picture_embedded=self.pools["picture_embedded"][i % POOL_SIZE],
+        )
+
+    def batches(self, batch_size: int = ai_tools.BATCH_SIZE):
+        for start in range(0, self.rows, batch_size):
+            end = min(start + batch_size, self.rows)
+            yield [self.captive(i) for i in range(start, end)]
+
+    async def async_batches(self, qs, batch_size: int):
+        for batch in self.batches(batch_size):
+            yield batch
+
+
+def measure(fn, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "min_seconds": round(min(timings), 6),
+        "mean_seconds": round(sum(timings) / len(timings), 6),
+        "peak_memory_mb": round(peak / 2**20, 3),
+    }
+
+
+def bench_parse_embedding(data: SyntheticCaptives, field: str):
+    dim = ai_tools.MODEL_DIMENSIONS[field]
+    pool = data.pools[field]
+    for i in range(data.rows):
+        ai_tools.parse_embedding(pool[i % POOL_SIZE], dim)
+
+
+def bench_process_batch(data: SyntheticCaptives, field: str, query_vec):
+    dim = ai_tools.MODEL_DIMENSIONS[field]
+
+    async def run():
+        for batch in data.batches():
+            await ai_tools.process_batch(batch, field, query_vec, dim)
+
+    asyncio.run(run())
+
+
+def bench_search(data: SyntheticCaptives, field: str):
+    async def run():
+        if field == "appearance_embedded":
+            embedding = await ai_tools.create_embedding("високий, коротке волосся")
+        else:
+            embedding = await ai_tools.create_photo_embedding(b"benchmark photo")
+        await ai_tools.search_by_embedding(embedding, None, "", field)
+
+    with mock.patch.object(ai_tools, "async_batches", data.async_batches):
+        asyncio.run(run())
+
+
+def bench_serializer(data: SyntheticCaptives):
+    for batch in data.batches():
+        CaptiveSerializer(batch, many=True).data
+
+
+def run_benchmarks(sizes=BENCHMARK_SIZES, repeat: int = 3, log=print) -> dict:
+    results = {}
+    with override_settings(AI_BACKEND="stub", AI_STUB_LATENCY=0):
+        for rows in sizes:
+            data = SyntheticCaptives(rows)
+            size_results = {}
+            for field, dim in ai_tools.MODEL_DIMENSIONS.items():
+                query_vec = np.asarray(stub_vector(b"query", dim), dtype=np.float32)
+                query_vec /= np.linalg.norm(query_vec)
+                cases = {
+                    f"parse_embedding[{field}]": lambda: bench_parse_embedding(
+                        data, field
+                    ),
+                    f"process_batch[{field}]": lambda: bench_process_batch(
+                        data, field, query_vec
+                    ),
+                    f"search_by_embedding[{field}]": lambda: bench_search(data, field),
+                }
+                for name, fn in cases.items():
+                    size_results[name] = measure(fn, repeat)
+                    log(f"{rows:>9} {name}: {size_results[name]}")
+            size_results["CaptiveSerializer"] = measure(
+                lambda: bench_serializer(data), repeat
+            )
+            log(f"{rows:>9} CaptiveSerializer: {size_results['CaptiveSerializer']}")
+            results[str(rows)] = size_results
+
+    return {"meta": environment_info(repeat), "results": results}
+
+
+def measure_startup(code: str, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT.format(code=code)],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+        )
+        elapsed = time.perf_counter() - start
+        if proc.returncode:
+            lines = proc.stderr.strip().splitlines()
+            return {"error": lines[-1] if lines else f"exit {proc.returncode}"}
+        run = json.loads(proc.stdout.strip().splitlines()[-1])
+        run["process_seconds"] = elapsed
+        runs.append(run)
+    return {
+        key: round(min(run[key] for run in runs), 3)
+        for key in ("process_seconds", "setup_seconds", "max_rss_mb")
+    }
+
+
+def measure_reads(env: dict, concurrency: int, duration: float, seed: int) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        proc = subprocess.run(
+            [
+                sys.executable,
+                "manage.py",
+                "loadtest",
+                f"--mix={READ_MIX}",
+                f"--concurrency={concurrency}",
+                f"--duration={duration}",
+                f"--seed={seed}",
+                f"--output={output.name}",
+            ],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+            env={**os.environ, **env},
+        )
+        if proc.returncode:
+            lines = proc.stderr.strip().splitlines()
+            return {"error": lines[-1] if lines else f"exit {proc.returncode}"}
+        return json.load(output)
+
+
+def run_read_benchmarks(
+    scenarios=READ_SCENARIOS,
+    concurrency: int = 64,
+    duration: float = 20.0,
+    seed: int = 1000,
+    log=print,
+):
+    results = {}
+    for name in scenarios:
+        results[name] = measure_reads(READ_SCENARIOS[name], concurrency, duration, seed)
+        log(f"{name}: {results[name].get('total', results[name])}")
+    meta = environment_info(1)
+    meta.update(concurrency=concurrency, duration=duration, mix=READ_MIX)
+    return {"meta": meta, "results": results}
+
+
+def run_startup_benchmarks(scenarios=STARTUP_SCENARIOS, repeat: int = 3, log=print):
+    results = {}
+    for name in scenarios:
+        results[name] = measure_startup(STARTUP_SCENARIOS[name], repeat)
+        log(f"{name}: {results[name]}")
+    return {"meta": environment_info(repeat), "results": results}
+
+
+def environment_info(repeat: int) -> dict:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except OSError:
+        revision = ""
+    return {
+        "revision": revision,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "max_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+    }
+
+
+def compare_results(current: dict, baseline: dict) -> list[str]:
+    lines = []
+    for rows, cases in current["results"].items():
+        for name, result in cases.items():
+            previous = baseline["results"].get(rows, {}).get(name)
+            if not previous or not previous["min_seconds"]:
+                continue
+            change = result["min_seconds"] / previous["min_seconds"] - 1
+            lines.append(f"{rows:>9} {name}: {change:+.1%}")
+    return lines
@@ -0,0 +1,182 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+import psycopg
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.decorators import sync_and_async_middleware
+
+# Reads of these apps' models made while serving a request go to a healthy
+# replica (settings.DB_REPLICAS). Writes, reads inside transactions, other
+# apps (auth, sessions) and everything outside a request (management
+# commands, the change listener) use the primary.
+ROUTED_APPS = {"backend"}
+PIN_COOKIE = "db_pin"
+CONNECT_TIMEOUT = 2
+# Whether the replica's WAL receiver is streaming from the primary, and its
+# lag: 0 when it has replayed all WAL it received (so an idle primary does
+# not make it look stale), else the age of its last replayed transaction.
+# A replica that stopped streaming has replayed everything it received too,
+# so its lag alone would read 0 however stale it gets.
+LAG_SQL = """
+SELECT
+    NOT pg_is_in_recovery()
+        OR EXISTS (SELECT FROM pg_stat_wal_receiver WHERE status = 'streaming'),
+    CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class RoutingState:
+    def __init__(self, pinned: bool):
+        self.pinned = pinned
+        self.wrote = False
+
+
+routing_state = contextvars.ContextVar("routing_state", default=None)
+
+
+def pin_to_primary():
+    # Read-your-writes: the rest of this request, and the client's requests
+    # for the next REPLICA_STICKY_SECONDS, read from the primary.
+    state = routing_state.get()
+    if state is not None:
+        state.pinned = state.wrote = True
+
+
+def replica_aliases() -> list[str]:
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+class ReplicaHealth:
+    # Each alias is checked in its own background thread, so routing a read
+    # never waits for a replica connection. Meanwhile the last result is
+    # used: unhealthy until the first check finishes.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checked = {}
+        self.checking = set()
+
+    def healthy(self, alias: str) -> bool:
+        with self.lock:
+            checked_at, healthy = self.checked.get(alias, (None, False))
+            if alias in self.checking or (
+                checked_at is not None
+                and time.monotonic() - checked_at < settings.REPLICA_CHECK_INTERVAL
+            ):
+                return healthy
+            self.checking.add(alias)
+        threading.Thread(
+            target=self.update, args=(alias,), name=f"check-{alias}", daemon=True
+        ).start()
+        return healthy
+
+    def update(self, alias: str):
+        healthy = False
+        try:
+            healthy = self.check(alias)
+        except Exception:
+            logger.exception("Checking replica %s failed", alias)
+        finally:
+            with self.lock:
+                self.checked[alias] = (time.monotonic(), healthy)
+                self.checking.discard(alias)
+
+    def check(self, alias: str) -> bool:
+        params = connections[alias].get_connection_params()
+        params.pop("cursor_factory")  # Django's cursor class; not needed here.
+        try:
+            with psycopg.connect(**params, connect_timeout=CONNECT_TIMEOUT) as conn:
+                streaming, lag = conn.execute(LAG_SQL).fetchone()
+        except psycopg.Error as e:
+            logger.warning("Replica %s unavailable: %s", alias, e)
+            return False
+        if not streaming:
+            logger.warning("Replica %s is not streaming from the primary", alias)
+            return False
+        lag = float(lag or 0)
+        if lag > settings.REPLICA_MAX_LAG:
+            logger.warning("Replica %s is %.1fs behind", alias, lag)
+            return False
+        return True
+
+    def status(self) -> dict:
+        return {alias: self.healthy(alias) for alias in replica_aliases()}
+
+
+replica_health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        state = routing_state.get()
+        if (
+            model._meta.app_label not in ROUTED_APPS
+            or state is None
+            or state.pinned
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        healthy = [a for a in replica_aliases() if replica_health.healthy(a)]
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication.
+        return db == DEFAULT_DB_ALIAS
+
+
+def start_routing(request):
+    try:
+        pinned = float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        pinned = False
+    return routing_state.set(RoutingState(pinned))
+
+
+def finish_routing(response, token):
+    state = routing_state.get()
+    routing_state.reset(token)
+    if state.wrote:
+        sticky = settings.REPLICA_STICKY_SECONDS
+        response.set_cookie(
+            PIN_COOKIE,
+            str(int(time.time() + sticky)),
+            max_age=sticky,
+            httponly=True,
+            samesite="Lax",
+        )
+    return response
+
+
+@sync_and_async_middleware
+def replica_routing_middleware(get_response):
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            token = start_routing(request)
+            return finish_routing(await get_response(request), token)
+
+    else:
+
+        def middleware(request):
+            token = start_routing(request)
+            return finish_routing(get_response(request), token)
+
+    return middleware
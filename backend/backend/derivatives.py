@@ -0,0 +1,135 @@
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from PIL import Image, ImageOps
+from .media_store import BLOB_DIR
+
+# Longest side in pixels. Names under media_store.BLOB_DIR are
+# content-addressed, so their derivative URLs always denote the same bytes
+# and can be cached forever; legacy names (captives/<pk>/...) may be reused.
+DERIVATIVE_SIZES = {"thumbnail": 160, "card": 480, "full": 1280}
+DERIVATIVE_FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+DERIVATIVE_QUALITY = 80
+# Hits refresh a file's mtime at most this often; cleanup evicts oldest mtimes.
+TOUCH_INTERVAL = 3600
+CLEANUP_LOW_WATER = 0.8
+LEGACY_MAX_AGE = 3600
+
+
+def derivative_url(name: str, size: str, fmt: str = "webp") -> str:
+    return reverse("derivative", kwargs={"size": size, "name": name, "fmt": fmt})
+
+
+def derivative_urls(name: str, request=None) -> dict:
+    urls = {size: derivative_url(name, size) for size in DERIVATIVE_SIZES}
+    if request is not None:
+        urls = {size: request.build_absolute_uri(url) for size, url in urls.items()}
+    return urls
+
+
+def cache_control(name: str) -> str:
+    if name.startswith(f"{BLOB_DIR}/"):
+        return "public, max-age=31536000, immutable"
+    return f"public, max-age={LEGACY_MAX_AGE}"
+
+
+class DerivativeCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.total_bytes = None
+
+    @property
+    def root(self) -> Path:
+        return Path(settings.DERIVATIVE_ROOT)
+
+    def path(self, name: str, size: str, fmt: str) -> Path:
+        path = (self.root / size / f"{name}.{fmt}").resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise SuspiciousFileOperation(f"Invalid derivative path: {name}")
+        return path
+
+    def get(self, name: str, size: str, fmt: str) -> Path:
+        # Raises FileNotFoundError when the source image does not exist.
+        path = self.path(name, size, fmt)
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return self.create(name, size, fmt, path)
+        if time.time() - mtime > TOUCH_INTERVAL:
+            os.utime(path)
+        return path
+
+    def create(self, name: str, size: str, fmt: str, path: Path) -> Path:
+        with default_storage.open(name, "rb") as source, Image.open(source) as img:
+            img = ImageOps.exif_transpose(img).convert("RGB")
+            img.thumbnail((DERIVATIVE_SIZES[size],) * 2)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    img.save(f, DERIVATIVE_FORMATS[fmt][0], quality=DERIVATIVE_QUALITY)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        self.added(path.stat().st_size)
+        return path
+
+    def delete(self, name: str):
+        # Called once the source is deleted, so a reused legacy name never
+        # serves the old picture.
+        removed = 0
+        for size in DERIVATIVE_SIZES:
+            for fmt in DERIVATIVE_FORMATS:
+                path = self.path(name, size, fmt)
+                try:
+                    removed += path.stat().st_size
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+        with self.lock:
+            if self.total_bytes is not None:
+                self.total_bytes -= removed
+
+    def added(self, nbytes: int):
+        with self.lock:
+            if self.total_bytes is None:
+                self.total_bytes = sum(size for _, size, _ in self.files())
+            else:
+                self.total_bytes += nbytes
+            if self.total_bytes > settings.DERIVATIVE_CACHE_BYTES:
+                self.cleanup()
+
+    def files(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                try:
+                    stat = os.stat(os.path.join(dirpath, filename))
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, os.path.join(dirpath, filename)
+
+    def cleanup(self):
+        # Least recently used first, down to the low-water mark so a full
+        # cache does not rescan on every new derivative.
+        files = sorted(self.files())
+        total = sum(size for _, size, _ in files)
+        target = settings.DERIVATIVE_CACHE_BYTES * CLEANUP_LOW_WATER
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.total_bytes = total
+
+
+derivative_cache = DerivativeCache()
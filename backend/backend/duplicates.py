@@ -0,0 +1,138 @@
+from collections import defaultdict
+import numpy as np
+from django.db import transaction
+from .autocomplete import normalize
+from .models import Captive, CaptiveFace, DuplicateCluster
+from .vector_index import (
+    SCORE_CHUNK_SIZE,
+    load_embeddings,
+    load_face_embeddings,
+    normalize_rows,
+)
+
+FACE_THRESHOLD = 0.6
+APPEARANCE_THRESHOLD = 0.95
+PLACEHOLDER_NAME = normalize(Captive._meta.get_field("name").default)
+
+
+def name_key(name: str | None) -> str:
+    # Word order differs between sources ("Surname Name" vs "Name Surname").
+    norm = normalize(name)
+    if norm == PLACEHOLDER_NAME:
+        return ""
+    return " ".join(sorted(norm.split()))
+
+
+def build_blocks(min_size: int = 2) -> list[list[int]]:
+    # Only records sharing a normalized name or a brigade are ever compared.
+    blocks = defaultdict(list)
+    rows = Captive.objects.values_list("pk", "name", "brigade")
+    for pk, name, brigade in rows.iterator(chunk_size=10000):
+        if key := name_key(name):
+            blocks["name", key].append(pk)
+        if key := normalize(brigade):
+            blocks["brigade", key].append(pk)
+    return [pks for pks in blocks.values() if len(pks) >= min_size]
+
+
+def similar_pairs(vectors: np.ndarray, threshold: float, tile: int = SCORE_CHUNK_SIZE):
+    # Upper triangle of the block's Gram matrix, one tile-by-tile product at a
+    # time so memory stays at tile**2 scores however large the block is.
+    vectors = normalize_rows(vectors)
+    n = len(vectors)
+    for i in range(0, n, tile):
+        left = vectors[i : i + tile]
+        for j in range(i, n, tile):
+            scores = left @ vectors[j : j + tile].T
+            mask = scores >= threshold
+            if i == j:
+                mask = np.triu(mask, k=1)
+            rows, cols = np.nonzero(mask)
+            yield i + rows, j + cols, scores[rows, cols]
+
+
+def block_links(
+    pks: list[int], face_threshold: float, appearance_threshold: float, tile: int
+):
+    ids, vectors = load_embeddings(
+        "appearance_embedded", Captive.objects.filter(pk__in=pks)
+    )
+    for rows, cols, scores in similar_pairs(vectors, appearance_threshold, tile):
+        yield from zip(ids[rows], ids[cols], scores)
+
+    ids, vectors = load_face_embeddings(CaptiveFace.objects.filter(captive__in=pks))
+    for rows, cols, scores in similar_pairs(vectors, face_threshold, tile):
+        keep = ids[rows] != ids[cols]
+        yield from zip(ids[rows][keep], ids[cols][keep], scores[keep])
+
+
+def find_links(
+    blocks: list[list[int]],
+    face_threshold: float = FACE_THRESHOLD,
+    appearance_threshold: float = APPEARANCE_THRESHOLD,
+    tile: int = SCORE_CHUNK_SIZE,
+) -> dict[tuple[int, int], float]:
+    links = {}
+    for pks in blocks:
+        for a, b, score in block_links(pks, face_threshold, appearance_threshold, tile):
+            key = (int(min(a, b)), int(max(a, b)))
+            links[key] = max(links.get(key, -1.0), float(score))
+    return links
+
+
+def cluster_links(links: dict[tuple[int, int], float]) -> list[tuple[set[int], float]]:
+    # Strongest links merge first, so each cluster's score is the weakest
+    # link of its maximum spanning tree.
+    parent, weakest = {}, {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for (a, b), score in sorted(links.items(), key=lambda item: -item[1]):
+        root_a, root_b = find(a), find(b)
+        if root_a == root_b:
+            continue
+        parent[root_b] = root_a
+        weakest[root_a] = min(
+            weakest.get(root_a, score), weakest.pop(root_b, score), score
+        )
+
+    members = defaultdict(set)
+    for x in parent:
+        members[find(x)].add(x)
+    return [(members[root], weakest[root]) for root in members if root in weakest]
+
+
+def save_clusters(clusters: list[tuple[set[int], float]]) -> int:
+    # Reviewed clusters are kept; an identical candidate is not re-proposed.
+    reviewed = defaultdict(set)
+    through = DuplicateCluster.members.through.objects.exclude(
+        duplicatecluster__status="pending"
+    )
+    for cluster_id, captive_id in through.values_list(
+        "duplicatecluster_id", "captive_id"
+    ):
+        reviewed[cluster_id].add(captive_id)
+    reviewed = {frozenset(m) for m in reviewed.values()}
+
+    clusters = [(m, s) for m, s in clusters if frozenset(m) not in reviewed]
+    with transaction.atomic():
+        DuplicateCluster.objects.filter(status="pending").delete()
+        created = DuplicateCluster.objects.bulk_create(
+            DuplicateCluster(score=score) for _, score in clusters
+        )
+        DuplicateCluster.members.through.objects.bulk_create(
+            (
+                DuplicateCluster.members.through(
+                    duplicatecluster_id=cluster.pk, captive_id=captive_id
+                )
+                for cluster, (members, _) in zip(created, clusters)
+                for captive_id in members
+            ),
+            batch_size=5000,
+        )
+    return len(created)
@@ -0,0 +1,17 @@
+import numpy as np
+
+MODEL_DIMENSIONS = {
+    "picture_embedded": 128,
+    "appearance_embedded": 1536,
+}
+FACE_DIMENSION = MODEL_DIMENSIONS["picture_embedded"]
+
+
+def parse_embedding(vec_str: str, expected_dim: int) -> np.ndarray | None:
+    if not vec_str or vec_str.strip() == "[]":
+        return None
+
+    vec = np.fromstring(vec_str.strip("[]"), sep=",", dtype=np.float32)
+    if len(vec) != expected_dim:
+        return None
+    return vec if vec.size > 0 else None
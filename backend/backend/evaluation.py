@@ -0,0 +1,88 @@
+import time
+import numpy as np
+from .vector_index import build_index, normalize_rows, parse_mode
+
+
+def sample_queries(
+    vectors: np.ndarray, n_queries: int, noise: float, seed: int = 0
+) -> dict:
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)
+    stored = normalize_rows(vectors[picks])
+    perturbation = rng.standard_normal(stored.shape).astype(np.float32)
+    perturbed = normalize_rows(
+        stored + noise * normalize_rows(perturbation) if noise else stored.copy()
+    )
+    return {"stored": stored, "perturbed": perturbed}
+
+
+def recall_and_mrr(found: np.ndarray, expected: np.ndarray) -> tuple[float, float]:
+    k = expected.shape[1]
+    recall = np.mean([len(set(f[:k]) & set(e)) / k for f, e in zip(found, expected)])
+    reciprocal_ranks = []
+    for f, e in zip(found, expected):
+        hits = np.flatnonzero(f == e[0])
+        reciprocal_ranks.append(1.0 / (hits[0] + 1) if len(hits) else 0.0)
+    return float(recall), float(np.mean(reciprocal_ranks))
+
+
+def evaluate_modes(
+    ids: np.ndarray,
+    vectors: np.ndarray,
+    modes: list[str],
+    n_queries: int = 200,
+    k: int = 10,
+    noise: float = 0.05,
+) -> list[dict]:
+    # ids may repeat (faces: one row per face, ids sorted by Captive). The
+    # exact truth scores each id by its best row; the evaluated modes index
+    # row numbers, so re-ranking uses each row's own vector, and their
+    # results are collapsed to each id's best row.
+    query_sets = sample_queries(vectors, n_queries, noise)
+    exact = build_index("exact", ids, vectors)
+    exact.group_rows()
+    truth = {
+        name: np.array(exact.search_many(queries, k)[0])
+        for name, queries in query_sets.items()
+    }
+    row_ids = np.arange(len(ids), dtype=np.int64)
+    rows_per_id = int(np.unique(ids, return_counts=True)[1].max())
+
+    def source(candidate_rows):
+        return vectors[candidate_rows]
+
+    def best_ids(result_rows):
+        found = ids[result_rows]
+        _, first = np.unique(found, return_index=True)
+        return found[np.sort(first)][:k]
+
+    rows = []
+    for spec in modes:
+        name, options = parse_mode(spec)
+        start = time.perf_counter()
+        index = build_index(name, row_ids, vectors, source=source, **options)
+        build_seconds = time.perf_counter() - start
+        for query_name, queries in query_sets.items():
+            found = []
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                result_rows, _ = index.search(query, k * rows_per_id)
+                found.append(best_ids(result_rows))
+                latencies.append(time.perf_counter() - start)
+            recall, mrr = recall_and_mrr(np.array(found), truth[query_name])
+            latencies.sort()
+            rows.append(
+                {
+                    "mode": spec,
+                    "queries": query_name,
+                    f"recall@{k}": round(recall, 4),
+                    "mrr": round(mrr, 4),
+                    "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+                    "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+                    "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 3),
+                    "memory_mb": round(index.nbytes / 2**20, 2),
+                    "build_s": round(build_seconds, 3),
+                }
+            )
+    return rows
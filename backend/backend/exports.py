@@ -0,0 +1,81 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Captive
+from .ai_tools import apply_status_filter
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ("csv", "ndjson")
+EMBEDDING_COLUMNS = ("appearance_embedded", "picture_embedded")
+DEFAULT_COLUMNS = (
+    "id",
+    "name",
+    "picture",
+    "person_type",
+    "brigade",
+    "date_of_birth",
+    "user_id",
+    "status",
+    "region",
+    "settlement",
+    "circumstances",
+    "appearance",
+    "last_update",
+)
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def resolve_columns(columns: str | None, with_embeddings: bool) -> list[str]:
+    if columns:
+        selected = [c.strip() for c in columns.split(",") if c.strip()]
+    else:
+        selected = list(DEFAULT_COLUMNS)
+    if with_embeddings:
+        selected += [c for c in EMBEDDING_COLUMNS if c not in selected]
+
+    allowed = set(DEFAULT_COLUMNS) | set(EMBEDDING_COLUMNS)
+    unknown = [c for c in selected if c not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown export columns: {', '.join(unknown)}")
+    return selected
+
+
+def export_queryset(columns: list[str], status: str = ""):
+    qs = apply_status_filter(Captive.objects.order_by("pk"), status)
+    return qs.values(*columns)
+
+
+def csv_header(columns: list[str]) -> str:
+    return csv.writer(Echo()).writerow(columns)
+
+
+def format_row(row, columns: list[str], fmt: str, writer=None) -> str:
+    if fmt == "csv":
+        return writer.writerow(["" if row[c] is None else row[c] for c in columns])
+    return json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def iter_export(columns: list[str], status: str, fmt: str, chunk_size: int):
+    writer = csv.writer(Echo())
+    if fmt == "csv":
+        yield csv_header(columns)
+    qs = export_queryset(columns, status)
+    for row in qs.iterator(chunk_size=chunk_size):
+        yield format_row(row, columns, fmt, writer)
+
+
+async def aiter_export(columns: list[str], status: str, fmt: str, chunk_size: int):
+    writer = csv.writer(Echo())
+    if fmt == "csv":
+        yield csv_header(columns)
+    qs = export_queryset(columns, status)
+    async for row in qs.aiterator(chunk_size=chunk_size):
+        yield format_row(row, columns, fmt, writer)
@@ -0,0 +1,129 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .ai_stubs import STUB_DIMENSIONS, stub_vector
+from findme_openai.client import estimate_tokens
+
+# A local stand-in for the OpenAI API (embeddings and chat completions) that
+# misbehaves on demand, to exercise findme_openai.client without a key:
+# point OPENAI_BASE_URL at http://host:port/v1.
+FAKE_DESCRIPTION = json.dumps(
+    {
+        "description": "Чоловік середнього віку, коротке темне волосся",
+        "confidence": 0.9,
+        "gender": "male",
+        "age_range": "30-40",
+    },
+    ensure_ascii=False,
+)
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        latency: float = 0.05,
+        slow_rate: float = 0.0,
+        slow_latency: float = 5.0,
+        rate_limit_rate: float = 0.0,
+        error_rate: float = 0.0,
+        retry_after: float = 1.0,
+    ):
+        super().__init__(address, FakeOpenAIHandler)
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "ok": 0, "rate_limited": 0, "errors": 0}
+
+    def count(self, key: str):
+        with self.lock:
+            self.counts[key] += 1
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    server: FakeOpenAIServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        server.count("requests")
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        roll = random.random()
+        if roll < server.rate_limit_rate:
+            server.count("rate_limited")
+            return self.reply(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "requests"}},
+                {"Retry-After": str(server.retry_after)},
+            )
+        if roll < server.rate_limit_rate + server.error_rate:
+            server.count("errors")
+            return self.reply(500, {"error": {"message": "Internal error"}})
+        slow = random.random() < server.slow_rate
+        time.sleep(server.slow_latency if slow else server.latency)
+        if self.path.endswith("/embeddings"):
+            payload = self.embeddings(body)
+        elif self.path.endswith("/chat/completions"):
+            payload = self.chat(body)
+        else:
+            return self.reply(404, {"error": {"message": f"Unknown {self.path}"}})
+        server.count("ok")
+        self.reply(200, payload)
+
+    def reply(self, code: int, payload: dict, headers: dict | None = None):
+        data = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def embeddings(self, body: dict) -> dict:
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        tokens = sum(estimate_tokens(text) for text in texts)
+        return {
+            "object": "list",
+            "model": body["model"],
+            "data": [
+                {
+                    "object": "embedding",
+                    "index": i,
+                    "embedding": stub_vector(text.encode(), STUB_DIMENSIONS["text"]),
+                }
+                for i, text in enumerate(texts)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def chat(self, body: dict) -> dict:
+        completion = estimate_tokens(FAKE_DESCRIPTION)
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": FAKE_DESCRIPTION},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": 1000,
+                "completion_tokens": completion,
+                "total_tokens": 1000 + completion,
+            },
+        }
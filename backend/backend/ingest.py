@@ -0,0 +1,35 @@
+from django.db import transaction
+from rest_framework import serializers
+from .models import Captive
+from .serializers import CaptiveIngestSerializer
+
+INGEST_BATCH_SIZE = 1000
+BULK_INGEST_LIMIT = 5000
+
+
+def ingest_records(records: list, user=None, batch_size: int = INGEST_BATCH_SIZE):
+    # Validates every row with one serializer instance and inserts the valid
+    # ones with bulk_create, skipping Captive.save and signals. Embeddings and
+    # face detection are left to the embed_pending command; caches pick the
+    # rows up through the database change notifications.
+    child = CaptiveIngestSerializer()
+    results = []
+    for start in range(0, len(records), batch_size):
+        rows, captives = [], []
+        for i, record in enumerate(records[start : start + batch_size], start):
+            try:
+                data = child.run_validation(record)
+            except serializers.ValidationError as e:
+                results.append({"row": i, "errors": e.detail})
+                continue
+            picture = data.pop("picture", None)
+            captive = Captive(**data, user=user)
+            if picture:
+                captive.picture.save(picture.name, picture, save=False)
+            captive.embedding_pending = bool(captive.appearance or picture)
+            rows.append(i)
+            captives.append(captive)
+        with transaction.atomic():
+            Captive.objects.bulk_create(captives)
+        results.extend({"row": i, "id": c.pk} for i, c in zip(rows, captives))
+    return sorted(results, key=lambda result: result["row"])
@@ -0,0 +1,266 @@
+import asyncio
+import io
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.utils.crypto import get_random_string
+from PIL import Image
+from .benchmarks import SyntheticCaptives
+from .models import Captive
+
+LOADTEST_USERNAME = "loadtest"
+DEFAULT_MIX = {"list": 60, "appearance_search": 20, "photo_search": 10, "create": 10}
+BOUNDARY = "loadtest-boundary"
+
+
+class AsgiClient:
+    def __init__(self, app, cookies: dict, csrf_token: str):
+        self.app = app
+        self.headers = [
+            ("host", "localhost"),
+            ("cookie", "; ".join(f"{k}={v}" for k, v in cookies.items())),
+            ("x-csrftoken", csrf_token),
+        ]
+
+    async def request(
+        self, method: str, path: str, body: bytes = b"", content_type: str = ""
+    ):
+        path, _, query = path.partition("?")
+        headers = list(self.headers)
+        if content_type:
+            headers.append(("content-type", content_type))
+        headers.append(("content-length", str(len(body))))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(k.encode(), v.encode()) for k, v in headers],
+            "client": ("127.0.0.1", 50000),
+            "server": ("localhost", 80),
+        }
+        request_sent = False
+        disconnect = asyncio.Event()
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        response = {"status": None, "body": []}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            disconnect.set()
+        return response["status"], b"".join(response["body"])
+
+
+def sample_photo() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (160, 160), (120, 90, 60)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def multipart(fields: dict, files: dict) -> bytes:
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n".encode()
+        )
+    for name, (filename, content) in files.items():
+        parts.append(
+            f"--{BOUNDARY}\r\nContent-Disposition: form-data; "
+            f'name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: image/jpeg\r\n\r\n".encode() + content + b"\r\n"
+        )
+    parts.append(f"--{BOUNDARY}--\r\n".encode())
+    return b"".join(parts)
+
+
+class Scenario:
+    def __init__(self):
+        self.photo_body = multipart(
+            {"status": "searching|informed"}, {"photo": ("photo.jpg", sample_photo())}
+        )
+        self.counter = 0
+        self.ids = []
+
+    async def list(self, client):
+        return await client.request("GET", "/captives/?status=searching")
+
+    async def detail(self, client):
+        if not self.ids:
+            self.ids = [
+                pk async for pk in Captive.objects.values_list("pk", flat=True)[:1000]
+            ]
+        self.counter += 1
+        return await client.request(
+            "GET", f"/captives/{self.ids[self.counter % len(self.ids)]}/"
+        )
+
+    async def text_search(self, client):
+        self.counter += 1
+        return await client.request(
+            "GET", f"/captives/search/?q=Captive+{self.counter % 1000}&page_size=20"
+        )
+
+    async def appearance_search(self, client):
+        body = json.dumps({"appearance": "високий чоловік, коротке темне волосся"})
+        return await client.request(
+            "POST", "/appearance_search/", body.encode(), "application/json"
+        )
+
+    async def photo_search(self, client):
+        return await client.request(
+            "POST",
+            "/photo_search/",
+            self.photo_body,
+            f"multipart/form-data; boundary={BOUNDARY}",
+        )
+
+    async def create(self, client):
+        self.counter += 1
+        body = json.dumps(
+            {
+                "name": f"Loadtest {self.counter}",
+                "status": "searching",
+                "appearance": "середній зріст, світле волосся",
+            }
+        )
+        return await client.request(
+            "POST", "/captives/", body.encode(), "application/json"
+        )
+
+
+def loadtest_user() -> User:
+    user, _ = User.objects.get_or_create(username=LOADTEST_USERNAME)
+    return user
+
+
+def session_cookies(user: User) -> tuple[dict, str]:
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    csrf_token = get_random_string(32)
+    cookies = {
+        settings.SESSION_COOKIE_NAME: session.session_key,
+        settings.CSRF_COOKIE_NAME: csrf_token,
+    }
+    return cookies, csrf_token
+
+
+def seed_captives(user: User, rows: int, batch_size: int = 1000) -> int:
+    missing = rows - Captive.objects.filter(user=user).count()
+    if missing <= 0:
+        return 0
+    data = SyntheticCaptives(missing)
+    for batch in data.batches(batch_size):
+        for captive in batch:
+            captive.id = None
+            captive.user = user
+        Captive.objects.bulk_create(batch)
+    return missing
+
+
+def cleanup(user: User):
+    Captive.objects.filter(user=user).delete()
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if not hasattr(Scenario, name.strip()):
+            raise ValueError(f"Unknown request type: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(samples: dict, elapsed: float) -> dict:
+    report = {}
+    all_latencies = []
+    all_errors = 0
+    all_statuses = Counter()
+    for name, entries in sorted(samples.items()):
+        latencies = sorted(latency for latency, _ in entries)
+        statuses = Counter(str(status) for _, status in entries)
+        errors = sum(1 for _, status in entries if not status or status >= 300)
+        all_latencies.extend(latencies)
+        all_statuses.update(statuses)
+        all_errors += errors
+        report[name] = endpoint_summary(latencies, errors, statuses, elapsed)
+    report["total"] = endpoint_summary(
+        sorted(all_latencies), all_errors, all_statuses, elapsed
+    )
+    return report
+
+
+def endpoint_summary(
+    latencies: list[float], errors: int, statuses: Counter, elapsed: float
+) -> dict:
+    count = len(latencies)
+    return {
+        "requests": count,
+        "status_codes": dict(statuses),
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+async def run_load(
+    app, cookies: dict, csrf_token: str, mix: dict, concurrency: int, duration: float
+) -> dict:
+    client = AsgiClient(app, cookies, csrf_token)
+    scenario = Scenario()
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = defaultdict(list)
+    rng = random.Random(0)
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                status, _ = await getattr(scenario, name)(client)
+            except Exception:
+                status = None
+            samples[name].append((time.perf_counter() - start, status))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, time.perf_counter() - started)
@@ -0,0 +1,61 @@
+import json
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from backend.benchmarks import READ_SCENARIOS, run_read_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare read-path requests per second: DRF viewset without and with "
+        "the connection pool, and the async views"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenarios",
+            default=",".join(READ_SCENARIOS),
+            help="Comma-separated subset of: " + ", ".join(READ_SCENARIOS),
+        )
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument("--duration", type=float, default=20.0)
+        parser.add_argument(
+            "--seed", type=int, default=1000, help="Synthetic captives to ensure"
+        )
+        parser.add_argument("--output", help="Where to write the JSON results")
+
+    def handle(self, *args, **options):
+        report = run_read_benchmarks(
+            options["scenarios"].split(","),
+            options["concurrency"],
+            options["duration"],
+            options["seed"],
+            log=lambda line: None,
+        )
+        self.stdout.write(
+            f"{'scenario':<16}{'rps':>10}{'err%':>8}"
+            f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        )
+        baseline = None
+        for name, result in report["results"].items():
+            if "error" in result:
+                self.stderr.write(f"{name}: {result['error']}")
+                continue
+            total = result["total"]
+            baseline = baseline or total["throughput_rps"]
+            self.stdout.write(
+                f"{name:<16}{total['throughput_rps']:>10}"
+                f"{total['error_rate'] * 100:>8.1f}{total['p50_ms']:>10}"
+                f"{total['p95_ms']:>10}{total['p99_ms']:>10}"
+                f"  x{total['throughput_rps'] / baseline:.2f}"
+            )
+
+        output = options["output"] or (
+            Path(settings.BASE_DIR)
+            / "benchmarks"
+            / f"reads-{report['meta']['revision'] or 'local'}.json"
+        )
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f"Results written to {output}")
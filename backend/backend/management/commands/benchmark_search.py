@@ -0,0 +1,39 @@
+import json
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from backend.benchmarks import BENCHMARK_SIZES, compare_results, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = "Benchmark search and serialization hot paths on synthetic data"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default=",".join(str(size) for size in BENCHMARK_SIZES),
+            help="Comma-separated row counts",
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--output", help="Where to write the JSON results")
+        parser.add_argument("--compare", help="Previous results file to compare with")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        report = run_benchmarks(sizes, options["repeat"], log=self.stdout.write)
+
+        output = options["output"] or (
+            Path(settings.BASE_DIR)
+            / "benchmarks"
+            / f"search-{report['meta']['revision'] or 'local'}.json"
+        )
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f"Results written to {output}")
+
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+            for line in compare_results(report, baseline):
+                self.stdout.write(line)
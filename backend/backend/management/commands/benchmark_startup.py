@@ -0,0 +1,41 @@
+import json
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from backend.benchmarks import STARTUP_SCENARIOS, run_startup_benchmarks
+
+
+class Command(BaseCommand):
+    help = "Measure process startup time and RSS with lazy and eager AI loading"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenarios",
+            default=",".join(STARTUP_SCENARIOS),
+            help="Comma-separated subset of: " + ", ".join(STARTUP_SCENARIOS),
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--output", help="Where to write the JSON results")
+
+    def handle(self, *args, **options):
+        scenarios = options["scenarios"].split(",")
+        report = run_startup_benchmarks(
+            scenarios, options["repeat"], log=self.stdout.write
+        )
+        lazy, eager = report["results"].get("lazy"), report["results"].get("eager")
+        if lazy and eager and "error" not in lazy and "error" not in eager:
+            self.stdout.write(
+                f"Lazy loading saves "
+                f"{eager['setup_seconds'] - lazy['setup_seconds']:.2f}s and "
+                f"{eager['max_rss_mb'] - lazy['max_rss_mb']:.0f} MB per process"
+            )
+
+        output = options["output"] or (
+            Path(settings.BASE_DIR)
+            / "benchmarks"
+            / f"startup-{report['meta']['revision'] or 'local'}.json"
+        )
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f"Results written to {output}")
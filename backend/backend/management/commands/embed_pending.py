@@ -0,0 +1,114 @@
+import json
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.management.base import BaseCommand
+from backend.ai_tools import create_embeddings, detect_faces_batch, save_faces
+from backend.matching import update_matches
+from backend.models import Captive
+from findme_openai.errors import OpenAIUnavailable
+
+
+class Command(BaseCommand):
+    help = (
+        "Embed captives inserted by bulk ingest (appearance text and picture "
+        "faces) and compute their matches; run periodically"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=64)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        done = failed = 0
+        after = 0
+        # Keyset pagination: rows that fail stay pending for the next run
+        # without holding back the ones after them.
+        while True:
+            batch = list(
+                Captive.objects.filter(embedding_pending=True, pk__gt=after).order_by(
+                    "pk"
+                )[:batch_size]
+            )
+            if not batch:
+                break
+            after = batch[-1].pk
+            try:
+                embedded = async_to_sync(self.embed)(batch)
+            except Exception as e:
+                self.stderr.write(f"Captives {batch[0].pk}-{after}: {e}")
+                embedded = 0
+            done += embedded
+            failed += len(batch) - embedded
+            self.stdout.write(f"Embedded {done} captives, {failed} failed")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Embedded {done} pending captives, {failed} left pending"
+            )
+        )
+
+    async def each(self, call, captives: list[Captive], inputs: list) -> dict:
+        # One call for the batch; if it fails, one call per row so a bad row
+        # only fails itself. Returns {captive pk: result}.
+        try:
+            results = await call(inputs)
+            return {c.pk: result for c, result in zip(captives, results)}
+        except OpenAIUnavailable:
+            raise  # Rate limited or down: every row would fail the same way.
+        except Exception as e:
+            if len(inputs) == 1:
+                self.stderr.write(f"Captive {captives[0].pk}: {e}")
+                return {}
+        results = {}
+        for captive, item in zip(captives, inputs):
+            results.update(await self.each(call, [captive], [item]))
+        return results
+
+    async def embed(self, batch: list[Captive]) -> int:
+        described = [captive for captive in batch if captive.appearance]
+        embeddings = {}
+        if described:
+            embeddings = await self.each(
+                create_embeddings, described, [c.appearance for c in described]
+            )
+
+        pictured, images = [], []
+        for captive in batch:
+            if not captive.picture:
+                continue
+            try:
+                with captive.picture.open("rb") as f:
+                    images.append(f.read())
+                pictured.append(captive)
+            except OSError as e:
+                self.stderr.write(f"Captive {captive.pk}: {e}")
+        faces_per_image = (
+            await self.each(detect_faces_batch, pictured, images) if images else {}
+        )
+
+        # Only rows with every part embedded are saved and cleared.
+        embedded = [
+            captive
+            for captive in batch
+            if (not captive.appearance or captive.pk in embeddings)
+            and (not captive.picture or captive.pk in faces_per_image)
+        ]
+
+        def save():
+            for captive in embedded:
+                if captive.appearance:
+                    captive.appearance_embedded = json.dumps(embeddings[captive.pk])
+                if captive.picture:
+                    faces = faces_per_image[captive.pk]
+                    save_faces(captive, faces)
+                    captive.picture_embedded = json.dumps(
+                        faces[0]["embedding"] if faces else []
+                    )
+                captive.embedding_pending = False
+            Captive.objects.bulk_update(
+                embedded,
+                ["appearance_embedded", "picture_embedded", "embedding_pending"],
+            )
+
+        if embedded:
+            await sync_to_async(save)()
+            await update_matches(embedded)
+        return len(embedded)
@@ -0,0 +1,72 @@
+import json
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from backend.embeddings import FACE_DIMENSION, MODEL_DIMENSIONS
+from backend.evaluation import evaluate_modes
+from backend.vector_index import SEARCH_MODES, load_vectors
+
+DIMENSIONS = {**MODEL_DIMENSIONS, "faces": FACE_DIMENSION}
+
+
+class Command(BaseCommand):
+    help = "Compare recall, rank quality, latency and memory of vector search modes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--field", choices=list(DIMENSIONS), default="appearance_embedded"
+        )
+        parser.add_argument(
+            "--modes",
+            nargs="+",
+            default=list(SEARCH_MODES),
+            help="Modes with optional parameters, e.g. int8:rerank=200",
+        )
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--k", type=int, default=10)
+        parser.add_argument(
+            "--noise", type=float, default=0.05, help="Perturbation for query copies"
+        )
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            help="Use N random vectors instead of stored embeddings",
+        )
+        parser.add_argument("--output", help="Write the JSON rows to this file")
+
+    def handle(self, *args, **options):
+        field = options["field"]
+        if options["synthetic"]:
+            rng = np.random.default_rng(0)
+            vectors = rng.standard_normal(
+                (options["synthetic"], DIMENSIONS[field])
+            ).astype(np.float32)
+            ids = np.arange(1, len(vectors) + 1, dtype=np.int64)
+        else:
+            ids, vectors = load_vectors(field)
+        if len(ids) == 0:
+            raise CommandError(f"No valid {field} embeddings to evaluate")
+        self.stdout.write(f"Evaluating {len(ids)} {field} vectors")
+
+        try:
+            rows = evaluate_modes(
+                ids,
+                vectors,
+                options["modes"],
+                options["queries"],
+                options["k"],
+                options["noise"],
+            )
+        except (ValueError, TypeError) as e:
+            raise CommandError(str(e))
+
+        columns = list(rows[0])
+        widths = [max(len(c), *(len(str(r[c])) for r in rows)) + 2 for c in columns]
+        self.stdout.write("".join(c.ljust(w) for c, w in zip(columns, widths)))
+        for row in rows:
+            self.stdout.write(
+                "".join(str(row[c]).ljust(w) for c, w in zip(columns, widths))
+            )
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(rows, f, indent=2)
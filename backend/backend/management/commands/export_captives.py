@@ -0,0 +1,37 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from backend.exports import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_FORMATS,
+    iter_export,
+    resolve_columns,
+)
+
+
+class Command(BaseCommand):
+    help = "Stream all captives to CSV or NDJSON with constant memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("--columns", help="Comma-separated list of columns")
+        parser.add_argument(
+            "--status", default="", help="Status filter, e.g. searching|informed"
+        )
+        parser.add_argument("--with-embeddings", action="store_true")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument("--output", "-o", help="Output file (defaults to stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            columns = resolve_columns(options["columns"], options["with_embeddings"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        rows = iter_export(
+            columns, options["status"], options["format"], options["chunk_size"]
+        )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as f:
+                f.writelines(rows)
+        else:
+            sys.stdout.writelines(rows)
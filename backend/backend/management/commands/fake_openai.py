@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from backend.fake_openai import FakeOpenAIServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a fake OpenAI API (embeddings, chat completions) with injected "
+        "latency, 429s and 500s; set OPENAI_BASE_URL=http://host:port/v1"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8099)
+        parser.add_argument("--latency", type=float, default=0.05)
+        parser.add_argument(
+            "--slow-rate", type=float, default=0.0, help="Fraction of slow requests"
+        )
+        parser.add_argument("--slow-latency", type=float, default=5.0)
+        parser.add_argument(
+            "--rate-limit-rate",
+            type=float,
+            default=0.0,
+            help="Fraction of requests answered with 429",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="Fraction of requests answered with 500",
+        )
+        parser.add_argument(
+            "--retry-after", type=float, default=1.0, help="Retry-After on 429s"
+        )
+
+    def handle(self, *args, **options):
+        server = FakeOpenAIServer(
+            (options["host"], options["port"]),
+            latency=options["latency"],
+            slow_rate=options["slow_rate"],
+            slow_latency=options["slow_latency"],
+            rate_limit_rate=options["rate_limit_rate"],
+            error_rate=options["error_rate"],
+            retry_after=options["retry_after"],
+        )
+        self.stdout.write(
+            f"Fake OpenAI at http://{options['host']}:{options['port']}/v1"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(str(server.counts))
@@ -0,0 +1,56 @@
+import time
+from django.core.management.base import BaseCommand
+from backend.duplicates import (
+    APPEARANCE_THRESHOLD,
+    FACE_THRESHOLD,
+    build_blocks,
+    cluster_links,
+    find_links,
+    save_clusters,
+)
+from backend.vector_index import SCORE_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Cluster likely duplicate Captive records for review; records are "
+        "compared only within blocks sharing a normalized name or brigade"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--face-threshold", type=float, default=FACE_THRESHOLD)
+        parser.add_argument(
+            "--appearance-threshold", type=float, default=APPEARANCE_THRESHOLD
+        )
+        parser.add_argument(
+            "--tile",
+            type=int,
+            default=SCORE_CHUNK_SIZE,
+            help="Rows per side of each similarity matrix tile",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Report clusters without saving"
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        blocks = build_blocks()
+        self.stdout.write(
+            f"{len(blocks)} blocks, largest {max(map(len, blocks), default=0)} records"
+        )
+        links = find_links(
+            blocks,
+            face_threshold=options["face_threshold"],
+            appearance_threshold=options["appearance_threshold"],
+            tile=options["tile"],
+        )
+        clusters = cluster_links(links)
+        self.stdout.write(
+            f"{len(links)} links, {len(clusters)} clusters covering "
+            f"{sum(len(m) for m, _ in clusters)} records "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        if options["dry_run"]:
+            return
+        saved = save_clusters(clusters)
+        self.stdout.write(self.style.SUCCESS(f"Saved {saved} clusters for review"))
@@ -0,0 +1,20 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from backend.models import MediaBlob
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete stored media no longer referenced by any Captive or photo "
+        "(e.g. after bulk deletes that bypass Model.delete, or rows that were "
+        "rolled back after their file was written)"
+    )
+
+    def handle(self, *args, **options):
+        names = list(
+            MediaBlob.objects.filter(refcount__lte=0).values_list("name", flat=True)
+        )
+        known = set(MediaBlob.objects.values_list("name", flat=True))
+        names += [name for name in default_storage.blob_names() if name not in known]
+        deleted = sum(default_storage.delete(name) for name in names)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} unused files"))
@@ -0,0 +1,56 @@
+import asyncio
+import json
+from django.core.management.base import BaseCommand
+from backend.ai_tools import detect_faces_batch, save_faces
+from backend.models import Captive, CaptiveFace
+
+
+class Command(BaseCommand):
+    help = "Detect every face in stored Captive pictures and index them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=16)
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Re-index captives whose faces already have bounding boxes",
+        )
+
+    def handle(self, *args, **options):
+        qs = Captive.objects.exclude(picture="").exclude(picture__isnull=True)
+        if not options["all"]:
+            # Rows backfilled from picture_embedded have no bounding box yet.
+            boxed = CaptiveFace.objects.filter(photo__isnull=True, x__isnull=False)
+            qs = qs.exclude(pk__in=boxed.values("captive_id"))
+        total = qs.count()
+        batch_size = options["batch_size"]
+        indexed = faces_found = 0
+        after = 0
+        # Keyset pagination, so only one batch of Captives is in memory.
+        while True:
+            captives = list(qs.filter(pk__gt=after).order_by("pk")[:batch_size])
+            if not captives:
+                break
+            after = captives[-1].pk
+            batch, images = [], []
+            for captive in captives:
+                try:
+                    with captive.picture.open("rb") as f:
+                        images.append(f.read())
+                    batch.append(captive)
+                except OSError as e:
+                    self.stderr.write(f"Captive {captive.pk}: {e}")
+            if not batch:
+                continue
+            for captive, faces in zip(batch, asyncio.run(detect_faces_batch(images))):
+                save_faces(captive, faces)
+                captive.picture_embedded = json.dumps(
+                    faces[0]["embedding"] if faces else []
+                )
+                captive.save(update_fields=["picture_embedded"])
+                indexed += 1
+                faces_found += len(faces)
+            self.stdout.write(f"Indexed {indexed}/{total} captives")
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {faces_found} faces in {indexed} captives")
+        )
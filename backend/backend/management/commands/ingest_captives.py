@@ -0,0 +1,56 @@
+import csv
+import json
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from backend.ingest import INGEST_BATCH_SIZE, ingest_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-insert captives from a CSV or JSON file; run embed_pending "
+        "afterwards to embed them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "json"])
+        parser.add_argument("--user", help="Username recorded as the author")
+        parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        fmt = options["format"] or path.suffix.lstrip(".").lower()
+        with open(path, newline="", encoding="utf-8") as f:
+            if fmt == "json":
+                records = json.load(f)
+            elif fmt == "csv":
+                # Empty cells mean "not given", so model defaults apply.
+                records = [
+                    {key: value for key, value in row.items() if value}
+                    for row in csv.DictReader(f)
+                ]
+            else:
+                raise CommandError("Use --format csv or json")
+        if not isinstance(records, list):
+            raise CommandError("A JSON file must hold a list of records")
+
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"No user {options['user']}")
+
+        results = ingest_records(records, user, options["batch_size"])
+        for result in results:
+            if "errors" in result:
+                self.stderr.write(
+                    f"Row {result['row']}: {json.dumps(result['errors'])}"
+                )
+        created = sum("id" in result for result in results)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created} captives, {len(results) - created} rows rejected"
+            )
+        )
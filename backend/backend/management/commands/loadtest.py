@@ -0,0 +1,88 @@
+import asyncio
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from backend.loadtest import (
+    DEFAULT_MIX,
+    cleanup,
+    loadtest_user,
+    parse_mix,
+    run_load,
+    seed_captives,
+    session_cookies,
+)
+
+
+class Command(BaseCommand):
+    help = "Drive concurrent mixed traffic through the ASGI application"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--duration", type=float, default=30.0)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument(
+            "--mix",
+            default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+            help="Weighted request mix, e.g. list=60,appearance_search=20",
+        )
+        parser.add_argument(
+            "--stub-latency",
+            type=float,
+            default=0.2,
+            help="Seconds each stubbed OpenAI/DeepFace call sleeps",
+        )
+        parser.add_argument(
+            "--live-ai", action="store_true", help="Call the real AI backends"
+        )
+        parser.add_argument(
+            "--seed", type=int, default=1000, help="Synthetic captives to ensure"
+        )
+        parser.add_argument(
+            "--cleanup", action="store_true", help="Delete load test rows afterwards"
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options["mix"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        user = loadtest_user()
+        seeded = seed_captives(user, options["seed"])
+        self.stdout.write(f"Seeded {seeded} synthetic captives")
+        cookies, csrf_token = session_cookies(user)
+
+        from backend.asgi import application
+
+        ai_settings = {"AI_STUB_LATENCY": options["stub_latency"]}
+        if not options["live_ai"]:
+            ai_settings["AI_BACKEND"] = "stub"
+        try:
+            with override_settings(**ai_settings):
+                report = asyncio.run(
+                    run_load(
+                        application,
+                        cookies,
+                        csrf_token,
+                        mix,
+                        options["concurrency"],
+                        options["duration"],
+                    )
+                )
+        finally:
+            if options["cleanup"]:
+                cleanup(user)
+
+        self.stdout.write(
+            f"{'endpoint':<20}{'requests':>10}{'rps':>10}{'err%':>8}"
+            f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        )
+        for name, row in report.items():
+            self.stdout.write(
+                f"{name:<20}{row['requests']:>10}{row['throughput_rps']:>10}"
+                f"{row['error_rate'] * 100:>8.1f}{row['p50_ms']:>10}"
+                f"{row['p95_ms']:>10}{row['p99_ms']:>10}"
+            )
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
@@ -0,0 +1,34 @@
+import asyncio
+from django.core.management.base import BaseCommand
+from backend.matching import pending_captives, update_matches
+from backend.models import Captive
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh candidate matches for captives created or changed since their "
+        "matches were computed (by the API or the scraper); run periodically"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=100)
+        parser.add_argument(
+            "--all", action="store_true", help="Recompute matches for every captive"
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        processed = edges = 0
+        after = 0
+        while True:
+            qs = Captive.objects.all() if options["all"] else pending_captives()
+            chunk = list(qs.filter(pk__gt=after).order_by("pk")[:chunk_size])
+            if not chunk:
+                break
+            edges += asyncio.run(update_matches(chunk))
+            processed += len(chunk)
+            after = chunk[-1].pk
+            self.stdout.write(f"Matched {processed} captives")
+        self.stdout.write(
+            self.style.SUCCESS(f"Stored {edges} match edges for {processed} captives")
+        )
@@ -0,0 +1,109 @@
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .ai_tools import top_many_by_embedding, top_many_by_face
+from .embeddings import FACE_DIMENSION, MODEL_DIMENSIONS, parse_embedding
+from .models import Captive, CaptiveFace, CaptiveMatch
+
+# Records are matched against the population that could be the same person
+# seen from the other side: families searching vs. reports of captives.
+MATCH_TARGETS = {"searching": ("informed",), "informed": ("searching",)}
+MATCH_LIMIT = 20
+
+
+def mark_pending(pks: list[int]):
+    # Writes only flag the captives; the update_matches command recomputes
+    # their matches off the request path.
+    Captive.objects.filter(pk__in=pks).update(matches_updated_at=None)
+
+
+def pending_captives():
+    return Captive.objects.filter(
+        Q(matches_updated_at__isnull=True) | Q(matches_updated_at__lt=F("last_update"))
+    )
+
+
+async def top_matches(captives: list[Captive]):
+    # (owner, candidate pk, signal, score) for each captive's top candidates.
+    groups = {}
+    for captive in captives:
+        if captive.status in MATCH_TARGETS:
+            groups.setdefault(captive.status, []).append(captive)
+
+    found = []
+    for status, group in groups.items():
+        targets = Captive.objects.filter(status__in=MATCH_TARGETS[status])
+
+        owners, queries = [], []
+        for captive in group:
+            vec = parse_embedding(
+                captive.appearance_embedded, MODEL_DIMENSIONS["appearance_embedded"]
+            )
+            if vec is not None:
+                owners.append(captive.pk)
+                queries.append(vec)
+        if queries:
+            matches = await top_many_by_embedding(
+                queries, targets, "appearance_embedded", MATCH_LIMIT
+            )
+            for owner, top in zip(owners, matches):
+                found += [(owner, c.pk, "appearance", score) for score, c in top]
+
+        rows = await sync_to_async(list)(
+            CaptiveFace.objects.filter(captive__in=[c.pk for c in group]).values_list(
+                "captive_id", "embedding"
+            )
+        )
+        owners, queries = [], []
+        for captive_id, vec_str in rows:
+            vec = parse_embedding(vec_str, FACE_DIMENSION)
+            if vec is not None:
+                owners.append(captive_id)
+                queries.append(vec)
+        if queries:
+            matches = await top_many_by_face(queries, targets, MATCH_LIMIT)
+            for owner, top in zip(owners, matches):
+                found += [(owner, c.pk, "photo", score) for score, c in top]
+    return found
+
+
+async def compute_matches(captives: list[Captive]) -> list[CaptiveMatch]:
+    # Every edge touching these captives, which save_matches replaces. An
+    # edge exists while either end has the other among its top candidates
+    # (matches are not symmetric), so the captives' current neighbours are
+    # ranked again too and keep the edges they still justify.
+    pks = {c.pk for c in captives}
+    neighbour_pks = await sync_to_async(set)(
+        CaptiveMatch.objects.filter(captive__in=pks)
+        .exclude(candidate__in=pks)
+        .values_list("candidate_id", flat=True)
+    )
+    neighbours = await sync_to_async(list)(Captive.objects.filter(pk__in=neighbour_pks))
+
+    edges = {}
+    found = await top_matches(captives)
+    found += [m for m in await top_matches(neighbours) if m[1] in pks]
+    for owner, candidate, signal, score in found:
+        # Edges are stored in both directions so either side reads them.
+        for key in ((owner, candidate, signal), (candidate, owner, signal)):
+            edges[key] = max(edges.get(key, -1.0), score)
+
+    return [
+        CaptiveMatch(captive_id=owner, candidate_id=candidate, signal=signal, score=s)
+        for (owner, candidate, signal), s in edges.items()
+    ]
+
+
+def save_matches(captives: list[Captive], matches: list[CaptiveMatch]):
+    pks = [c.pk for c in captives]
+    with transaction.atomic():
+        CaptiveMatch.objects.filter(Q(captive__in=pks) | Q(candidate__in=pks)).delete()
+        CaptiveMatch.objects.bulk_create(matches, batch_size=1000)
+        Captive.objects.filter(pk__in=pks).update(matches_updated_at=timezone.now())
+
+
+async def update_matches(captives: list[Captive]) -> int:
+    matches = await compute_matches(captives)
+    await sync_to_async(save_matches)(captives, matches)
+    return len(matches)
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+# Files are stored once per content at blobs/<h[:2]>/<h[2:4]>/<sha256><ext>.
+# The scraper writes the same layout (scraping/media_store.py), and the
+# backend_mediablob reference counts are kept by database triggers, so a file
+# is only removed once no Captive or CaptivePhoto points at it.
+BLOB_DIR = "blobs"
+HASH_CHUNK_SIZE = 1 << 20
+# A file saved (or found already stored) this recently may be about to get a
+# reference from a row not committed yet, so it is not deleted; gc_media
+# collects it later if it stays unreferenced.
+GRACE_SECONDS = 3600
+
+
+def blob_name(digest: str, ext: str) -> str:
+    return f"{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{ext.lower()}"
+
+
+def lock_blob(name: str):
+    # Creates the blob's row if needed and locks it for the current
+    # transaction; _save and delete both hold it while they touch the file.
+    from .models import MediaBlob
+
+    MediaBlob.objects.bulk_create([MediaBlob(name=name)], ignore_conflicts=True)
+    return MediaBlob.objects.select_for_update().get(name=name)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Same name means same bytes, so an existing file is never renamed.
+        return name
+
+    def _save(self, name, content):
+        sha = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            sha.update(chunk)
+        name = blob_name(sha.hexdigest(), Path(name).suffix or ".jpg")
+        path = Path(self.path(name))
+        with transaction.atomic():
+            # Under the row lock a concurrent delete has either removed the
+            # file already, or will see the fresh mtime and keep it.
+            lock_blob(name)
+            if path.exists():
+                os.utime(path)
+                return name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write aside and rename into place so concurrent writers of the
+            # same content never expose a partial file.
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    content.seek(0)
+                    for chunk in content.chunks(HASH_CHUNK_SIZE):
+                        f.write(chunk)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        return name
+
+    def delete(self, name) -> bool:
+        # Called after the referencing row is gone; the file stays while
+        # anything else still references the same content, or may be about
+        # to. Returns whether the file was removed.
+        from .derivatives import derivative_cache
+        from .models import MediaBlob
+
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob and blob.refcount > 0:
+                return False
+            if self.saved_recently(name):
+                return False
+            super().delete(name)
+            if blob:
+                blob.delete()
+        derivative_cache.delete(name)
+        return True
+
+    def saved_recently(self, name: str) -> bool:
+        try:
+            mtime = os.path.getmtime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return time.time() - mtime < GRACE_SECONDS
+
+    def blob_names(self):
+        # Every stored file, including ones no MediaBlob row knows about:
+        # written for a row whose transaction then rolled back.
+        root = Path(self.path(BLOB_DIR))
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                yield (Path(dirpath) / filename).relative_to(self.location).as_posix()
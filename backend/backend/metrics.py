@@ -0,0 +1,209 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+ROW_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000)
+
+registry = []
+
+
+class RequestTimings:
+    def __init__(self):
+        self.stages = {}
+        self.scans = {}
+
+
+request_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def label_str(self, values: tuple, extra: str = "") -> str:
+        parts = [f'{k}="{v}"' for k, v in zip(self.labels, values)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values = {}
+
+    def inc(self, amount: float = 1, *labels):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{self.label_str(labels)} {value}")
+        return lines
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: tuple = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = buckets
+        self.values = {}
+
+    def observe(self, value: float, *labels):
+        with self.lock:
+            entry = self.values.setdefault(labels, [[0] * len(self.buckets), 0.0, 0])
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self.lock:
+            for labels, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = self.label_str(labels, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                inf = self.label_str(labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf} {count}")
+                lines.append(f"{self.name}_sum{self.label_str(labels)} {total}")
+                lines.append(f"{self.name}_count{self.label_str(labels)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "findme_stage_seconds", "Time spent per request stage", ("view", "stage")
+)
+REQUEST_SECONDS = Histogram(
+    "findme_request_seconds", "Total request latency", ("view", "status")
+)
+ROWS_SCANNED = Histogram(
+    "findme_search_rows_scanned",
+    "Rows scanned per embedding search",
+    ("field",),
+    buckets=ROW_BUCKETS,
+)
+ROWS_SKIPPED = Counter(
+    "findme_search_rows_skipped_total",
+    "Rows skipped because of missing or malformed embeddings",
+    ("field",),
+)
+
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings = request_timings.get()
+        if timings is None:
+            STAGE_SECONDS.observe(elapsed, "", name)
+        else:
+            timings.stages[name] = timings.stages.get(name, 0.0) + elapsed
+
+
+def record_scan(field_name: str, scanned: int, skipped: int):
+    ROWS_SCANNED.observe(scanned, field_name)
+    if skipped:
+        ROWS_SKIPPED.inc(skipped, field_name)
+    timings = request_timings.get()
+    if timings is not None:
+        prev_scanned, prev_skipped = timings.scans.get(field_name, (0, 0))
+        timings.scans[field_name] = (prev_scanned + scanned, prev_skipped + skipped)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def finish_request(request, response, timings: RequestTimings, start: float):
+    match = getattr(request, "resolver_match", None)
+    view = match.url_name or match.view_name if match else ""
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - start, view, str(response.status_code)
+    )
+
+    entries = []
+    for name, elapsed in timings.stages.items():
+        STAGE_SECONDS.observe(elapsed, view, name)
+        entries.append(f"{name};dur={elapsed * 1000:.1f}")
+    for field_name, (scanned, skipped) in timings.scans.items():
+        entries.append(f'scan_{field_name};desc="scanned={scanned} skipped={skipped}"')
+    if entries:
+        response["Server-Timing"] = ", ".join(entries)
+    return response
+
+
+@sync_and_async_middleware
+def server_timing_middleware(get_response):
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            start = time.perf_counter()
+            timings = RequestTimings()
+            token = request_timings.set(timings)
+            try:
+                response = await get_response(request)
+            finally:
+                request_timings.reset(token)
+            return finish_request(request, response, timings, start)
+
+    else:
+
+        def middleware(request):
+            start = time.perf_counter()
+            timings = RequestTimings()
+            token = request_timings.set(timings)
+            try:
+                response = get_response(request)
+            finally:
+                request_timings.reset(token)
+            return finish_request(request, response, timings, start)
+
+    return middleware
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.4 on 2025-05-06 10:12
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import UnaccentExtension
+from django.db import migrations
+
+SEARCH_CONFIG_SQL = """
+CREATE TEXT SEARCH CONFIGURATION uk_unaccent (COPY = simple);
+ALTER TEXT SEARCH CONFIGURATION uk_unaccent
+    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple;
+"""
+
+SEARCH_TRIGGER_SQL = """
+CREATE FUNCTION backend_captive_search_text(value text) RETURNS text AS $$
+    SELECT translate(coalesce(value, ''), E'\\'’ʼ`', '');
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE FUNCTION backend_captive_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('uk_unaccent', backend_captive_search_text(NEW.name)), 'A') ||
+        setweight(to_tsvector('uk_unaccent',
+            backend_captive_search_text(NEW.brigade) || ' ' ||
+            backend_captive_search_text(NEW.settlement)), 'B') ||
+        setweight(to_tsvector('uk_unaccent', backend_captive_search_text(NEW.appearance)), 'C') ||
+        setweight(to_tsvector('uk_unaccent', backend_captive_search_text(NEW.circumstances)), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER backend_captive_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, brigade, settlement, appearance, circumstances
+    ON backend_captive
+    FOR EACH ROW EXECUTE FUNCTION backend_captive_search_vector_update();
+
+UPDATE backend_captive SET name = name;
+"""
+
+SEARCH_TRIGGER_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS backend_captive_search_vector_trigger ON backend_captive;
+DROP FUNCTION IF EXISTS backend_captive_search_vector_update();
+DROP FUNCTION IF EXISTS backend_captive_search_text(text);
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "backend",
+            "0004_captive_appearance_embedded_captive_picture_embedded_and_more",
+        ),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        migrations.RunSQL(
+            SEARCH_CONFIG_SQL,
+            reverse_sql="DROP TEXT SEARCH CONFIGURATION IF EXISTS uk_unaccent;",
+        ),
+        migrations.AddField(
+            model_name="captive",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="captive",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="captive_search_vector_gin"
+            ),
+        ),
+        migrations.RunSQL(SEARCH_TRIGGER_SQL, reverse_sql=SEARCH_TRIGGER_REVERSE_SQL),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.4 on 2025-05-08 14:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("backend", "0005_captive_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="captive",
+            index=models.Index(
+                fields=["status", "person_type"], name="captive_status_type_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="captive",
+            index=models.Index(fields=["region"], name="captive_region_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="captive",
+            index=models.Index(fields=["settlement"], name="captive_settlement_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="captive",
+            index=models.Index(fields=["brigade"], name="captive_brigade_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="captive",
+            index=models.Index(
+                fields=["date_of_birth"], name="captive_date_of_birth_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="captive",
+            index=models.Index(fields=["last_update"], name="captive_last_update_idx"),
+        ),
+    ]
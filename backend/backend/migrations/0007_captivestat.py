@@ -0,0 +1,96 @@
+# Generated by Django 5.1.4 on 2025-05-13 11:05
+
+from django.db import migrations, models
+
+STATS_TRIGGER_SQL = """
+CREATE FUNCTION backend_captive_stats_apply(c backend_captive, delta integer)
+RETURNS void AS $$
+BEGIN
+    INSERT INTO backend_captivestat (dimension, value, count) VALUES
+        ('status', coalesce(c.status, ''), delta),
+        ('person_type', coalesce(c.person_type, ''), delta),
+        ('region', coalesce(c.region, ''), delta),
+        ('brigade', coalesce(c.brigade, ''), delta),
+        ('day', to_char(c.last_update AT TIME ZONE 'UTC', 'YYYY-MM-DD')
+            || '|' || coalesce(c.status, ''), delta)
+    ON CONFLICT (dimension, value)
+        DO UPDATE SET count = backend_captivestat.count + EXCLUDED.count;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION backend_captive_stats_update() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND (OLD.status, OLD.person_type, OLD.region, OLD.brigade, OLD.last_update)
+        IS NOT DISTINCT FROM
+        (NEW.status, NEW.person_type, NEW.region, NEW.brigade, NEW.last_update) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM backend_captive_stats_apply(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM backend_captive_stats_apply(NEW, 1);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER backend_captive_stats_trigger
+    AFTER INSERT OR UPDATE OR DELETE ON backend_captive
+    FOR EACH ROW EXECUTE FUNCTION backend_captive_stats_update();
+
+INSERT INTO backend_captivestat (dimension, value, count)
+SELECT 'status', coalesce(status, ''), count(*) FROM backend_captive GROUP BY 2
+UNION ALL
+SELECT 'person_type', coalesce(person_type, ''), count(*) FROM backend_captive GROUP BY 2
+UNION ALL
+SELECT 'region', coalesce(region, ''), count(*) FROM backend_captive GROUP BY 2
+UNION ALL
+SELECT 'brigade', coalesce(brigade, ''), count(*) FROM backend_captive GROUP BY 2
+UNION ALL
+SELECT 'day', to_char(last_update AT TIME ZONE 'UTC', 'YYYY-MM-DD')
+    || '|' || coalesce(status, ''), count(*)
+FROM backend_captive GROUP BY 2;
+"""
+
+STATS_TRIGGER_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS backend_captive_stats_trigger ON backend_captive;
+DROP FUNCTION IF EXISTS backend_captive_stats_update();
+DROP FUNCTION IF EXISTS backend_captive_stats_apply(backend_captive, integer);
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("backend", "0006_captive_metadata_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CaptiveStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dimension", models.CharField(max_length=20)),
+                ("value", models.CharField(max_length=120)),
+                ("count", models.IntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("dimension", "value"),
+                        name="captive_stat_dimension_value",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(STATS_TRIGGER_SQL, reverse_sql=STATS_TRIGGER_REVERSE_SQL),
+    ]
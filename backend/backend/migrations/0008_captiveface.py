@@ -0,0 +1,61 @@
+# Generated by Django 5.1.4 on 2025-05-20 09:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Existing single-face embeddings become face 0 of their Captive; the
+# index_faces command re-detects every face from the stored pictures.
+BACKFILL_SQL = """
+INSERT INTO backend_captiveface (captive_id, face_index, embedding)
+SELECT id, 0, picture_embedded
+FROM backend_captive
+WHERE picture_embedded IS NOT NULL AND picture_embedded NOT IN ('', '[]');
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0007_captivestat"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CaptiveFace",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("face_index", models.PositiveSmallIntegerField(default=0)),
+                ("embedding", models.TextField()),
+                ("x", models.IntegerField(blank=True, null=True)),
+                ("y", models.IntegerField(blank=True, null=True)),
+                ("width", models.IntegerField(blank=True, null=True)),
+                ("height", models.IntegerField(blank=True, null=True)),
+                ("confidence", models.FloatField(blank=True, null=True)),
+                (
+                    "captive",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="faces",
+                        to="backend.captive",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["captive", "face_index"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("captive", "face_index"), name="captive_face_index"
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
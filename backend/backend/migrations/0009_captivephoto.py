@@ -0,0 +1,86 @@
+# Generated by Django 5.1.4 on 2025-05-22 15:18
+
+import backend.models
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0008_captiveface"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CaptivePhoto",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "image",
+                    models.ImageField(upload_to=backend.models.get_gallery_upload_path),
+                ),
+                (
+                    "uploaded_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "captive",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="photos",
+                        to="backend.captive",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["captive", "uploaded_at"],
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="captiveface",
+            options={"ordering": ["captive", "photo", "face_index"]},
+        ),
+        migrations.RemoveConstraint(
+            model_name="captiveface",
+            name="captive_face_index",
+        ),
+        migrations.AddField(
+            model_name="captiveface",
+            name="photo",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="faces",
+                to="backend.captivephoto",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="captiveface",
+            constraint=models.UniqueConstraint(
+                fields=("captive", "photo", "face_index"),
+                name="captive_photo_face_index",
+                nulls_distinct=False,
+            ),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.1.4 on 2025-05-27 12:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0009_captivephoto"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="captive",
+            name="matches_updated_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name="CaptiveMatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "signal",
+                    models.CharField(
+                        choices=[("appearance", "Appearance"), ("photo", "Photo")],
+                        max_length=20,
+                    ),
+                ),
+                ("score", models.FloatField()),
+                (
+                    "created_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "candidate",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="backend.captive",
+                    ),
+                ),
+                (
+                    "captive",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="matches",
+                        to="backend.captive",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["captive", "-score"],
+                "indexes": [
+                    models.Index(
+                        fields=["captive", "-score"], name="captive_match_score_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("captive", "candidate", "signal"),
+                        name="captive_match_unique",
+                    )
+                ],
+            },
+        ),
+    ]
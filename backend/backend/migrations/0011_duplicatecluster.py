@@ -0,0 +1,51 @@
+# Generated by Django 5.1.4 on 2025-06-03 11:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0010_captivematch"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DuplicateCluster",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.FloatField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending review"),
+                            ("confirmed", "Confirmed"),
+                            ("rejected", "Rejected"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "members",
+                    models.ManyToManyField(
+                        related_name="duplicate_clusters", to="backend.captive"
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["status", "-score"],
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.1.4 on 2025-06-10 09:27
+
+from django.db import migrations
+
+# One NOTIFY per statement (and per 500 ids), so bulk inserts from the scraper
+# do not flood listeners. The payload is
+# {"table": ..., "op": "INSERT|UPDATE|DELETE", "ids": [captive ids]}.
+NOTIFY_TRIGGER_SQL = """
+CREATE FUNCTION backend_notify_changes() RETURNS trigger AS $$
+DECLARE
+    id_column text := TG_ARGV[0];
+    changed text;
+    chunk bigint[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changed := format('SELECT %I FROM new_rows', id_column);
+    ELSIF TG_OP = 'UPDATE' THEN
+        changed := format(
+            'SELECT %1$I FROM new_rows UNION SELECT %1$I FROM old_rows', id_column
+        );
+    ELSE
+        changed := format('SELECT %I FROM old_rows', id_column);
+    END IF;
+    FOR chunk IN EXECUTE format(
+        'SELECT array_agg(id) FROM ('
+        '  SELECT id, (row_number() OVER () - 1) / 500 AS n'
+        '  FROM (SELECT DISTINCT id FROM (%s) c(id)) d'
+        ') s GROUP BY n',
+        changed
+    ) LOOP
+        PERFORM pg_notify(
+            'backend_changes',
+            json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'ids', chunk)::text
+        );
+    END LOOP;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+TABLES = {"backend_captive": "id", "backend_captiveface": "captive_id"}
+
+TRIGGERS_SQL = "".join(f"""
+CREATE TRIGGER {table}_notify_insert AFTER INSERT ON {table}
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION backend_notify_changes('{column}');
+CREATE TRIGGER {table}_notify_update AFTER UPDATE ON {table}
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION backend_notify_changes('{column}');
+CREATE TRIGGER {table}_notify_delete AFTER DELETE ON {table}
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION backend_notify_changes('{column}');
+""" for table, column in TABLES.items())
+
+REVERSE_SQL = "".join(f"""
+DROP TRIGGER IF EXISTS {table}_notify_insert ON {table};
+DROP TRIGGER IF EXISTS {table}_notify_update ON {table};
+DROP TRIGGER IF EXISTS {table}_notify_delete ON {table};
+""" for table in TABLES) + "DROP FUNCTION IF EXISTS backend_notify_changes();\n"
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("backend", "0011_duplicatecluster"),
+    ]
+
+    operations = [
+        migrations.RunSQL(NOTIFY_TRIGGER_SQL + TRIGGERS_SQL, REVERSE_SQL),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.1.4 on 2025-06-16 14:08
+
+from django.db import migrations, models
+
+MEDIA_REFS_TRIGGER_SQL = """
+CREATE FUNCTION backend_media_ref(blob text, delta integer) RETURNS void AS $$
+BEGIN
+    IF blob IS NULL OR blob = '' THEN
+        RETURN;
+    END IF;
+    INSERT INTO backend_mediablob (name, refcount) VALUES (blob, delta)
+    ON CONFLICT (name)
+        DO UPDATE SET refcount = backend_mediablob.refcount + EXCLUDED.refcount;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION backend_media_refs_update() RETURNS trigger AS $$
+DECLARE
+    old_name text;
+    new_name text;
+BEGIN
+    IF TG_TABLE_NAME = 'backend_captive' THEN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN old_name := OLD.picture; END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN new_name := NEW.picture; END IF;
+    ELSE
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN old_name := OLD.image; END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN new_name := NEW.image; END IF;
+    END IF;
+    IF old_name IS NOT DISTINCT FROM new_name THEN
+        RETURN NULL;
+    END IF;
+    PERFORM backend_media_ref(old_name, -1);
+    PERFORM backend_media_ref(new_name, 1);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER backend_captive_media_refs_trigger
+    AFTER INSERT OR UPDATE OF picture OR DELETE ON backend_captive
+    FOR EACH ROW EXECUTE FUNCTION backend_media_refs_update();
+
+CREATE TRIGGER backend_captivephoto_media_refs_trigger
+    AFTER INSERT OR UPDATE OF image OR DELETE ON backend_captivephoto
+    FOR EACH ROW EXECUTE FUNCTION backend_media_refs_update();
+
+INSERT INTO backend_mediablob (name, refcount)
+SELECT name, count(*) FROM (
+    SELECT picture AS name FROM backend_captive
+    UNION ALL
+    SELECT image FROM backend_captivephoto
+) refs
+WHERE name IS NOT NULL AND name <> ''
+GROUP BY name;
+"""
+
+MEDIA_REFS_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS backend_captive_media_refs_trigger ON backend_captive;
+DROP TRIGGER IF EXISTS backend_captivephoto_media_refs_trigger ON backend_captivephoto;
+DROP FUNCTION IF EXISTS backend_media_refs_update();
+DROP FUNCTION IF EXISTS backend_media_ref(text, integer);
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("backend", "0012_change_notifications"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaBlob",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                ("refcount", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunSQL(MEDIA_REFS_TRIGGER_SQL, MEDIA_REFS_REVERSE_SQL),
+    ]
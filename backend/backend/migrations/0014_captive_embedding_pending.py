@@ -0,0 +1,26 @@
+# Generated by Django 5.1.4 on 2025-06-24 10:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0013_mediablob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="captive",
+            name="embedding_pending",
+            field=models.BooleanField(default=False, db_default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="captive",
+            index=models.Index(
+                condition=models.Q(("embedding_pending", True)),
+                fields=["embedding_pending"],
+                name="captive_embedding_pending_idx",
+            ),
+        ),
+    ]
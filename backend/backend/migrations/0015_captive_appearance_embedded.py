@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2025-07-01 09:12
+
+from django.db import migrations, models
+
+# The field was in the model since 0004 but no migration created the column;
+# existing databases got it by hand, so it is only added where missing.
+ADD_COLUMN_SQL = """
+ALTER TABLE backend_captive ADD COLUMN IF NOT EXISTS appearance_embedded text NULL;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0014_captive_embedding_pending"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    ADD_COLUMN_SQL,
+                    "ALTER TABLE backend_captive DROP COLUMN appearance_embedded;",
+                ),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name="captive",
+                    name="appearance_embedded",
+                    field=models.TextField(blank=True, null=True),
+                ),
+            ],
+        ),
+    ]
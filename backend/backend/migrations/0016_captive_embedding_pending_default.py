@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2025-07-02 08:40
+
+from django.db import migrations
+
+# 0014 first shipped without db_default, which left the column NOT NULL with
+# no default and broke the scraper's raw INSERTs. Databases migrated before
+# 0014 was fixed get the default here; for the rest this is a no-op.
+SET_DEFAULT_SQL = """
+ALTER TABLE backend_captive ALTER COLUMN embedding_pending SET DEFAULT false;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0015_captive_appearance_embedded"),
+    ]
+
+    operations = [
+        migrations.RunSQL(SET_DEFAULT_SQL, migrations.RunSQL.noop),
+    ]
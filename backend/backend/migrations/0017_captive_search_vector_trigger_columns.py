@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2025-07-02 09:05
+
+from django.db import migrations
+
+# 0005 first fired the trigger on every UPDATE, recomputing the tsvector for
+# bulk updates of matches_updated_at, embedding_pending and the embeddings.
+# Recreated here for databases migrated before 0005 was fixed.
+TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS backend_captive_search_vector_trigger ON backend_captive;
+CREATE TRIGGER backend_captive_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, brigade, settlement, appearance, circumstances
+    ON backend_captive
+    FOR EACH ROW EXECUTE FUNCTION backend_captive_search_vector_update();
+"""
+
+TRIGGER_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS backend_captive_search_vector_trigger ON backend_captive;
+CREATE TRIGGER backend_captive_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON backend_captive
+    FOR EACH ROW EXECUTE FUNCTION backend_captive_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0016_captive_embedding_pending_default"),
+    ]
+
+    operations = [
+        migrations.RunSQL(TRIGGER_SQL, TRIGGER_REVERSE_SQL),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.1.4 on 2025-07-02 09:30
+
+import importlib
+from django.db import migrations
+
+# 0007 updated the hot backend_captivestat rows once per changed Captive, so
+# concurrent writers serialized on them and could deadlock by touching them
+# in different orders. The deltas are now summed per statement from the
+# transition tables and applied in one key order.
+DELTA_SQL = """
+        WITH changed AS ({changed}),
+        deltas AS (
+            SELECT key.dimension, key.value, sum(changed.delta) AS delta
+            FROM changed CROSS JOIN LATERAL (VALUES
+                ('status', coalesce(changed.status, '')),
+                ('person_type', coalesce(changed.person_type, '')),
+                ('region', coalesce(changed.region, '')),
+                ('brigade', coalesce(changed.brigade, '')),
+                ('day', to_char(changed.last_update AT TIME ZONE 'UTC', 'YYYY-MM-DD')
+                    || '|' || coalesce(changed.status, ''))
+            ) AS key(dimension, value)
+            GROUP BY 1, 2
+        )
+        INSERT INTO backend_captivestat (dimension, value, count)
+        SELECT dimension, value, delta FROM deltas WHERE delta <> 0
+        ORDER BY dimension, value
+        ON CONFLICT (dimension, value)
+            DO UPDATE SET count = backend_captivestat.count + EXCLUDED.count;
+"""
+COLUMNS = "status, person_type, region, brigade, last_update"
+NEW_ROWS = f"SELECT {COLUMNS}, 1 AS delta FROM new_rows"
+OLD_ROWS = f"SELECT {COLUMNS}, -1 AS delta FROM old_rows"
+
+STATS_TRIGGER_SQL = f"""
+DROP TRIGGER IF EXISTS backend_captive_stats_trigger ON backend_captive;
+DROP FUNCTION IF EXISTS backend_captive_stats_update();
+DROP FUNCTION IF EXISTS backend_captive_stats_apply(backend_captive, integer);
+
+CREATE FUNCTION backend_captive_stats_statement() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {DELTA_SQL.format(changed=NEW_ROWS)}
+    ELSIF TG_OP = 'UPDATE' THEN
+        {DELTA_SQL.format(changed=f"{NEW_ROWS} UNION ALL {OLD_ROWS}")}
+    ELSE
+        {DELTA_SQL.format(changed=OLD_ROWS)}
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER backend_captive_stats_insert
+    AFTER INSERT ON backend_captive REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION backend_captive_stats_statement();
+CREATE TRIGGER backend_captive_stats_update
+    AFTER UPDATE ON backend_captive
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION backend_captive_stats_statement();
+CREATE TRIGGER backend_captive_stats_delete
+    AFTER DELETE ON backend_captive REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION backend_captive_stats_statement();
+"""
+
+# Back to 0007's row trigger, recounting from scratch.
+STATS_TRIGGER_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS backend_captive_stats_insert ON backend_captive;
+DROP TRIGGER IF EXISTS backend_captive_stats_update ON backend_captive;
+DROP TRIGGER IF EXISTS backend_captive_stats_delete ON backend_captive;
+DROP FUNCTION IF EXISTS backend_captive_stats_statement();
+DELETE FROM backend_captivestat;
+""" + importlib.import_module("backend.migrations.0007_captivestat").STATS_TRIGGER_SQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0017_captive_search_vector_trigger_columns"),
+    ]
+
+    operations = [
+        migrations.RunSQL(STATS_TRIGGER_SQL, STATS_TRIGGER_REVERSE_SQL),
+    ]
@@ -1,16 +1,14 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import User
-from django.conf import settings
-from pathlib import Path
 from django.utils import timezone
-import shutil
 
 
 def get_upload_path(instance, filename):
-    base_dir = Path("captives")
-    if instance.pk is None:
-        return str(base_dir / "temp" / filename)
-    return str(base_dir / str(instance.pk) / filename)
+    # The content-addressed storage picks the final path; only the
+    # extension of the upload is kept.
+    return filename
 
 
 class Captive(models.Model):
@@ -48,57 +46,189 @@ class Captive(models.Model):
     appearance_embedded = models.TextField(blank=True, null=True)
     picture_embedded = models.TextField(blank=True, null=True)
     last_update = models.DateTimeField(default=timezone.now)
+    matches_updated_at = models.DateTimeField(blank=True, null=True, editable=False)
+    # Set by bulk ingest until embed_pending has embedded the record.
+    embedding_pending = models.BooleanField(
+        default=False, db_default=False, editable=False
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="captive_search_vector_gin"),
+            models.Index(
+                fields=["status", "person_type"], name="captive_status_type_idx"
+            ),
+            models.Index(fields=["region"], name="captive_region_idx"),
+            models.Index(fields=["settlement"], name="captive_settlement_idx"),
+            models.Index(fields=["brigade"], name="captive_brigade_idx"),
+            models.Index(fields=["date_of_birth"], name="captive_date_of_birth_idx"),
+            models.Index(fields=["last_update"], name="captive_last_update_idx"),
+            models.Index(
+                fields=["embedding_pending"],
+                condition=models.Q(embedding_pending=True),
+                name="captive_embedding_pending_idx",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_picture = instance.__dict__.get("picture")
+        return instance
 
     def save(self, *args, **kwargs):
-        is_new = self.pk is None
-        old_picture_name = None
-
-        if not is_new and self.picture:
-            try:
-                old_instance = Captive.objects.get(pk=self.pk)
-                old_picture_name = (
-                    old_instance.picture.name if old_instance.picture else None
-                )
-            except Captive.DoesNotExist:
-                pass
-
         super().save(*args, **kwargs)
+        old_picture = getattr(self, "_loaded_picture", None)
+        if old_picture and old_picture != self.picture.name:
+            self.picture.storage.delete(old_picture)
+        self._loaded_picture = self.picture.name
+
+    def delete(self, *args, **kwargs):
+        # Files are released after the rows are gone, so their reference
+        # counts no longer include this Captive.
+        files = [self.picture] if self.picture else []
+        files += [photo.image for photo in self.photos.all()]
+        result = super().delete(*args, **kwargs)
+        for file in files:
+            file.storage.delete(file.name)
+        return result
+
+    def __str__(self):
+        person_type_dict = dict(self.PERSON_TYPE_CHOICES)
+        return (
+            f"{self.name} ({person_type_dict.get(self.person_type, self.person_type)})"
+        )
+
 
-        if self.picture:
-            if is_new or (old_picture_name and old_picture_name != self.picture.name):
-                current_path = Path(settings.MEDIA_ROOT) / self.picture.name
+class CaptiveStat(models.Model):
+    dimension = models.CharField(max_length=20)
+    value = models.CharField(max_length=120)
+    count = models.IntegerField(default=0)
 
-                new_relative_path = Path("captives") / str(self.pk) / current_path.name
-                new_full_path = Path(settings.MEDIA_ROOT) / new_relative_path
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dimension", "value"], name="captive_stat_dimension_value"
+            ),
+        ]
 
-                new_full_path.parent.mkdir(parents=True, exist_ok=True)
+    def __str__(self):
+        return f"{self.dimension}={self.value}: {self.count}"
+
+
+def get_gallery_upload_path(instance, filename):
+    return get_upload_path(instance, filename)
 
-                if current_path.exists():
-                    current_path.rename(new_full_path)
-                    self.picture.name = str(new_relative_path)
-                    super().save(update_fields=["picture"])
 
-                temp_dir = Path(settings.MEDIA_ROOT) / "captives" / "temp"
-                if temp_dir.exists() and not any(temp_dir.iterdir()):
-                    shutil.rmtree(temp_dir)
+class CaptivePhoto(models.Model):
+    captive = models.ForeignKey(
+        Captive, on_delete=models.CASCADE, related_name="photos"
+    )
+    image = models.ImageField(upload_to=get_gallery_upload_path)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    uploaded_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["captive", "uploaded_at"]
 
     def delete(self, *args, **kwargs):
-        if self.picture:
-            try:
-                picture_path = Path(settings.MEDIA_ROOT) / self.picture.name
-                if picture_path.exists():
-                    picture_path.unlink()
+        result = super().delete(*args, **kwargs)
+        self.image.storage.delete(self.image.name)
+        return result
+
+    def __str__(self):
+        return f"{self.captive_id} photo {self.pk}"
 
-                dir_path = picture_path.parent
-                if dir_path.exists() and not any(dir_path.iterdir()):
-                    shutil.rmtree(dir_path)
-            except Exception as e:
-                print(f"Error deleting file: {e}")
 
-        return super().delete(*args, **kwargs)
+class CaptiveFace(models.Model):
+    captive = models.ForeignKey(Captive, on_delete=models.CASCADE, related_name="faces")
+    # Null for faces of the Captive's main picture.
+    photo = models.ForeignKey(
+        CaptivePhoto,
+        on_delete=models.CASCADE,
+        related_name="faces",
+        blank=True,
+        null=True,
+    )
+    face_index = models.PositiveSmallIntegerField(default=0)
+    embedding = models.TextField()
+    x = models.IntegerField(blank=True, null=True)
+    y = models.IntegerField(blank=True, null=True)
+    width = models.IntegerField(blank=True, null=True)
+    height = models.IntegerField(blank=True, null=True)
+    confidence = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["captive", "photo", "face_index"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["captive", "photo", "face_index"],
+                name="captive_photo_face_index",
+                nulls_distinct=False,
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.captive_id} face {self.face_index}"
+
+
+class CaptiveMatch(models.Model):
+    SIGNAL_CHOICES = [
+        ("appearance", "Appearance"),
+        ("photo", "Photo"),
+    ]
+
+    captive = models.ForeignKey(
+        Captive, on_delete=models.CASCADE, related_name="matches"
+    )
+    candidate = models.ForeignKey(Captive, on_delete=models.CASCADE, related_name="+")
+    signal = models.CharField(max_length=20, choices=SIGNAL_CHOICES)
+    score = models.FloatField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["captive", "-score"]
+        indexes = [
+            models.Index(fields=["captive", "-score"], name="captive_match_score_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["captive", "candidate", "signal"], name="captive_match_unique"
+            ),
+        ]
 
     def __str__(self):
-        person_type_dict = dict(self.PERSON_TYPE_CHOICES)
         return (
-            f"{self.name} ({person_type_dict.get(self.person_type, self.person_type)})"
+            f"{self.captive_id} -> {self.candidate_id} ({self.signal} {self.score:.3f})"
         )
+
+
+class DuplicateCluster(models.Model):
+    STATUS_CHOICES = [
+        ("pending", "Pending review"),
+        ("confirmed", "Confirmed"),
+        ("rejected", "Rejected"),
+    ]
+
+    members = models.ManyToManyField(Captive, related_name="duplicate_clusters")
+    # Weakest link holding the cluster together.
+    score = models.FloatField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["status", "-score"]
+
+    def __str__(self):
+        return f"Cluster {self.pk} ({self.status} {self.score:.3f})"
+
+
+class MediaBlob(models.Model):
+    # Maintained by database triggers on Captive.picture and CaptivePhoto.image
+    # (see migration 0013), so the scraper's raw inserts are counted too.
+    name = models.CharField(max_length=255, primary_key=True)
+    refcount = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
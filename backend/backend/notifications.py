@@ -0,0 +1,103 @@
+import asyncio
+import json
+import logging
+import threading
+import psycopg
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import close_old_connections, connections
+from .autocomplete import AUTOCOMPLETE_FIELDS, autocomplete_index
+from .embeddings import MODEL_DIMENSIONS
+from .models import Captive
+from .stats import STATS_CACHE_KEY
+from .vector_index import vector_indexes
+
+# Triggers from migration 0012 NOTIFY this channel for every statement that
+# touches backend_captive or backend_captiveface, whoever runs it (the API,
+# the scraper, psql).
+CHANNEL = "backend_changes"
+BATCH_DELAY = 0.2
+RECONNECT_DELAY = 5
+
+logger = logging.getLogger(__name__)
+
+
+def apply_changes(changes: dict[str, set[int]]):
+    captive_ids = changes.get("backend_captive", set())
+    face_ids = changes.get("backend_captiveface", set())
+    try:
+        if captive_ids:
+            rows = Captive.objects.filter(pk__in=captive_ids).values_list(
+                "pk", *AUTOCOMPLETE_FIELDS
+            )
+            found = set()
+            for pk, *values in rows:
+                autocomplete_index.update(pk, tuple(values))
+                found.add(pk)
+            for pk in captive_ids - found:
+                autocomplete_index.remove(pk)
+            cache.delete(STATS_CACHE_KEY)
+            vector_indexes.refresh(captive_ids, fields=tuple(MODEL_DIMENSIONS))
+        if face_ids:
+            vector_indexes.refresh(face_ids, fields=("faces",))
+    finally:
+        close_old_connections()
+
+
+def invalidate_all():
+    # Notifications sent while disconnected are lost, so start over.
+    autocomplete_index.invalidate()
+    cache.delete(STATS_CACHE_KEY)
+    vector_indexes.invalidate()
+
+
+class ChangeListener:
+    def __init__(self):
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(
+                target=asyncio.run,
+                args=(self.run(),),
+                name="change-listener",
+                daemon=True,
+            )
+            self.thread.start()
+
+    async def run(self):
+        connected_before = False
+        while True:
+            try:
+                await self.listen(resync=connected_before)
+            except Exception:
+                logger.exception("Change listener disconnected")
+            connected_before = True
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def listen(self, resync: bool):
+        params = connections["default"].get_connection_params()
+        params.pop("cursor_factory")  # Django's cursor class is sync-only.
+        async with await psycopg.AsyncConnection.connect(
+            **params, autocommit=True
+        ) as conn:
+            await conn.execute(f"LISTEN {CHANNEL}")
+            if resync:
+                await sync_to_async(invalidate_all)()
+            while True:
+                changes = {}
+                async for notify in conn.notifies(stop_after=1):
+                    self.collect(changes, notify)
+                # Let a burst of statements (a scraper batch) land first.
+                async for notify in conn.notifies(timeout=BATCH_DELAY):
+                    self.collect(changes, notify)
+                if changes:
+                    await sync_to_async(apply_changes)(changes)
+
+    @staticmethod
+    def collect(changes: dict[str, set[int]], notify):
+        payload = json.loads(notify.payload)
+        changes.setdefault(payload["table"], set()).update(payload["ids"])
+
+
+change_listener = ChangeListener()
@@ -0,0 +1,87 @@
+import threading
+import time
+from django.conf import settings
+
+# DeepFace pulls in TensorFlow, which costs seconds and hundreds of MB per
+# process; it and the OpenAI client are only loaded when first needed, or by
+# warm_up() in server processes.
+FACE_MODEL = "SFace"
+FACE_DETECTOR = "opencv"
+
+_lock = threading.Lock()
+_openai_client = None
+_deepface = None
+_models_built = False
+warmup_state = {"started": None, "finished": None, "error": None}
+
+
+def openai_client():
+    global _openai_client
+    if _openai_client is None:
+        with _lock:
+            if _openai_client is None:
+                from findme_openai.client import ResilientOpenAI
+
+                _openai_client = ResilientOpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    base_url=settings.OPENAI_BASE_URL,
+                    timeout=settings.OPENAI_TIMEOUT,
+                    max_attempts=settings.OPENAI_MAX_ATTEMPTS,
+                    retry_budget=settings.OPENAI_RETRY_BUDGET,
+                    concurrency=settings.OPENAI_CONCURRENCY,
+                )
+    return _openai_client
+
+
+def deepface():
+    global _deepface
+    if _deepface is None:
+        with _lock:
+            if _deepface is None:
+                from deepface import DeepFace
+
+                _deepface = DeepFace
+    return _deepface
+
+
+def warm_up():
+    global _models_built
+    warmup_state.update(started=time.time(), finished=None, error=None)
+    try:
+        if settings.AI_BACKEND != "stub":
+            openai_client()
+            DeepFace = deepface()
+            DeepFace.build_model(FACE_MODEL)
+            DeepFace.build_model(FACE_DETECTOR, task="face_detector")
+        _models_built = True
+    except Exception as e:
+        warmup_state["error"] = repr(e)
+        raise
+    finally:
+        warmup_state["finished"] = time.time()
+
+
+def warm_up_in_background() -> threading.Thread:
+    def run():
+        try:
+            warm_up()
+        except Exception:
+            pass  # Kept in warmup_state and reported by the readiness endpoint.
+
+    thread = threading.Thread(target=run, name="ai-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness() -> dict:
+    return {
+        # Without AI_WARMUP models load on first use, so the worker is ready.
+        "ready": _models_built
+        or settings.AI_BACKEND == "stub"
+        or not settings.AI_WARMUP,
+        "backend": settings.AI_BACKEND,
+        "openai_client": _openai_client is not None,
+        "deepface_imported": _deepface is not None,
+        "models_built": _models_built,
+        "warmup": warmup_state,
+    }
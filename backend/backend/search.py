@@ -0,0 +1,21 @@
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+
+SEARCH_CONFIG = "uk_unaccent"
+APOSTROPHES = re.compile("['’ʼ`]")
+
+
+def normalize_query(text: str) -> str:
+    return APOSTROPHES.sub("", text).strip()
+
+
+def full_text_search(qs, text: str):
+    query = SearchQuery(
+        normalize_query(text), config=SEARCH_CONFIG, search_type="websearch"
+    )
+    return (
+        qs.filter(search_vector=query)
+        .annotate(rank=SearchRank(F("search_vector"), query))
+        .order_by("-rank", "-last_update")
+    )
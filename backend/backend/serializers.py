@@ -1,8 +1,17 @@
 from django.contrib.auth.models import Group, User
+import base64
+import binascii
+import io
+from PIL import Image
 from rest_framework import serializers  # type: ignore
-from .models import Captive
+from .derivatives import derivative_urls
+from .models import Captive, CaptiveMatch, CaptivePhoto
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from django.core.files.base import ContentFile
+
+# Pillow format names whose usual extension is not the lowercased name.
+PICTURE_EXTENSIONS = {"JPEG": ".jpg", "MPO": ".jpg"}
 
 
 class LoginSerializer(serializers.Serializer):
@@ -68,11 +77,77 @@ class GroupSerializer(serializers.HyperlinkedModelSerializer):
 
 class CaptiveSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    picture_derivatives = serializers.SerializerMethodField()
 
     class Meta:
         model = Captive
-        fields = "__all__"
+        exclude = ["search_vector", "matches_updated_at"]
 
     def create(self, validated_data):
         validated_data["user"] = self.context["request"].user
         return super().create(validated_data)
+
+    def get_picture_derivatives(self, obj):
+        if not obj.picture:
+            return None
+        return derivative_urls(obj.picture.name, self.context.get("request"))
+
+
+class CaptiveIngestSerializer(serializers.ModelSerializer):
+    # Base64 image data (a data: URI prefix is allowed), checked with Pillow
+    # like ImageField checks uploads.
+    picture = serializers.CharField(required=False, write_only=True)
+
+    class Meta:
+        model = Captive
+        fields = [
+            "name",
+            "person_type",
+            "brigade",
+            "date_of_birth",
+            "status",
+            "region",
+            "settlement",
+            "circumstances",
+            "appearance",
+            "last_update",
+            "picture",
+        ]
+
+    def validate_picture(self, value):
+        try:
+            data = base64.b64decode(
+                value.partition("base64,")[2] or value, validate=True
+            )
+        except (binascii.Error, ValueError):
+            raise serializers.ValidationError("Picture must be base64-encoded")
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                img.verify()
+                fmt = img.format
+        except Exception:
+            raise serializers.ValidationError("Picture must be a valid image")
+        # Named for the detected format: stored and served with its extension.
+        ext = PICTURE_EXTENSIONS.get(fmt, f".{fmt.lower()}")
+        return ContentFile(data, name=f"picture{ext}")
+
+
+class CaptivePhotoSerializer(serializers.ModelSerializer):
+    # Annotated by the view (Count("faces")) instead of a query per photo.
+    faces = serializers.IntegerField(source="face_count", read_only=True)
+    derivatives = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CaptivePhoto
+        fields = ["id", "image", "uploaded_at", "faces", "derivatives"]
+
+    def get_derivatives(self, obj):
+        return derivative_urls(obj.image.name, self.context.get("request"))
+
+
+class CaptiveMatchSerializer(serializers.ModelSerializer):
+    candidate = CaptiveSerializer(read_only=True)
+
+    class Meta:
+        model = CaptiveMatch
+        fields = ["candidate", "signal", "score", "created_at"]
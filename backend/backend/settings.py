@@ -18,12 +18,60 @@ from dotenv import load_dotenv
 load_dotenv()  # Load from .env file
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Calls go through findme_openai.client (shared/): per-model request/token
+# budgets, adaptive concurrency starting at OPENAI_CONCURRENCY, jittered
+# retries and a per-attempt timeout. A call that would wait longer than
+# OPENAI_RETRY_BUDGET seconds in total (OPENAI_SEARCH_RETRY_BUDGET for
+# searches a user is waiting on) fails with a 503 instead. OPENAI_BASE_URL
+# points at another server, e.g. "manage.py fake_openai" for testing.
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "20"))
+OPENAI_MAX_ATTEMPTS = int(os.getenv("OPENAI_MAX_ATTEMPTS", "4"))
+OPENAI_RETRY_BUDGET = float(os.getenv("OPENAI_RETRY_BUDGET", "60"))
+OPENAI_SEARCH_RETRY_BUDGET = float(os.getenv("OPENAI_SEARCH_RETRY_BUDGET", "5"))
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "8"))
+OPENAI_HEDGE_AFTER = float(os.getenv("OPENAI_HEDGE_AFTER", "1.0"))
+
+# "live" calls OpenAI and DeepFace, "stub" returns deterministic vectors after
+# AI_STUB_LATENCY seconds (used for load tests and benchmarks).
+AI_BACKEND = os.getenv("AI_BACKEND", "live")
+AI_STUB_LATENCY = float(os.getenv("AI_STUB_LATENCY", "0"))
+# Load DeepFace models when an ASGI/WSGI worker boots instead of on the first
+# photo request; /ready answers 503 until they are loaded.
+AI_WARMUP = os.getenv("AI_WARMUP", "false").lower() in ("1", "true", "yes")
+
+# Vector search per embedding field ("faces" is the CaptiveFace table). "scan"
+# streams every row from the database per query; a backend.vector_index mode
+# keeps an in-memory index instead, e.g. "int8:rerank=200" (candidates re-ranked
+# exactly). Changed Captives are patched into built indexes as they are saved
+# and the indexes are rebuilt every VECTOR_INDEX_TTL seconds.
+VECTOR_SEARCH_MODES = {
+    "appearance_embedded": os.getenv("APPEARANCE_SEARCH_MODE", "scan"),
+    "faces": os.getenv("PHOTO_SEARCH_MODE", "scan"),
+}
+VECTOR_INDEX_TTL = int(os.getenv("VECTOR_INDEX_TTL", "300"))
+# ASGI/WSGI workers LISTEN for the change notifications sent by database
+# triggers and apply them to in-process caches, including the scraper's writes.
+CHANGE_NOTIFICATIONS = os.getenv("CHANGE_NOTIFICATIONS", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR.parent / "data" / "media"
+# Resized pictures made on first request (backend.derivatives); least recently
+# used files are evicted once the directory outgrows DERIVATIVE_CACHE_MB.
+DERIVATIVE_ROOT = MEDIA_ROOT / "derivatives"
+DERIVATIVE_CACHE_BYTES = int(os.getenv("DERIVATIVE_CACHE_MB", "1024")) * 2**20
+
+STORAGES = {
+    "default": {"BACKEND": "backend.media_store.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -46,6 +94,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "backend",
@@ -54,7 +103,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "backend.metrics.server_timing_middleware",
+    "backend.db_router.replica_routing_middleware",
+    "backend.middleware.AsyncWhiteNoiseMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -75,6 +126,10 @@ CSRF_TRUSTED_ORIGINS = [
     "http://127.0.0.1:5173",
 ]
 CORS_ALLOW_CREDENTIALS = True
+CORS_EXPOSE_HEADERS = ["Server-Timing"]
+# /metrics answers staff users, and scrapers sending
+# "Authorization: Bearer $METRICS_TOKEN"; everyone else gets a 404.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
 ROOT_URLCONF = "backend.urls"
 
 TEMPLATES = [
@@ -99,6 +154,18 @@ WSGI_APPLICATION = "backend.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Each worker process keeps a psycopg connection pool of up to
+# DB_POOL_MAX_SIZE connections (0 disables it). Under ASGI every request does
+# its ORM work on a fresh thread, so per-thread persistent connections
+# (CONN_MAX_AGE) would still be opened per request; the pool lends connections
+# across threads. Without the pool DB_CONN_MAX_AGE applies. Connections are
+# health-checked before use either way.
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "0"))
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -107,9 +174,52 @@ DATABASES = {
         "PASSWORD": os.environ.get("DB_PASSWORD"),
         "HOST": os.environ.get("DB_HOST"),
         "PORT": os.environ.get("DB_PORT"),
+        "CONN_MAX_AGE": 0 if DB_POOL_MAX_SIZE else DB_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": (
+            {
+                "pool": {
+                    "min_size": min(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE),
+                    "max_size": DB_POOL_MAX_SIZE,
+                    "timeout": DB_POOL_TIMEOUT,
+                    "max_lifetime": DB_POOL_MAX_LIFETIME,
+                }
+            }
+            if DB_POOL_MAX_SIZE
+            else {}
+        ),
     }
 }
 
+# Read replicas as comma-separated "host[:port]", same database name and
+# credentials as the primary (e.g. the compose "replica" profile). Request
+# reads go to a random healthy replica (backend.db_router); one that is down,
+# not streaming from the primary or more than REPLICA_MAX_LAG seconds behind
+# is skipped until the next check, REPLICA_CHECK_INTERVAL seconds later.
+# After a client writes through CaptiveViewSet it reads from the primary for
+# REPLICA_STICKY_SECONDS.
+DB_REPLICAS = [
+    replica.strip()
+    for replica in os.getenv("DB_REPLICAS", "").split(",")
+    if replica.strip()
+]
+for number, replica in enumerate(DB_REPLICAS, 1):
+    host, _, port = replica.partition(":")
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["backend.db_router.ReplicaRouter"]
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+
+# GET /captives/, /captives/<id>/ and /captives/search/ are served by async
+# views on the async ORM; false routes them back to the DRF viewset.
+ASYNC_READS = os.getenv("ASYNC_READS", "true").lower() in ("1", "true", "yes")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -0,0 +1,43 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .autocomplete import autocomplete_index, captive_values
+from .models import Captive, CaptivePhoto
+from .stats import STATS_CACHE_KEY
+from .vector_index import vector_indexes
+
+# In-process caches are updated once the change commits, so a rolled-back
+# write never leaves phantom rows in them.
+
+
+@receiver(post_save, sender=Captive)
+def captive_saved(sender, instance, **kwargs):
+    values = captive_values(instance)
+
+    def changed():
+        autocomplete_index.update(instance.pk, values)
+        cache.delete(STATS_CACHE_KEY)
+        vector_indexes.refresh([instance.pk])
+
+    transaction.on_commit(changed)
+
+
+@receiver(post_delete, sender=Captive)
+def captive_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+
+    def deleted():
+        autocomplete_index.remove(pk)
+        cache.delete(STATS_CACHE_KEY)
+        vector_indexes.refresh([pk])
+
+    transaction.on_commit(deleted)
+
+
+@receiver(post_delete, sender=CaptivePhoto)
+def captive_photo_deleted(sender, instance, **kwargs):
+    captive_id = instance.captive_id
+    transaction.on_commit(
+        lambda: vector_indexes.refresh([captive_id], fields=("faces",))
+    )
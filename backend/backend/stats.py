@@ -0,0 +1,33 @@
+from datetime import timedelta
+from django.core.cache import cache
+from django.utils import timezone
+from .models import CaptiveStat
+
+STATS_CACHE_KEY = "captive_stats"
+STATS_CACHE_TTL = 30
+STATS_TREND_DAYS = 90
+STATS_DIMENSIONS = ("status", "person_type", "region", "brigade")
+
+
+def compute_stats() -> dict:
+    cutoff = (timezone.now() - timedelta(days=STATS_TREND_DAYS)).strftime("%Y-%m-%d")
+    stats = {dimension: {} for dimension in STATS_DIMENSIONS}
+    trend = []
+    rows = CaptiveStat.objects.filter(count__gt=0).values_list(
+        "dimension", "value", "count"
+    )
+    for dimension, value, count in rows:
+        if dimension == "day":
+            day, _, status = value.partition("|")
+            if day >= cutoff:
+                trend.append({"day": day, "status": status, "count": count})
+        elif dimension in stats:
+            stats[dimension][value] = count
+
+    stats["total"] = sum(stats["status"].values())
+    stats["trend"] = sorted(trend, key=lambda x: (x["day"], x["status"]))
+    return stats
+
+
+def captive_stats() -> dict:
+    return cache.get_or_set(STATS_CACHE_KEY, compute_stats, STATS_CACHE_TTL)
@@ -0,0 +1,27 @@
+from django.test import TestCase
+from backend.autocomplete import AutocompleteIndex, PrefixIndex, captive_values
+from backend.models import Captive
+
+VALUES = ["Іван Петренко", "іван петренко", "Петро Іванів", None, "Іван Сидоренко"]
+
+
+class PrefixIndexTests(TestCase):
+    def test_extend_matches_adding_one_by_one(self):
+        built, added = PrefixIndex(), PrefixIndex()
+        built.extend(VALUES)
+        for value in VALUES:
+            added.add(value)
+        self.assertEqual(built.keys, added.keys)
+        self.assertEqual(built.counts, added.counts)
+        self.assertEqual(built.keys, sorted(built.keys))
+
+    def test_built_index_takes_incremental_updates(self):
+        Captive.objects.create(name="Іван Петренко")
+        index = AutocompleteIndex()
+        index.ensure_built()
+        captive = Captive(pk=10**6, name="Іванна Коваль")
+        index.update(captive.pk, captive_values(captive))
+        self.assertEqual(
+            {match["value"] for match in index.lookup("name", "іван")},
+            {"Іван Петренко", "Іванна Коваль"},
+        )
@@ -0,0 +1,93 @@
+import threading
+import time
+from unittest import mock
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from backend import db_router
+from backend.db_router import (
+    PIN_COOKIE,
+    ReplicaHealth,
+    ReplicaRouter,
+    finish_routing,
+    pin_to_primary,
+    start_routing,
+)
+from backend.models import Captive
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        token = db_router.routing_state.set(None)
+        self.addCleanup(db_router.routing_state.reset, token)
+        self.enterContext(
+            mock.patch.object(db_router, "replica_aliases", return_value=["replica1"])
+        )
+        self.healthy = self.enterContext(
+            mock.patch.object(db_router.replica_health, "healthy", return_value=True)
+        )
+        self.router = ReplicaRouter()
+
+    def route(self, cookies=None):
+        request = RequestFactory().get("/captives/")
+        request.COOKIES.update(cookies or {})
+        return start_routing(request)
+
+    def test_reads_outside_a_request_use_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Captive), DEFAULT_DB_ALIAS)
+
+    def test_request_reads_use_a_healthy_replica(self):
+        self.route()
+        self.assertEqual(self.router.db_for_read(Captive), "replica1")
+        self.healthy.return_value = False
+        self.assertEqual(self.router.db_for_read(Captive), DEFAULT_DB_ALIAS)
+
+    def test_reads_inside_transactions_use_the_primary(self):
+        self.route()
+        with mock.patch.object(connections[DEFAULT_DB_ALIAS], "in_atomic_block", True):
+            self.assertEqual(self.router.db_for_read(Captive), DEFAULT_DB_ALIAS)
+
+    def test_writes_pin_the_rest_of_the_request_and_the_client(self):
+        token = self.route()
+        pin_to_primary()
+        self.assertEqual(self.router.db_for_read(Captive), DEFAULT_DB_ALIAS)
+
+        response = finish_routing(HttpResponse(), token)
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertGreater(float(cookie.value), time.time())
+
+        self.route({PIN_COOKIE: cookie.value})
+        self.assertEqual(self.router.db_for_read(Captive), DEFAULT_DB_ALIAS)
+        self.route({PIN_COOKIE: str(int(time.time()) - 1)})
+        self.assertEqual(self.router.db_for_read(Captive), "replica1")
+
+    def test_writes_always_use_the_primary(self):
+        self.route()
+        self.assertEqual(self.router.db_for_write(Captive), DEFAULT_DB_ALIAS)
+
+
+@override_settings(REPLICA_CHECK_INTERVAL=60)
+class ReplicaHealthTests(TestCase):
+    def test_checks_run_in_the_background(self):
+        health = ReplicaHealth()
+        release = threading.Event()
+
+        def check(alias):
+            release.wait(5)
+            return True
+
+        with mock.patch.object(health, "check", side_effect=check) as checked:
+            # Unknown yet: routed to the primary without waiting.
+            self.assertFalse(health.healthy("replica1"))
+            self.assertFalse(health.healthy("replica1"))
+            release.set()
+            for _ in range(100):
+                if health.healthy("replica1"):
+                    break
+                time.sleep(0.01)
+            self.assertTrue(health.healthy("replica1"))
+        self.assertEqual(checked.call_count, 1)
+
+    def test_a_primary_passes_the_lag_check(self):
+        # Not in recovery, so streaming and lag do not apply.
+        self.assertTrue(ReplicaHealth().check(DEFAULT_DB_ALIAS))
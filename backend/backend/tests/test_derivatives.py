@@ -0,0 +1,70 @@
+import io
+import tempfile
+from pathlib import Path
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+from backend import media_store
+from backend.derivatives import derivative_cache, derivative_url
+from backend.models import Captive
+
+
+def jpeg(color: str = "red") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class DerivativeTests(TestCase):
+    def setUp(self):
+        media_root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(
+            override_settings(
+                MEDIA_ROOT=media_root, DERIVATIVE_ROOT=media_root / "derivatives"
+            )
+        )
+
+    def derivatives(self, name: str) -> list[Path]:
+        return sorted(derivative_cache.root.rglob(f"{Path(name).name}.*"))
+
+    def test_content_addressed_derivatives_are_immutable(self):
+        captive = Captive.objects.create(name="A")
+        captive.picture.save("photo.jpg", ContentFile(jpeg()))
+        response = self.client.get(derivative_url(captive.picture.name, "card"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_legacy_names_are_cached_briefly(self):
+        name = "captives/1/photo.jpg"
+        path = Path(default_storage.path(name))
+        path.parent.mkdir(parents=True)
+        path.write_bytes(jpeg())
+        response = self.client.get(derivative_url(name, "card"))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("immutable", response["Cache-Control"])
+
+    @mock.patch.object(media_store, "GRACE_SECONDS", 0)
+    def test_deleting_the_source_deletes_its_derivatives(self):
+        captive = Captive.objects.create(name="A")
+        captive.picture.save("photo.jpg", ContentFile(jpeg()))
+        name = captive.picture.name
+        for size, fmt in (("card", "webp"), ("thumbnail", "jpeg")):
+            self.client.get(derivative_url(name, size, fmt))
+        self.assertEqual(len(self.derivatives(name)), 2)
+
+        captive.delete()
+        self.assertEqual(self.derivatives(name), [])
+        response = self.client.get(derivative_url(name, "card"))
+        self.assertEqual(response.status_code, 404)
+
+    def test_derivatives_stay_while_the_source_is_referenced(self):
+        first = Captive.objects.create(name="A")
+        first.picture.save("photo.jpg", ContentFile(jpeg()))
+        second = Captive.objects.create(name="B")
+        second.picture.save("photo.jpg", ContentFile(jpeg()))
+        self.client.get(derivative_url(first.picture.name, "card"))
+
+        first.delete()
+        self.assertEqual(len(self.derivatives(second.picture.name)), 1)
@@ -0,0 +1,57 @@
+import io
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from backend import ai_stubs
+from backend.management.commands import embed_pending
+from backend.models import Captive
+
+
+async def create_embeddings(texts: list[str]) -> list[list]:
+    # Stands in for an embeddings API that rejects one of the texts.
+    if "rejected" in texts:
+        raise ValueError("Invalid input")
+    return await ai_stubs.create_embeddings(texts)
+
+
+class EmbedPendingTests(TestCase):
+    def embed_pending(self, batch_size=2):
+        with mock.patch.object(embed_pending, "create_embeddings", create_embeddings):
+            call_command(
+                "embed_pending",
+                batch_size=batch_size,
+                stdout=io.StringIO(),
+                stderr=io.StringIO(),
+            )
+
+    def pending(self, appearance, **fields):
+        return Captive.objects.create(
+            appearance=appearance, embedding_pending=True, **fields
+        )
+
+    def test_failed_rows_stay_pending_without_blocking_later_rows(self):
+        rejected = self.pending("rejected")
+        first = self.pending("first")
+        missing_picture = self.pending(None, picture="blobs/00/00/missing.jpg")
+        later = [self.pending(f"later {i}") for i in range(3)]
+
+        self.embed_pending()
+
+        self.assertEqual(
+            set(Captive.objects.filter(embedding_pending=True)),
+            {rejected, missing_picture},
+        )
+        for captive in [first, *later]:
+            captive.refresh_from_db()
+            self.assertTrue(captive.appearance_embedded)
+        rejected.refresh_from_db()
+        self.assertIsNone(rejected.appearance_embedded)
+        self.assertFalse(missing_picture.faces.exists())
+
+    def test_failed_rows_are_retried_by_the_next_run(self):
+        captive = self.pending("rejected")
+        self.embed_pending()
+        Captive.objects.filter(pk=captive.pk).update(appearance="accepted")
+        self.embed_pending()
+        captive.refresh_from_db()
+        self.assertFalse(captive.embedding_pending)
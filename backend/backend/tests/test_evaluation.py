@@ -0,0 +1,17 @@
+import numpy as np
+from django.test import SimpleTestCase
+from backend.evaluation import evaluate_modes
+
+
+class EvaluateModesTests(SimpleTestCase):
+    def test_repeated_ids_are_scored_by_their_best_row(self):
+        # Face rows: several per Captive, sorted by Captive id.
+        rng = np.random.default_rng(1)
+        ids = np.repeat(np.arange(1, 41), rng.integers(1, 4, size=40))
+        vectors = rng.standard_normal((len(ids), 16)).astype(np.float32)
+
+        rows = evaluate_modes(ids, vectors, ["exact", "int8"], 30, k=5, noise=0)
+        for row in rows:
+            with self.subTest(mode=row["mode"], queries=row["queries"]):
+                self.assertEqual(row["recall@5"], 1.0)
+                self.assertEqual(row["mrr"], 1.0)
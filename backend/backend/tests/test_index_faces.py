@@ -0,0 +1,34 @@
+import io
+import tempfile
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from backend.models import Captive, CaptiveFace
+
+
+def jpeg(color: str) -> ContentFile:
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, "JPEG")
+    return ContentFile(buffer.getvalue(), name="photo.jpg")
+
+
+class IndexFacesTests(TestCase):
+    def setUp(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, AI_BACKEND="stub"))
+
+    def test_every_batch_is_indexed(self):
+        captives = [
+            Captive.objects.create(name=color, picture=jpeg(color))
+            for color in ("red", "green", "blue")
+        ]
+        Captive.objects.create(name="no picture")
+        out = io.StringIO()
+        call_command("index_faces", batch_size=2, stdout=out)
+
+        self.assertIn("Indexed 3/3 captives", out.getvalue())
+        self.assertEqual(
+            set(CaptiveFace.objects.values_list("captive_id", flat=True)),
+            {captive.pk for captive in captives},
+        )
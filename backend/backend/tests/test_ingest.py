@@ -0,0 +1,108 @@
+import base64
+import io
+import json
+import tempfile
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+from backend.models import Captive
+
+
+def png() -> str:
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(buffer, "PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+class BulkIngestTests(TestCase):
+    def setUp(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.user = User.objects.create_user("ingest", password="secret")
+        self.client = APIClient()
+
+    def post(self, records):
+        return self.client.post("/captives/bulk/", {"records": records}, format="json")
+
+    def test_anonymous_callers_are_rejected(self):
+        response = self.post([{"name": "A"}])
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Captive.objects.exists())
+
+    def test_results_are_reported_per_row(self):
+        self.client.force_authenticate(self.user)
+        response = self.post(
+            [
+                {"name": "Described", "appearance": "Високий, світле волосся"},
+                {"name": "Bad status", "status": "unknown"},
+                {"name": "Plain"},
+                {"name": "Not base64", "picture": "***"},
+                {
+                    "name": "Not an image",
+                    "picture": base64.b64encode(b"<?php").decode(),
+                },
+                {"name": "Pictured", "picture": f"data:image/png;base64,{png()}"},
+            ]
+        )
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body["created"], body["failed"]), (3, 3))
+        results = body["results"]
+        self.assertEqual([result["row"] for result in results], list(range(6)))
+        self.assertEqual(
+            [("id" in result) for result in results],
+            [True, False, True, False, False, True],
+        )
+        self.assertIn("status", results[1]["errors"])
+        self.assertEqual(
+            results[3]["errors"]["picture"], ["Picture must be base64-encoded"]
+        )
+        self.assertEqual(
+            results[4]["errors"]["picture"], ["Picture must be a valid image"]
+        )
+
+        captives = Captive.objects.in_bulk([results[i]["id"] for i in (0, 2, 5)])
+        described, plain, pictured = (captives[results[i]["id"]] for i in (0, 2, 5))
+        self.assertEqual(described.user, self.user)
+        # Only rows with something to embed wait for embed_pending.
+        self.assertTrue(described.embedding_pending)
+        self.assertFalse(plain.embedding_pending)
+        self.assertTrue(pictured.embedding_pending)
+        self.assertTrue(pictured.picture.name.startswith("blobs/"))
+        self.assertTrue(pictured.picture.name.endswith(".png"))
+
+    def test_a_batch_without_valid_rows_is_a_bad_request(self):
+        self.client.force_authenticate(self.user)
+        response = self.post([{"status": "unknown"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["failed"], 1)
+
+
+class IngestCommandTests(TestCase):
+    def test_json_must_hold_a_list(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        path = Path(directory) / "captives.json"
+        path.write_text(json.dumps({"name": "A"}))
+        with self.assertRaisesMessage(CommandError, "list of records"):
+            call_command("ingest_captives", str(path), stdout=io.StringIO())
+        self.assertFalse(Captive.objects.exists())
+
+
+class RawInsertTests(TestCase):
+    def test_inserts_that_omit_embedding_pending_get_the_default(self):
+        # The scraper inserts with raw SQL and does not list the column.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO backend_captive
+                (name, person_type, brigade, settlement, status, circumstances, last_update, user_id)
+                VALUES (%s, %s, %s, %s, %s, %s, now(), NULL) RETURNING id
+                """,
+                ("A", "military", "", "", "searching", ""),
+            )
+            pk = cursor.fetchone()[0]
+        self.assertFalse(Captive.objects.get(pk=pk).embedding_pending)
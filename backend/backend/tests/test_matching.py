@@ -0,0 +1,70 @@
+import json
+from unittest import mock
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from backend import matching
+from backend.embeddings import MODEL_DIMENSIONS
+from backend.matching import mark_pending, pending_captives, update_matches
+from backend.models import Captive, CaptiveMatch
+
+
+def appearance(**weights) -> str:
+    # Sparse test vectors: appearance(e0=1, e1=0.5) is e0 + 0.5 * e1.
+    vec = np.zeros(MODEL_DIMENSIONS["appearance_embedded"])
+    for axis, weight in weights.items():
+        vec[int(axis[1:])] = weight
+    return json.dumps(vec.tolist())
+
+
+def candidates(captive: Captive) -> set[int]:
+    return set(
+        CaptiveMatch.objects.filter(captive=captive).values_list(
+            "candidate_id", flat=True
+        )
+    )
+
+
+class MatchEdgeTests(TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.object(matching, "MATCH_LIMIT", 1))
+        self.a = Captive.objects.create(
+            status="searching", appearance_embedded=appearance(e0=1)
+        )
+        self.b = Captive.objects.create(
+            status="searching", appearance_embedded=appearance(e1=1)
+        )
+        # x is closer to a, so its own top match is a, but b's is x.
+        self.x = Captive.objects.create(
+            status="informed", appearance_embedded=appearance(e0=1, e1=0.5)
+        )
+        self.y = Captive.objects.create(
+            status="informed", appearance_embedded=appearance(e2=1, e0=0.1)
+        )
+        async_to_sync(update_matches)([self.a, self.b, self.x, self.y])
+
+    def test_edges_are_stored_in_both_directions(self):
+        self.assertEqual(candidates(self.a), {self.x.pk, self.y.pk})
+        self.assertEqual(candidates(self.b), {self.x.pk})
+        self.assertEqual(candidates(self.x), {self.a.pk, self.b.pk})
+
+    def test_recomputing_keeps_edges_from_other_captives_top_matches(self):
+        async_to_sync(update_matches)([self.x])
+        self.assertEqual(candidates(self.b), {self.x.pk})
+        self.assertEqual(candidates(self.x), {self.a.pk, self.b.pk})
+
+    def test_recomputing_drops_edges_neighbours_no_longer_justify(self):
+        self.x.appearance_embedded = appearance(e3=1, e0=0.1)
+        self.x.save()
+        self.y.appearance_embedded = appearance(e1=1, e0=0.2)
+        self.y.save()
+        async_to_sync(update_matches)([self.x])
+        self.assertEqual(candidates(self.x), {self.a.pk})
+        self.assertEqual(candidates(self.b), set())
+
+    def test_writes_only_mark_matches_pending(self):
+        self.assertFalse(pending_captives().exists())
+        mark_pending([self.b.pk])
+        self.assertEqual(list(pending_captives()), [self.b])
+        async_to_sync(update_matches)(list(pending_captives()))
+        self.assertFalse(pending_captives().exists())
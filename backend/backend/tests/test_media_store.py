@@ -0,0 +1,104 @@
+import io
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from backend import media_store
+from backend.models import Captive, CaptivePhoto, MediaBlob
+
+
+def refcount(name: str) -> int | None:
+    blob = MediaBlob.objects.filter(name=name).first()
+    return blob.refcount if blob else None
+
+
+class MediaRefcountTests(TestCase):
+    def setUp(self):
+        self.media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+
+    def captive(self, content: bytes) -> Captive:
+        captive = Captive(name="A")
+        captive.picture.save("photo.jpg", ContentFile(content), save=False)
+        captive.save()
+        return captive
+
+    def age(self, name: str, seconds: float = media_store.GRACE_SECONDS + 1):
+        mtime = time.time() - seconds
+        os.utime(default_storage.path(name), (mtime, mtime))
+
+    def test_same_content_is_stored_once_and_counted_per_reference(self):
+        first = self.captive(b"same")
+        second = self.captive(b"same")
+        photo = CaptivePhoto.objects.create(
+            captive=first, image=ContentFile(b"same", name="photo.jpg")
+        )
+        name = first.picture.name
+        self.assertTrue(name.startswith("blobs/"))
+        self.assertEqual({second.picture.name, photo.image.name}, {name})
+        self.assertEqual(refcount(name), 3)
+
+        second.delete()
+        self.assertEqual(refcount(name), 2)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_replacing_a_picture_moves_the_reference(self):
+        captive = self.captive(b"old")
+        old = captive.picture.name
+        self.age(old)
+        captive.picture.save("photo.jpg", ContentFile(b"new"))
+        self.assertEqual(refcount(captive.picture.name), 1)
+        self.assertIsNone(refcount(old))
+        self.assertFalse(default_storage.exists(old))
+
+    def test_unreferenced_files_are_kept_during_the_grace_period(self):
+        captive = self.captive(b"recent")
+        name = captive.picture.name
+        captive.delete()
+        # Saving the same content again could be about to reference it.
+        self.assertEqual(refcount(name), 0)
+        self.assertTrue(default_storage.exists(name))
+
+        self.age(name)
+        call_command("gc_media", stdout=io.StringIO())
+        self.assertFalse(default_storage.exists(name))
+        self.assertIsNone(refcount(name))
+
+    def test_saving_existing_content_refreshes_its_grace_period(self):
+        name = self.captive(b"shared").picture.name
+        Captive.objects.all().delete()  # Bypasses Model.delete, like the scraper.
+        self.age(name)
+        self.assertEqual(
+            default_storage.save("photo.jpg", ContentFile(b"shared")), name
+        )
+        self.assertFalse(default_storage.delete(name))
+        self.assertTrue(default_storage.exists(name))
+
+    def test_gc_removes_files_without_a_row(self):
+        # Written for a row whose transaction then rolled back.
+        orphan = media_store.blob_name("ab" * 32, ".jpg")
+        path = Path(default_storage.path(orphan))
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"orphan")
+        kept = self.captive(b"kept").picture.name
+        self.age(kept)
+
+        call_command("gc_media", stdout=io.StringIO())
+        self.assertTrue(path.exists())
+        self.age(orphan)
+        call_command("gc_media", stdout=io.StringIO())
+        self.assertFalse(path.exists())
+        self.assertTrue(default_storage.exists(kept))
+
+    @mock.patch.object(media_store, "GRACE_SECONDS", 0)
+    def test_deleting_the_last_reference_removes_the_file(self):
+        captive = self.captive(b"only")
+        name = captive.picture.name
+        captive.delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertIsNone(refcount(name))
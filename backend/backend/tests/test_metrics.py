@@ -0,0 +1,28 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+
+@override_settings(METRICS_TOKEN="secret")
+class MetricsAccessTests(TestCase):
+    def test_anonymous_requests_get_not_found(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(response.status_code, 404)
+
+    def test_scrapers_with_the_token_are_served(self):
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+
+    def test_staff_are_served(self):
+        user = User.objects.create_user("user")
+        self.client.force_login(user)
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+        user.is_staff = True
+        user.save()
+        self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_no_token_is_accepted_when_unset(self):
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer ")
+        self.assertEqual(response.status_code, 404)
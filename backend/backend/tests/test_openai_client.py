@@ -0,0 +1,85 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import openai
+from django.test import SimpleTestCase
+from findme_openai.client import ResilientOpenAI, retry_after_seconds
+from findme_openai.errors import OpenAIUnavailable
+
+
+def rate_limited(retry_after: str | None = None) -> openai.RateLimitError:
+    # Only what the error and the client read from the HTTP response.
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    response = SimpleNamespace(status_code=429, headers=headers, request=None)
+    return openai.RateLimitError("Rate limited", response=response, body=None)
+
+
+class Responses:
+    # Stands in for request(client): raises the given errors, then succeeds.
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self, client):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class ResilientOpenAITests(SimpleTestCase):
+    def openai_client(self, **kwargs) -> ResilientOpenAI:
+        return ResilientOpenAI(api_key="test", backoff=0.01, **kwargs)
+
+    def test_retry_after_parsing(self):
+        self.assertEqual(retry_after_seconds(rate_limited("2.5")), 2.5)
+        self.assertIsNone(retry_after_seconds(rate_limited()))
+        self.assertIsNone(retry_after_seconds(rate_limited("soon")))
+        self.assertIsNone(retry_after_seconds(rate_limited("Mon, 99 Foo 2025")))
+        self.assertEqual(
+            retry_after_seconds(rate_limited("Wed, 21 Oct 2015 07:28:00 GMT")), 0.0
+        )
+
+    async def test_retries_past_a_malformed_retry_after(self):
+        request = Responses(rate_limited("soon"))
+        self.assertEqual(await self.openai_client().call("gpt-4o", request, 10), "ok")
+        self.assertEqual(request.calls, 2)
+
+    async def test_a_retry_after_beyond_the_budget_fails_at_once(self):
+        request = Responses(rate_limited("120"))
+        started = time.monotonic()
+        with self.assertRaises(OpenAIUnavailable) as raised:
+            await self.openai_client().call("gpt-4o", request, 10, retry_budget=5)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(raised.exception.retry_after, 120)
+        self.assertEqual(request.calls, 1)
+
+    async def test_a_paused_budget_fails_later_calls_at_once(self):
+        client = self.openai_client()
+        with self.assertRaises(OpenAIUnavailable):
+            await client.call("gpt-4o", Responses(rate_limited("120")), 10)
+        request = Responses()
+        with self.assertRaises(OpenAIUnavailable) as raised:
+            await client.call("gpt-4o", request, 10, retry_budget=5)
+        self.assertGreater(raised.exception.retry_after, 100)
+        self.assertEqual(request.calls, 0)
+
+    async def test_cancelling_a_hedged_call_cancels_the_request(self):
+        started, cancelled = asyncio.Event(), asyncio.Event()
+
+        async def request(client):
+            started.set()
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        call = asyncio.ensure_future(
+            self.openai_client().call("gpt-4o", request, 10, hedge_after=30)
+        )
+        await asyncio.wait_for(started.wait(), 5)
+        call.cancel()  # Before the hedge delay runs out.
+        with self.assertRaises(asyncio.CancelledError):
+            await call
+        await asyncio.wait_for(cancelled.wait(), 5)
@@ -0,0 +1,48 @@
+import io
+import tempfile
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+from backend.models import Captive
+
+
+def jpeg(color: str) -> SimpleUploadedFile:
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, "JPEG")
+    return SimpleUploadedFile(f"{color}.jpg", buffer.getvalue(), "image/jpeg")
+
+
+class CaptivePhotoTests(TestCase):
+    def setUp(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, AI_BACKEND="stub"))
+        self.captive = Captive.objects.create(name="A")
+        self.url = f"/captives/{self.captive.pk}/photos/"
+        self.client = APIClient()
+
+    def upload(self, *colors):
+        return self.client.post(
+            self.url, {"photos": [jpeg(color) for color in colors]}, format="multipart"
+        )
+
+    def test_anonymous_uploads_are_rejected(self):
+        self.assertEqual(self.upload("red").status_code, 403)
+        self.assertFalse(self.captive.photos.exists())
+
+    def test_photos_are_listed_with_face_counts_in_one_query(self):
+        user = User.objects.create_user("uploader", password="secret")
+        self.client.force_authenticate(user)
+        response = self.upload("red", "blue")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([photo["faces"] for photo in response.json()], [1, 1])
+        self.assertEqual(
+            set(self.captive.photos.values_list("user", flat=True)), {user.pk}
+        )
+
+        self.client.force_authenticate(None)
+        # The captive, then its photos with their face counts.
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual([photo["faces"] for photo in response.json()], [1, 1])
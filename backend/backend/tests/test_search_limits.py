@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from backend.models import Captive
+
+
+@override_settings(AI_BACKEND="stub")
+class SearchLimitTests(TestCase):
+    def setUp(self):
+        Captive.objects.create(name="Anna")
+        self.client.force_login(User.objects.create_user("user"))
+
+    def hybrid_search(self, limit):
+        return self.client.post(
+            "/hybrid_search/",
+            {"q": "Anna", "limit": limit},
+            content_type="application/json",
+        )
+
+    def test_hybrid_search_rejects_limits_below_one(self):
+        for limit in (0, -5, None, "many"):
+            with self.subTest(limit=limit):
+                response = self.hybrid_search(limit)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("Limit", response.json()["error"])
+
+    def test_hybrid_search_caps_large_limits(self):
+        self.assertEqual(self.hybrid_search(1000).status_code, 200)
+
+    def test_autocomplete_rejects_limits_below_one(self):
+        response = self.client.get("/captives/autocomplete/?q=An&limit=0")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/captives/autocomplete/?q=An&limit=1")
+        self.assertEqual(response.status_code, 200)
+
+    def test_hybrid_search_rejects_bad_weights(self):
+        for weight in (None, "nan", "inf", -1, "heavy"):
+            with self.subTest(weight=weight):
+                response = self.client.post(
+                    "/hybrid_search/",
+                    {"q": "Anna", "w_text": weight},
+                    content_type="application/json",
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("w_text", response.json()["error"])
+        response = self.client.post(
+            "/hybrid_search/",
+            {"q": "Anna", "w_text": 0.5},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,22 @@
+from django.test import TestCase
+from django.utils import timezone
+from backend.models import Captive
+
+
+class SearchVectorTriggerTests(TestCase):
+    def vector(self, captive: Captive):
+        return Captive.objects.values_list("search_vector", flat=True).get(
+            pk=captive.pk
+        )
+
+    def test_only_searched_columns_recompute_the_vector(self):
+        captive = Captive.objects.create(name="Anna", brigade="93")
+        self.assertIn("anna", self.vector(captive))
+
+        rows = Captive.objects.filter(pk=captive.pk)
+        rows.update(search_vector=None)
+        rows.update(matches_updated_at=timezone.now(), embedding_pending=True)
+        self.assertIsNone(self.vector(captive))
+
+        rows.update(name="Olena")
+        self.assertIn("olena", self.vector(captive))
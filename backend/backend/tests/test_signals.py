@@ -0,0 +1,28 @@
+from unittest import mock
+from django.db import transaction
+from django.test import TestCase
+from backend import signals
+from backend.models import Captive
+
+
+class CacheSignalTests(TestCase):
+    def setUp(self):
+        self.refresh = self.enterContext(
+            mock.patch.object(signals.vector_indexes, "refresh")
+        )
+
+    def test_caches_are_refreshed_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            captive = Captive.objects.create(name="A")
+            self.refresh.assert_not_called()
+        self.refresh.assert_called_once_with([captive.pk])
+
+    def test_rolled_back_writes_do_not_refresh(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Captive.objects.create(name="A")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.refresh.assert_not_called()
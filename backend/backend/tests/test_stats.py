@@ -0,0 +1,34 @@
+from django.test import TestCase
+from django.utils import timezone
+from backend.models import Captive, CaptiveStat
+from backend.stats import compute_stats
+
+
+def counts(dimension: str) -> dict:
+    return dict(
+        CaptiveStat.objects.filter(dimension=dimension, count__gt=0).values_list(
+            "value", "count"
+        )
+    )
+
+
+class CaptiveStatTriggerTests(TestCase):
+    def test_counters_follow_every_statement(self):
+        Captive.objects.bulk_create(
+            [Captive(name=str(i), status="searching", region="Kyiv") for i in range(3)]
+        )
+        captive = Captive.objects.create(name="A", status="informed")
+        self.assertEqual(counts("status"), {"searching": 3, "informed": 1})
+
+        Captive.objects.filter(name__in=["0", "1"]).update(status="reunited")
+        # Columns the stats do not count leave them as they are.
+        Captive.objects.update(matches_updated_at=timezone.now())
+        self.assertEqual(
+            counts("status"), {"searching": 1, "reunited": 2, "informed": 1}
+        )
+
+        captive.delete()
+        Captive.objects.filter(name="2").delete()
+        self.assertEqual(counts("status"), {"reunited": 2})
+        self.assertEqual(counts("region"), {"Kyiv": 2})
+        self.assertEqual(compute_stats()["total"], 2)
@@ -0,0 +1,207 @@
+import threading
+from unittest import mock
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+from backend import vector_index
+from backend.vector_index import DeltaIndex, ExactIndex, IndexCache
+
+APPEARANCE = "appearance_embedded"
+
+
+def rows(*ids: int) -> tuple[np.ndarray, np.ndarray]:
+    # Captive n's vector points along axis n % 4.
+    vectors = np.zeros((len(ids), 4), dtype=np.float32)
+    vectors[np.arange(len(ids)), np.array(ids, dtype=np.int64) % 4] = 1
+    return np.array(ids, dtype=np.int64), vectors
+
+
+def axis(n: int) -> np.ndarray:
+    return rows(n)[1][0]
+
+
+@override_settings(VECTOR_INDEX_TTL=60)
+class IndexCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = IndexCache()
+        self.loaded = {APPEARANCE: rows(1), "picture_embedded": rows(2)}
+        self.release = threading.Event()
+        self.release.set()
+        self.loading = threading.Event()
+        self.enterContext(
+            mock.patch.object(vector_index, "load_vectors", side_effect=self.load)
+        )
+        self.enterContext(
+            mock.patch.object(
+                vector_index, "load_rows", side_effect=lambda field, ids: rows(*ids)
+            )
+        )
+
+    def load(self, field_name):
+        if field_name == APPEARANCE:  # The other field loads immediately.
+            self.loading.set()
+            self.release.wait(5)
+        return self.loaded[field_name]
+
+    def expire(self, field_name: str):
+        self.cache.entries[field_name]["built"] -= 120
+        self.loading.clear()
+
+    def wait_for_rebuild(self):
+        for thread in threading.enumerate():
+            if thread.name.startswith("index-"):
+                thread.join(5)
+
+    def test_expired_index_serves_until_rebuilt(self):
+        old = self.cache.get(APPEARANCE, "exact")
+        self.expire(APPEARANCE)
+        self.loaded[APPEARANCE] = rows(1, 2)
+        self.release.clear()
+
+        self.assertIs(self.cache.get(APPEARANCE, "exact"), old)
+        self.assertTrue(self.loading.wait(5))
+        self.assertIs(self.cache.get(APPEARANCE, "exact"), old)
+        self.assertEqual(self.cache.rebuilding, {APPEARANCE})
+
+        self.release.set()
+        self.wait_for_rebuild()
+        new = self.cache.get(APPEARANCE, "exact")
+        self.assertIsNot(new, old)
+        self.assertEqual(len(new), 2)
+
+    def test_changes_during_rebuild_reach_new_index(self):
+        self.cache.get(APPEARANCE, "exact")
+        self.expire(APPEARANCE)
+        self.release.clear()
+        self.cache.get(APPEARANCE, "exact")
+        self.assertTrue(self.loading.wait(5))
+
+        self.cache.refresh([3])
+        self.release.set()
+        self.wait_for_rebuild()
+
+        ids, _ = self.cache.get(APPEARANCE, "exact").search(axis(3), 1)
+        self.assertEqual(ids.tolist(), [3])
+
+    def test_build_does_not_block_other_fields(self):
+        self.release.clear()
+        building = threading.Thread(target=self.cache.get, args=(APPEARANCE, "exact"))
+        building.start()
+        self.addCleanup(building.join, 5)
+        self.addCleanup(self.release.set)
+        self.assertTrue(self.loading.wait(5))
+
+        index = self.cache.get("picture_embedded", "exact")
+        self.assertEqual(index.ids.tolist(), [2])
+        self.assertTrue(building.is_alive())
+
+    def test_invalidate_discards_running_build(self):
+        self.release.clear()
+        building = threading.Thread(target=self.cache.get, args=(APPEARANCE, "exact"))
+        building.start()
+        self.assertTrue(self.loading.wait(5))
+
+        self.cache.invalidate()
+        self.release.set()
+        building.join(5)
+        self.assertNotIn(APPEARANCE, self.cache.entries)
+
+    def test_too_many_changes_mark_the_index_for_rebuild(self):
+        self.cache.get(APPEARANCE, "exact")
+        with mock.patch.object(vector_index, "MAX_DELTA_ROWS", 2):
+            self.cache.refresh([5, 6, 7])
+        self.assertFalse(self.cache.fresh(self.cache.entries[APPEARANCE]))
+        ids, _ = self.cache.get(APPEARANCE, "exact").search(axis(3), 1)
+        self.assertEqual(ids.tolist(), [7])
+        self.wait_for_rebuild()
+
+    def test_searches_do_not_wait_for_overlay_loads(self):
+        self.cache.get(APPEARANCE, "exact")
+        loading, release = threading.Event(), threading.Event()
+
+        def slow_rows(field_name, captive_ids):
+            loading.set()
+            release.wait(5)
+            return rows(*captive_ids)
+
+        with mock.patch.object(vector_index, "load_rows", side_effect=slow_rows):
+            refreshing = threading.Thread(target=self.cache.refresh, args=([3],))
+            refreshing.start()
+            self.assertTrue(loading.wait(5))
+            acquired = self.cache.lock.acquire(timeout=1)
+            self.assertTrue(acquired)
+            self.cache.lock.release()
+            release.set()
+            refreshing.join(5)
+        ids, _ = self.cache.get(APPEARANCE, "exact").search(axis(3), 1)
+        self.assertEqual(ids.tolist(), [3])
+
+    def test_slow_loads_do_not_replace_newer_rows(self):
+        self.cache.get(APPEARANCE, "exact")
+        entry = self.cache.entries[APPEARANCE]
+        moved = (np.array([1]), np.array([axis(3)]))
+        self.cache.apply(APPEARANCE, entry, [1], moved, sequence=2)
+        self.cache.apply(APPEARANCE, entry, [1], rows(1), sequence=1)
+        ids, _ = self.cache.get(APPEARANCE, "exact").search(axis(3), 1)
+        self.assertEqual(ids.tolist(), [1])
+
+
+class DeltaIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.base = ExactIndex(*rows(0, 1, 2))
+        self.overlay = {}
+        self.enterContext(
+            mock.patch.object(vector_index, "load_rows", side_effect=self.load_rows)
+        )
+
+    def load_rows(self, field_name, captive_ids):
+        ids = [pk for pk in captive_ids if pk in self.overlay]
+        vectors = np.array([self.overlay[pk] for pk in ids], dtype=np.float32)
+        return np.array(ids, dtype=np.int64), vectors.reshape(len(ids), 4)
+
+    def delta(self, *changed: int, field_name: str = APPEARANCE) -> DeltaIndex:
+        cache = IndexCache()
+        entry = {
+            "base": self.base,
+            "changed": np.empty(0, dtype=np.int64),
+            "overlay": (np.empty(0, dtype=np.int64), np.empty((0, 4), np.float32)),
+            "loaded": {},
+        }
+        rows = vector_index.load_rows(field_name, list(changed))
+        cache.apply(field_name, entry, list(changed), rows, 1)
+        return entry["index"]
+
+    def test_changed_rows_are_scored_from_the_overlay(self):
+        self.overlay[1] = axis(3)  # Captive 1 moved from axis 1 to axis 3.
+        index = self.delta(1)
+        ids, scores = index.search(axis(3), 1)
+        self.assertEqual(ids.tolist(), [1])
+        self.assertAlmostEqual(float(scores[0]), 1.0, places=5)
+        ids, _ = index.search(axis(1), 3)
+        self.assertEqual(sorted(ids.tolist()), [0, 1, 2])
+        self.assertNotEqual(ids[0], 1)  # Its old row is masked.
+
+    def test_deleted_rows_disappear(self):
+        ids, _ = self.delta(2).search(axis(2), 3)
+        self.assertEqual(sorted(ids.tolist()), [0, 1])
+
+    def test_new_rows_are_found(self):
+        self.overlay[7] = axis(3)
+        ids, _ = self.delta(7).search(axis(3), 1)
+        self.assertEqual(ids.tolist(), [7])
+
+    def test_allowed_and_excluded_apply_to_the_overlay(self):
+        self.overlay[7] = axis(3)
+        index = self.delta(7)
+        ids, _ = index.search(axis(3), 4, allowed=[0, 2])
+        self.assertEqual(sorted(ids.tolist()), [0, 2])
+        ids, _ = index.search_many(axis(3), 4, excluded=np.array([7, 0]))
+        self.assertEqual(sorted(ids[0].tolist()), [1, 2])
+
+    def test_face_overlay_returns_each_captive_once(self):
+        self.base.group_rows()
+        faces = (np.array([5, 5]), np.array([axis(1), axis(3)]))
+        with mock.patch.object(vector_index, "load_rows", return_value=faces):
+            index = self.delta(5, field_name="faces")
+        ids, _ = index.search(axis(3), 4)
+        self.assertEqual(ids[0], 5)
+        self.assertEqual(ids.tolist().count(5), 1)
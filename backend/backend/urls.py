@@ -1,9 +1,10 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from rest_framework import routers
 from . import views
+from .derivatives import DERIVATIVE_FORMATS, DERIVATIVE_SIZES
 
 router = routers.DefaultRouter()
 router.register(r"users", views.UserViewSet)
@@ -12,6 +13,10 @@ router.register(r"captives", views.CaptiveViewSet, basename="captive")
 
 
 urlpatterns = [
+    path("captives/export/", views.export_captives, name="captive_export"),
+    path("captives/", views.captives_view, name="captive-list"),
+    path("captives/search/", views.captive_search_view, name="captive-search"),
+    path("captives/<int:pk>/", views.captive_view, name="captive-detail"),
     path("", include(router.urls)),
     path("api-auth/", include("rest_framework.urls", namespace="rest_framework")),
     path("me/", views.MeView.as_view(), name="me"),
@@ -29,4 +34,14 @@ urlpatterns = [
         views.photo_search,
         name="photo_search",
     ),
+    path("photo_search/batch/", views.photo_batch_search, name="photo_batch_search"),
+    path("hybrid_search/", views.hybrid_search, name="hybrid_search"),
+    path("metrics", views.metrics, name="metrics"),
+    path("ready", views.ready, name="ready"),
+    re_path(
+        rf"^derivatives/(?P<size>{'|'.join(DERIVATIVE_SIZES)})/(?P<name>.+)"
+        rf"\.(?P<fmt>{'|'.join(DERIVATIVE_FORMATS)})$",
+        views.derivative,
+        name="derivative",
+    ),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
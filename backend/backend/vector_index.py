@@ -0,0 +1,634 @@
+import abc
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from .embeddings import FACE_DIMENSION, MODEL_DIMENSIONS, parse_embedding
+from .models import Captive, CaptiveFace
+
+LOAD_CHUNK_SIZE = 2000
+FACE_ORDER = ("captive_id", "photo_id", "face_index")
+SCORE_CHUNK_SIZE = 4096
+DEFAULT_RERANK = 200
+MAX_DELTA_ROWS = 5000
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, scores.shape[-1])
+    if k == 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1)
+    return np.take_along_axis(part, order, axis=-1)
+
+
+def parse_mode(spec: str) -> tuple[str, dict]:
+    name, *params = spec.split(":")
+    options = {}
+    for param in params:
+        key, _, value = param.partition("=")
+        options[key] = int(value) if value.lstrip("-").isdigit() else value
+    return name, options
+
+
+def load_embeddings(field_name: str, qs=None) -> tuple[np.ndarray, np.ndarray]:
+    expected_dim = MODEL_DIMENSIONS[field_name]
+    qs = Captive.objects.all() if qs is None else qs
+    rows = qs.exclude(**{f"{field_name}__isnull": True}).values_list("pk", field_name)
+    ids, vectors = [], []
+    for pk, vec_str in rows.iterator(chunk_size=LOAD_CHUNK_SIZE):
+        vec = parse_embedding(vec_str, expected_dim)
+        if vec is not None:
+            ids.append(pk)
+            vectors.append(vec)
+    matrix = np.array(vectors, dtype=np.float32).reshape(-1, expected_dim)
+    return np.array(ids, dtype=np.int64), matrix
+
+
+def load_face_embeddings(qs=None) -> tuple[np.ndarray, np.ndarray]:
+    # Ids are the owning Captive's pk, one row per stored face.
+    qs = CaptiveFace.objects.all() if qs is None else qs
+    rows = qs.order_by(*FACE_ORDER).values_list("captive_id", "embedding")
+    ids, vectors = [], []
+    for captive_id, vec_str in rows.iterator(chunk_size=LOAD_CHUNK_SIZE):
+        vec = parse_embedding(vec_str, FACE_DIMENSION)
+        if vec is not None:
+            ids.append(captive_id)
+            vectors.append(vec)
+    matrix = np.array(vectors, dtype=np.float32).reshape(-1, FACE_DIMENSION)
+    return np.array(ids, dtype=np.int64), matrix
+
+
+def load_vectors(field_name: str) -> tuple[np.ndarray, np.ndarray]:
+    if field_name == "faces":
+        return load_face_embeddings()
+    return load_embeddings(field_name)
+
+
+def group_starts(*keys: np.ndarray) -> np.ndarray:
+    # Offsets where any key changes; rows of one group must be contiguous.
+    if not len(keys[0]):
+        return np.empty(0, dtype=np.int64)
+    changed = np.zeros(len(keys[0]) - 1, dtype=bool)
+    for key in keys:
+        changed |= key[1:] != key[:-1]
+    return np.flatnonzero(np.r_[True, changed])
+
+
+def group_max(group_ids: np.ndarray, scores: np.ndarray):
+    if not len(group_ids):
+        return group_ids, scores
+    starts = group_starts(group_ids)
+    return group_ids[starts], np.maximum.reduceat(scores, starts, axis=0)
+
+
+def group_mean(group_ids: np.ndarray, scores: np.ndarray):
+    if not len(group_ids):
+        return group_ids, scores
+    starts = group_starts(group_ids)
+    counts = np.diff(np.r_[starts, len(group_ids)])
+    return group_ids[starts], np.add.reduceat(scores, starts, axis=0) / counts[:, None]
+
+
+def aggregate_faces(
+    captive_ids: np.ndarray, photo_ids: np.ndarray, scores: np.ndarray, how: str
+):
+    # "max" keeps each Captive's best face; "mean" averages the best face of
+    # every photo in the Captive's gallery.
+    if how == "mean" and len(captive_ids):
+        starts = group_starts(captive_ids, photo_ids)
+        return group_mean(captive_ids[starts], np.maximum.reduceat(scores, starts))
+    return group_max(captive_ids, scores)
+
+
+def mask_ids(scores: np.ndarray, ids: np.ndarray, allowed=None, excluded=None):
+    if allowed is not None:
+        scores[:, ~np.isin(ids, allowed)] = -np.inf
+    if excluded is not None and len(excluded):
+        scores[:, np.isin(ids, excluded)] = -np.inf
+
+
+class VectorIndex(abc.ABC):
+    name = ""
+    rerank = 0
+
+    def __init__(self, ids: np.ndarray, vectors: np.ndarray, source=None):
+        # source(ids) returns full-precision rows for exact re-ranking.
+        self.ids = ids
+        self.source = source
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes
+
+    @abc.abstractmethod
+    def search_many(self, queries: np.ndarray, k: int, allowed=None, excluded=None):
+        # Per query, the top k ids and their scores.
+        ...
+
+    def search(self, query: np.ndarray, k: int, allowed=None):
+        ids, scores = self.search_many(query, k, allowed)
+        return ids[0], scores[0]
+
+
+class ScoredIndex(VectorIndex):
+    # Scores every row against the queries, then takes the top k.
+    groups = None
+
+    def group_rows(self):
+        # Searches then return each id once, scored by its best row.
+        self.groups = group_starts(self.ids)
+        self.group_ids = self.ids[self.groups]
+
+    @abc.abstractmethod
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        # A (queries, rows) matrix of cosine similarities.
+        ...
+
+    def candidates(self, queries: np.ndarray, k: int, allowed=None, excluded=None):
+        queries = normalize_rows(np.atleast_2d(queries).astype(np.float32))
+        scores = self.scores(queries)
+        ids = self.ids
+        if self.groups is not None and len(self.groups):
+            ids = self.group_ids
+            scores = np.maximum.reduceat(scores, self.groups, axis=1)
+        mask_ids(scores, ids, allowed, excluded)
+        idx = top_k(scores, k)
+        found = np.take_along_axis(scores, idx, axis=-1)
+        keep = np.isfinite(found)
+        return [i[m] for i, m in zip(ids[idx], keep)], [
+            s[m] for s, m in zip(found, keep)
+        ]
+
+    def search_many(self, queries: np.ndarray, k: int, allowed=None, excluded=None):
+        queries = normalize_rows(np.atleast_2d(queries).astype(np.float32))
+        if not self.rerank or self.source is None:
+            return self.candidates(queries, k, allowed, excluded)
+        all_ids, all_scores = [], []
+        candidate_ids, _ = self.candidates(
+            queries, max(k, self.rerank), allowed, excluded
+        )
+        for query, ids in zip(queries, candidate_ids):
+            exact = normalize_rows(self.source(ids)) @ query
+            idx = top_k(exact, k)
+            all_ids.append(ids[idx])
+            all_scores.append(exact[idx])
+        return all_ids, all_scores
+
+
+class ExactIndex(ScoredIndex):
+    name = "exact"
+
+    def __init__(self, ids: np.ndarray, vectors: np.ndarray, source=None):
+        super().__init__(ids, vectors, source)
+        self.vectors = normalize_rows(vectors.astype(np.float32, copy=False))
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes + self.vectors.nbytes
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        return queries @ self.vectors.T
+
+
+shard_pool = None
+shard_pool_lock = threading.Lock()
+
+
+def get_shard_pool() -> ThreadPoolExecutor:
+    global shard_pool
+    with shard_pool_lock:
+        if shard_pool is None:
+            shard_pool = ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 1, thread_name_prefix="vector-shard"
+            )
+        return shard_pool
+
+
+class ShardedIndex(ExactIndex):
+    # Exact scores computed per contiguous shard on a shared thread pool; the
+    # matrix product releases the GIL, so shards run on separate cores.
+    name = "sharded"
+
+    def __init__(self, ids, vectors, source=None, shards: int = 0):
+        super().__init__(ids, vectors, source)
+        self.shard_count = max(1, min(shards or os.cpu_count() or 1, len(ids) or 1))
+        bounds = np.linspace(0, len(ids), self.shard_count + 1).astype(int)
+        self.shards = list(zip(bounds[:-1], bounds[1:]))
+
+    def group_rows(self):
+        # Shard on group boundaries so every group is reduced inside one shard.
+        super().group_rows()
+        shards = min(self.shard_count, len(self.groups) or 1)
+        bounds = np.linspace(0, len(self.groups), shards + 1).astype(int)
+        self.shard_groups = list(zip(bounds[:-1], bounds[1:]))
+        rows = np.r_[self.groups, len(self.ids)]
+        self.shards = [(rows[g0], rows[g1]) for g0, g1 in self.shard_groups]
+
+    def shard_top(self, shard: int, queries, k: int, allowed, excluded):
+        start, end = self.shards[shard]
+        scores = queries @ self.vectors[start:end].T
+        if self.groups is not None and len(self.groups):
+            g0, g1 = self.shard_groups[shard]
+            scores = np.maximum.reduceat(scores, self.groups[g0:g1] - start, axis=1)
+            ids, offset = self.group_ids[g0:g1], g0
+        else:
+            ids, offset = self.ids[start:end], start
+        mask_ids(scores, ids, allowed, excluded)
+        idx = top_k(scores, k)
+        return idx + offset, np.take_along_axis(scores, idx, axis=-1)
+
+    def candidates(self, queries: np.ndarray, k: int, allowed=None, excluded=None):
+        queries = normalize_rows(np.atleast_2d(queries).astype(np.float32))
+        if len(self.shards) == 1:
+            return super().candidates(queries, k, allowed, excluded)
+        futures = [
+            get_shard_pool().submit(
+                self.shard_top, shard, queries, k, allowed, excluded
+            )
+            for shard in range(len(self.shards))
+        ]
+        results = [future.result() for future in futures]
+        positions = np.concatenate([r[0] for r in results], axis=1)
+        scores = np.concatenate([r[1] for r in results], axis=1)
+        idx = top_k(scores, k)
+        found = np.take_along_axis(scores, idx, axis=-1)
+        keep = np.isfinite(found)
+        ids = self.ids if self.groups is None else self.group_ids
+        best = ids[np.take_along_axis(positions, idx, axis=-1)]
+        return [i[m] for i, m in zip(best, keep)], [s[m] for s, m in zip(found, keep)]
+
+
+class ChunkedIndex(ScoredIndex):
+    # Decodes SCORE_CHUNK_SIZE rows at a time so scoring never materializes
+    # a full float32 copy of the matrix.
+    def __init__(self, ids, vectors, source=None, rerank: int = DEFAULT_RERANK):
+        super().__init__(ids, vectors, source)
+        self.rerank = rerank
+
+    def prepare(self, queries: np.ndarray):
+        return queries
+
+    @abc.abstractmethod
+    def score_chunk(self, start: int, end: int, prepared) -> np.ndarray:
+        # The scores of rows start:end.
+        ...
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        prepared = self.prepare(queries)
+        scores = np.empty((len(queries), len(self.ids)), dtype=np.float32)
+        for start in range(0, len(self.ids), SCORE_CHUNK_SIZE):
+            end = min(start + SCORE_CHUNK_SIZE, len(self.ids))
+            scores[:, start:end] = self.score_chunk(start, end, prepared)
+        return scores
+
+
+class Float16Index(ChunkedIndex):
+    name = "float16"
+
+    def __init__(self, ids, vectors, source=None, rerank: int = DEFAULT_RERANK):
+        super().__init__(ids, vectors, source, rerank)
+        self.codes = normalize_rows(vectors).astype(np.float16)
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes + self.codes.nbytes
+
+    def score_chunk(self, start, end, queries):
+        return queries @ self.codes[start:end].astype(np.float32).T
+
+
+class Int8Index(ChunkedIndex):
+    name = "int8"
+
+    def __init__(self, ids, vectors, source=None, rerank: int = DEFAULT_RERANK):
+        super().__init__(ids, vectors, source, rerank)
+        vectors = normalize_rows(vectors)
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        self.scales = scales.astype(np.float32)
+        self.codes = np.round(vectors / scales[:, None]).astype(np.int8)
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes + self.codes.nbytes + self.scales.nbytes
+
+    def score_chunk(self, start, end, queries):
+        chunk = self.codes[start:end].astype(np.float32)
+        return (queries @ chunk.T) * self.scales[start:end]
+
+
+def kmeans(x: np.ndarray, k: int, iterations: int, rng) -> np.ndarray:
+    k = min(k, len(x))
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = nearest_centroid(x, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=k)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+def nearest_centroid(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    half_norms = (centroids**2).sum(axis=1) / 2
+    assign = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), SCORE_CHUNK_SIZE):
+        chunk = x[start : start + SCORE_CHUNK_SIZE]
+        assign[start : start + len(chunk)] = np.argmax(
+            chunk @ centroids.T - half_norms, axis=1
+        )
+    return assign
+
+
+class ProductQuantizedIndex(ChunkedIndex):
+    name = "pq"
+
+    def __init__(
+        self,
+        ids,
+        vectors,
+        source=None,
+        rerank: int = DEFAULT_RERANK,
+        subspaces: int = 0,
+        iterations: int = 10,
+        train_size: int = 20_000,
+    ):
+        super().__init__(ids, vectors, source, rerank)
+        vectors = normalize_rows(vectors.astype(np.float32, copy=False))
+        dim = vectors.shape[1]
+        subspaces = subspaces or max(1, dim // 16)
+        if dim % subspaces:
+            raise ValueError(f"pq subspaces must divide the dimension {dim}")
+        self.sub_dim = dim // subspaces
+        rng = np.random.default_rng(0)
+        train = vectors[rng.choice(len(vectors), min(train_size, len(vectors)), False)]
+        self.centroids = []
+        self.codes = np.empty((len(vectors), subspaces), dtype=np.uint8)
+        for j in range(subspaces):
+            part = slice(j * self.sub_dim, (j + 1) * self.sub_dim)
+            centroids = kmeans(train[:, part], 256, iterations, rng)
+            self.centroids.append(centroids)
+            self.codes[:, j] = nearest_centroid(vectors[:, part], centroids)
+        self.centroids = np.stack(
+            [np.pad(c, ((0, 256 - len(c)), (0, 0))) for c in self.centroids]
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes + self.codes.nbytes + self.centroids.nbytes
+
+    def prepare(self, queries):
+        # Per-query lookup tables of subvector-centroid inner products.
+        parts = queries.reshape(len(queries), len(self.centroids), self.sub_dim)
+        return np.einsum("qjd,jcd->qjc", parts, self.centroids)
+
+    def score_chunk(self, start, end, tables):
+        codes = self.codes[start:end]
+        columns = np.arange(codes.shape[1])
+        return np.stack([table[columns, codes].sum(axis=1) for table in tables])
+
+
+SEARCH_MODES = {
+    "exact": ExactIndex,
+    "sharded": ShardedIndex,
+    "float16": Float16Index,
+    "int8": Int8Index,
+    "pq": ProductQuantizedIndex,
+}
+
+
+def build_index(mode: str, ids: np.ndarray, vectors: np.ndarray, **options):
+    if mode not in SEARCH_MODES:
+        raise ValueError(
+            f"Unknown search mode {mode}. Use one of: {', '.join(SEARCH_MODES)}"
+        )
+    return SEARCH_MODES[mode](ids, vectors, **options)
+
+
+class DeltaIndex(VectorIndex):
+    # A built index plus the Captives changed since it was built: their rows
+    # in the base are masked out and their current rows are scored exactly in
+    # a small overlay, so writes do not force a rebuild.
+    def __init__(self, base: VectorIndex, changed: np.ndarray, overlay: ExactIndex):
+        super().__init__(base.ids, None, base.source)
+        self.base, self.changed, self.overlay = base, changed, overlay
+        self.name, self.rerank = base.name, base.rerank
+
+    @property
+    def nbytes(self) -> int:
+        return self.base.nbytes + self.overlay.nbytes
+
+    def search_many(self, queries: np.ndarray, k: int, allowed=None, excluded=None):
+        masked = (
+            self.changed if excluded is None else np.union1d(self.changed, excluded)
+        )
+        base_ids, base_scores = self.base.search_many(queries, k, allowed, masked)
+        if not len(self.overlay):
+            return base_ids, base_scores
+        new_ids, new_scores = self.overlay.search_many(queries, k, allowed, excluded)
+        all_ids, all_scores = [], []
+        for ids, scores in zip(
+            map(np.concatenate, zip(base_ids, new_ids)),
+            map(np.concatenate, zip(base_scores, new_scores)),
+        ):
+            idx = top_k(scores, k)
+            all_ids.append(ids[idx])
+            all_scores.append(scores[idx])
+        return all_ids, all_scores
+
+
+def load_rows(field_name: str, captive_ids) -> tuple[np.ndarray, np.ndarray]:
+    if field_name == "faces":
+        return load_face_embeddings(CaptiveFace.objects.filter(captive__in=captive_ids))
+    return load_embeddings(field_name, Captive.objects.filter(pk__in=captive_ids))
+
+
+class IndexCache:
+    # self.lock only guards the entries; an index is loaded and built under
+    # its field's build lock, so a build never blocks searches on another
+    # field. An expired index keeps serving while a background thread
+    # rebuilds it, and is swapped out once the new one is ready.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.build_locks = {}
+        # Field -> Captive ids changed since its running build started
+        # loading; they go into the new index's overlay.
+        self.pending = {}
+        self.rebuilding = set()
+        self.generation = 0
+        # Numbers each overlay load, so a slow load never replaces the rows
+        # of a Captive that a later one already loaded.
+        self.sequence = 0
+
+    def fresh(self, entry: dict) -> bool:
+        return (
+            not entry["stale"]
+            and time.monotonic() - entry["built"] < settings.VECTOR_INDEX_TTL
+        )
+
+    def get(self, field_name: str, spec: str) -> VectorIndex:
+        with self.lock:
+            entry = self.entries.get(field_name)
+            if entry and entry["spec"] == spec:
+                if not self.fresh(entry) and field_name not in self.rebuilding:
+                    self.rebuilding.add(field_name)
+                    threading.Thread(
+                        target=self.rebuild,
+                        args=(field_name, spec),
+                        name=f"index-{field_name}",
+                        daemon=True,
+                    ).start()
+                return entry["index"]
+        return self.build(field_name, spec)
+
+    def rebuild(self, field_name: str, spec: str):
+        try:
+            self.build(field_name, spec)
+        except Exception:
+            logger.exception("Rebuilding the %s index failed", field_name)
+            with self.lock:
+                entry = self.entries.get(field_name)
+                if entry:  # Keep serving it; retry after another TTL.
+                    entry["built"] = time.monotonic()
+        finally:
+            with self.lock:
+                self.rebuilding.discard(field_name)
+            connections.close_all()
+
+    def build(self, field_name: str, spec: str) -> VectorIndex:
+        with self.lock:
+            build_lock = self.build_locks.setdefault(field_name, threading.Lock())
+        with build_lock:
+            with self.lock:
+                entry = self.entries.get(field_name)
+                if entry and entry["spec"] == spec and self.fresh(entry):
+                    return entry["index"]  # Built while we waited.
+                generation = self.generation
+                self.pending[field_name] = set()
+            try:
+                name, options = parse_mode(spec)
+                ids, vectors = load_vectors(field_name)
+                index = build_index(name, ids, vectors, **options)
+                if field_name == "faces":
+                    index.group_rows()
+            except BaseException:
+                with self.lock:
+                    del self.pending[field_name]
+                raise
+            dim = vectors.shape[1]
+            entry = {
+                "spec": spec,
+                "built": time.monotonic(),
+                "stale": False,
+                "base": index,
+                "changed": np.empty(0, dtype=np.int64),
+                "overlay": (
+                    np.empty(0, dtype=np.int64),
+                    np.empty((0, dim), np.float32),
+                ),
+                "loaded": {},
+                "index": index,
+            }
+            # Changes made while loading go into the overlay; the entry is
+            # only swapped in once none are left to load.
+            while True:
+                with self.lock:
+                    changed = self.pending[field_name]
+                    if not changed:
+                        del self.pending[field_name]
+                        # Not if invalidated meanwhile: it may miss changes.
+                        if generation == self.generation:
+                            self.entries[field_name] = entry
+                        return entry["index"]
+                    self.pending[field_name] = set()
+                    self.sequence += 1
+                    sequence = self.sequence
+                try:
+                    rows = load_rows(field_name, sorted(changed))
+                except BaseException:
+                    with self.lock:
+                        del self.pending[field_name]
+                    raise
+                with self.lock:
+                    self.apply(field_name, entry, sorted(changed), rows, sequence)
+
+    def refresh(self, captive_ids, fields=None):
+        # Reloads only these Captives' rows into each built index's overlay;
+        # past MAX_DELTA_ROWS changes the index is rebuilt on its next use.
+        # The rows are loaded outside self.lock, so searches never wait on
+        # the query.
+        captive_ids = sorted(set(captive_ids))
+        with self.lock:
+            for field_name, changed in self.pending.items():
+                if fields is None or field_name in fields:
+                    changed.update(captive_ids)
+            built = [
+                field_name
+                for field_name in self.entries
+                if fields is None or field_name in fields
+            ]
+            self.sequence += 1
+            sequence = self.sequence
+        for field_name in built:
+            rows = load_rows(field_name, captive_ids)
+            with self.lock:
+                entry = self.entries.get(field_name)
+                if entry:
+                    self.apply(field_name, entry, captive_ids, rows, sequence)
+
+    def apply(self, field_name: str, entry: dict, captive_ids, rows, sequence: int):
+        # rows are the Captives' current rows, loaded as load number sequence.
+        loaded = entry["loaded"]
+        captive_ids = np.asarray(
+            [pk for pk in captive_ids if loaded.get(pk, 0) < sequence],
+            dtype=np.int64,
+        )
+        if not len(captive_ids):
+            return
+        loaded.update(dict.fromkeys(captive_ids.tolist(), sequence))
+        changed = np.union1d(entry["changed"], captive_ids)
+        if len(changed) > MAX_DELTA_ROWS:
+            entry["stale"] = True
+        old_ids, old_vectors = entry["overlay"]
+        new_ids, new_vectors = rows
+        keep = ~np.isin(old_ids, captive_ids)
+        fresh = np.isin(new_ids, captive_ids)
+        ids = np.concatenate([old_ids[keep], new_ids[fresh]])
+        vectors = np.concatenate([old_vectors[keep], new_vectors[fresh]])
+        # Stable, so a Captive's face rows stay contiguous and in order.
+        order = np.argsort(ids, kind="stable")
+        ids, vectors = ids[order], vectors[order]
+        overlay = ExactIndex(ids, vectors)
+        if field_name == "faces":
+            overlay.group_rows()
+        entry.update(
+            changed=changed,
+            overlay=(ids, vectors),
+            index=DeltaIndex(entry["base"], changed, overlay),
+        )
+
+    def invalidate(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+
+vector_indexes = IndexCache()
@@ -1,27 +1,74 @@
 from django.contrib.auth.models import Group, User
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
 from rest_framework import permissions, viewsets, status
-from .models import Captive
-from .serializers import CaptiveSerializer, UserSerializer
+from .models import Captive, CaptiveMatch, CaptivePhoto
+from .serializers import (
+    CaptiveMatchSerializer,
+    CaptivePhotoSerializer,
+    CaptiveSerializer,
+    UserSerializer,
+)
 from tutorial.quickstart.serializers import GroupSerializer
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from rest_framework.views import APIView
 from django.contrib.auth import login, logout
 from rest_framework import serializers
 from .serializers import LoginSerializer
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.views.decorators.csrf import csrf_exempt
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 import django_filters
-from django.db.models import Q
+from django.db.models import Count, Q
 from .ai_tools import (
+    FACE_AGGREGATES,
+    HYBRID_WEIGHTS,
+    apply_metadata_filters,
+    apply_status_filter,
+    save_faces,
     search_appearance,
+    search_faces,
+    search_hybrid,
     search_photo,
+    search_photo_batch,
     create_embedding,
     create_photo_embedding,
+    create_photo_embeddings,
+    detect_faces,
+    detect_faces_batch,
+)
+from .exports import (
+    CONTENT_TYPES,
+    EXPORT_CHUNK_SIZE,
+    EXPORT_FORMATS,
+    aiter_export,
+    resolve_columns,
 )
+from .ingest import BULK_INGEST_LIMIT, ingest_records
+from .matching import mark_pending
+from .search import full_text_search
+from .stats import captive_stats
+from .metrics import render_metrics
+from .derivatives import DERIVATIVE_FORMATS, cache_control, derivative_cache
+from .providers import readiness
+from .db_router import pin_to_primary, replica_health
+from findme_openai.errors import OpenAIUnavailable
+from .autocomplete import AUTOCOMPLETE_FIELDS, AUTOCOMPLETE_LIMIT, autocomplete_index
+import hmac
 import json
-import asyncio
-from asgiref.sync import sync_to_async
+import math
+from asgiref.sync import async_to_sync, sync_to_async
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -54,6 +101,44 @@ class CaptiveFilter(django_filters.FilterSet):
         return queryset.filter(q_objects)
 
 
+class CaptiveSearchPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+def parse_limit(value, maximum: int) -> int:
+    # At most maximum; zero, negative and non-integer values are rejected.
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        limit = 0
+    if limit < 1:
+        raise ValueError("Limit must be a positive integer")
+    return min(limit, maximum)
+
+
+def parse_weight(name: str, value) -> float:
+    # NaN or infinity would poison the fused ranking.
+    try:
+        weight = float(value)
+    except (TypeError, ValueError):
+        weight = math.nan
+    if not math.isfinite(weight) or weight < 0:
+        raise ValueError(f"w_{name} must be a non-negative number")
+    return weight
+
+
+def captive_queryset(params):
+    # Everything CaptiveSerializer reads is loaded up front, which the async
+    # read views need: lazy relation loads are not allowed in async code.
+    qs = Captive.objects.select_related("user").prefetch_related("user__groups")
+    user_id = params.get("user_id")
+    if user_id:
+        qs = qs.filter(user_id=user_id)
+    return qs
+
+
 class CaptiveViewSet(viewsets.ModelViewSet):
     queryset = Captive.objects.all()
     serializer_class = CaptiveSerializer
@@ -61,10 +146,134 @@ class CaptiveViewSet(viewsets.ModelViewSet):
     filterset_class = CaptiveFilter
 
     def get_queryset(self):
-        user_id = self.request.query_params.get("user_id")
-        if user_id:
-            return Captive.objects.filter(user_id=user_id)
-        return Captive.objects.all()
+        return captive_queryset(self.request.query_params)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in permissions.SAFE_METHODS:
+            pin_to_primary()
+
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response(
+                {"error": "Query is required"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        qs = full_text_search(self.filter_queryset(self.get_queryset()), query)
+        paginator = CaptiveSearchPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        field = request.query_params.get("field", "name")
+        prefix = request.query_params.get("q", "")
+        if field not in AUTOCOMPLETE_FIELDS:
+            return Response(
+                {"error": f"Field must be one of: {', '.join(AUTOCOMPLETE_FIELDS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            limit = parse_limit(
+                request.query_params.get("limit", AUTOCOMPLETE_LIMIT), 50
+            )
+        except ValueError:
+            return Response(
+                {"error": "Limit must be a positive integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(autocomplete_index.lookup(field, prefix, limit))
+
+    @action(detail=False, methods=["get"])
+    def stats(self, request):
+        return Response(captive_stats())
+
+    @action(
+        detail=True,
+        methods=["get", "post"],
+        permission_classes=[permissions.IsAuthenticatedOrReadOnly],
+    )
+    def photos(self, request, pk=None):
+        captive = self.get_object()
+        photos = captive.photos.annotate(face_count=Count("faces"))
+        if request.method == "GET":
+            serializer = CaptivePhotoSerializer(
+                photos, many=True, context={"request": request}
+            )
+            return Response(serializer.data)
+
+        files = request.FILES.getlist("photos")
+        if not files:
+            return Response(
+                {"error": "At least one photo is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        images = [f.read() for f in files]
+        created = [
+            CaptivePhoto.objects.create(captive=captive, image=f, user=request.user)
+            for f in files
+        ]
+        for photo, faces in zip(created, async_to_sync(detect_faces_batch)(images)):
+            save_faces(captive, faces, photo)
+        mark_pending([captive.pk])
+        serializer = CaptivePhotoSerializer(
+            photos.filter(pk__in=[photo.pk for photo in created]),
+            many=True,
+            context={"request": request},
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=True,
+        methods=["delete"],
+        url_path=r"photos/(?P<photo_id>\d+)",
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def delete_photo(self, request, pk=None, photo_id=None):
+        photo = get_object_or_404(CaptivePhoto, captive=self.get_object(), pk=photo_id)
+        photo.delete()
+        mark_pending([photo.captive_id])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(
+        detail=False, methods=["post"], permission_classes=[permissions.IsAuthenticated]
+    )
+    def bulk(self, request):
+        records = request.data
+        if isinstance(records, dict):
+            records = records.get("records")
+        if not isinstance(records, list) or not records:
+            return Response(
+                {"error": "A non-empty list of records is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(records) > BULK_INGEST_LIMIT:
+            return Response(
+                {"error": f"At most {BULK_INGEST_LIMIT} records per request"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        results = ingest_records(records, request.user)
+        created = sum("id" in result for result in results)
+        return Response(
+            {"created": created, "failed": len(results) - created, "results": results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(detail=True, methods=["get"])
+    def matches(self, request, pk=None):
+        qs = CaptiveMatch.objects.filter(captive=self.get_object()).select_related(
+            "candidate"
+        )
+        signal = request.query_params.get("signal")
+        if signal:
+            qs = qs.filter(signal=signal)
+        serializer = CaptiveMatchSerializer(
+            qs.order_by("-score"), many=True, context={"request": request}
+        )
+        return Response(serializer.data)
 
     def perform_create(self, serializer):
         instance = serializer.save(user=self.request.user)
@@ -73,26 +282,148 @@ class CaptiveViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         instance = serializer.save()
         self._create_embeddings(instance)
+        mark_pending([instance.pk])
 
     def _create_embeddings(self, instance):
         update_fields = []
 
         if instance.appearance:
-            embedding = asyncio.run(create_embedding(instance.appearance))
-            instance.appearance_embedded = json.dumps(embedding)
-            update_fields.append("appearance_embedded")
+            try:
+                embedding = async_to_sync(create_embedding)(instance.appearance)
+                instance.appearance_embedded = json.dumps(embedding)
+                update_fields.append("appearance_embedded")
+            except OpenAIUnavailable:
+                # Saved anyway; embed_pending fills the embedding in later.
+                instance.embedding_pending = True
+                update_fields.append("embedding_pending")
 
         if instance.picture:
             image_bytes = instance.picture.read()
             instance.picture.seek(0)
-            embedding = asyncio.run(create_photo_embedding(image_bytes))
-            instance.picture_embedded = json.dumps(embedding)
+            faces = async_to_sync(detect_faces)(image_bytes)
+            save_faces(instance, faces)
+            instance.picture_embedded = json.dumps(
+                faces[0]["embedding"] if faces else []
+            )
             update_fields.append("picture_embedded")
 
         if update_fields:
             instance.save(update_fields=update_fields)
 
 
+def filtered_captives(request):
+    return CaptiveFilter(request.GET, queryset=captive_queryset(request.GET)).qs
+
+
+def serialize_captives(captives, request, many=True):
+    return CaptiveSerializer(captives, many=many, context={"request": request}).data
+
+
+async def paginate_captives(qs, request, pagination=CaptiveSearchPagination):
+    # The PageNumberPagination response shape, with async count and fetch.
+    try:
+        size = int(request.GET[pagination.page_size_query_param])
+        if size < 1:
+            raise ValueError(size)
+        size = min(size, pagination.max_page_size)
+    except (KeyError, ValueError):
+        size = pagination.page_size
+    number = request.GET.get(pagination.page_query_param, "1")
+    if number not in pagination.last_page_strings:
+        try:
+            number = int(number)
+        except ValueError:
+            return None
+    count = await qs.acount()
+    pages = max(1, math.ceil(count / size))
+    if number in pagination.last_page_strings:
+        number = pages
+    if not 1 <= number <= pages:
+        return None
+    page = [captive async for captive in qs[(number - 1) * size : number * size]]
+    url = request.build_absolute_uri()
+    param = pagination.page_query_param
+    if number == 1:
+        previous = None
+    elif number == 2:
+        previous = remove_query_param(url, param)
+    else:
+        previous = replace_query_param(url, param, number - 1)
+    return {
+        "count": count,
+        "next": (
+            replace_query_param(url, param, number + 1)
+            if number * size < count
+            else None
+        ),
+        "previous": previous,
+        "results": serialize_captives(page, request),
+    }
+
+
+async def captive_list(request):
+    captives = [captive async for captive in filtered_captives(request)]
+    return JsonResponse(serialize_captives(captives, request), safe=False)
+
+
+async def captive_detail(request, pk):
+    try:
+        captive = await filtered_captives(request).aget(pk=pk)
+    except Captive.DoesNotExist:
+        return JsonResponse(
+            {"detail": "No Captive matches the given query."},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    return JsonResponse(serialize_captives(captive, request, many=False))
+
+
+async def captive_search(request):
+    query = request.GET.get("q", "").strip()
+    if not query:
+        return JsonResponse(
+            {"error": "Query is required"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    page = await paginate_captives(
+        full_text_search(filtered_captives(request), query), request
+    )
+    if page is None:
+        return JsonResponse(
+            {"detail": "Invalid page."}, status=status.HTTP_404_NOT_FOUND
+        )
+    return JsonResponse(page)
+
+
+def async_reads(read_view, viewset_view):
+    # GET goes to the async view, anything else (and every method when
+    # ASYNC_READS is off) to the DRF viewset, which does its own CSRF checks.
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        if request.method == "GET" and settings.ASYNC_READS:
+            return await read_view(request, *args, **kwargs)
+        return await sync_to_async(viewset_view)(request, *args, **kwargs)
+
+    return view
+
+
+captives_view = async_reads(
+    captive_list, CaptiveViewSet.as_view({"get": "list", "post": "create"})
+)
+captive_view = async_reads(
+    captive_detail,
+    CaptiveViewSet.as_view(
+        {
+            "get": "retrieve",
+            "put": "update",
+            "patch": "partial_update",
+            "delete": "destroy",
+        }
+    ),
+)
+captive_search_view = async_reads(
+    captive_search, CaptiveViewSet.as_view({"get": "search"})
+)
+
+
 class LoginView(APIView):
     def post(self, request, *args, **kwargs):
         serializer = LoginSerializer(data=request.data)
@@ -162,6 +493,16 @@ class MeView(APIView):
         )
 
 
+def openai_unavailable(error: OpenAIUnavailable) -> JsonResponse:
+    # Rate limits and outages are temporary: 503 so clients retry, not 500.
+    response = JsonResponse(
+        {"error": "Search is temporarily unavailable, please retry"},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    response["Retry-After"] = str(math.ceil(error.retry_after or 1))
+    return response
+
+
 @login_required
 @require_POST
 async def appearance_search(request):
@@ -174,9 +515,11 @@ async def appearance_search(request):
         )
 
     try:
-        embedding = await create_embedding(description)
+        embedding = await create_embedding(description, hedge=True)
         search_results = await search_appearance(embedding, request, status_filter)
         return JsonResponse(search_results, safe=False)
+    except OpenAIUnavailable as e:
+        return openai_unavailable(e)
     except Exception as e:
         return JsonResponse(
             {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -188,21 +531,60 @@ async def appearance_search(request):
 async def photo_search(request):
     photo_file = request.FILES.get("photo")
     status_filter = request.POST.get("status", "")
+    # A face number searches that face; "all" returns matches for every face.
+    face = request.POST.get("face", "").strip()
+    aggregate = request.POST.get("aggregate", "max")
 
     if not photo_file:
         return JsonResponse(
             {"error": "Photo is required"}, status=status.HTTP_400_BAD_REQUEST
         )
+    if face and face != "all" and not face.isdigit():
+        return JsonResponse(
+            {"error": "Face must be a face number or 'all'"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if aggregate not in FACE_AGGREGATES:
+        return JsonResponse(
+            {"error": f"Aggregate must be one of: {', '.join(FACE_AGGREGATES)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
     try:
         image_bytes = await sync_to_async(photo_file.read)()
-        embedding = await create_photo_embedding(image_bytes)
-        if embedding is None:
+        faces = await detect_faces(image_bytes)
+        if not faces:
             return JsonResponse(
                 {"error": "Failed to create embedding from the provided image"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        search_results = await search_photo(embedding, request, status_filter)
+        if face == "all":
+            qs = apply_status_filter(Captive.objects.all(), status_filter)
+            per_face = await search_faces(
+                [f["embedding"] for f in faces], qs, request, 5, aggregate
+            )
+            return JsonResponse(
+                {
+                    "faces": [
+                        {
+                            "face": i,
+                            "box": f["box"],
+                            "confidence": f["confidence"],
+                            "results": results,
+                        }
+                        for i, (f, results) in enumerate(zip(faces, per_face))
+                    ]
+                }
+            )
+        if int(face or 0) >= len(faces):
+            return JsonResponse(
+                {"error": f"Face {face} not found, the photo has {len(faces)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        embedding = faces[int(face or 0)]["embedding"]
+        search_results = await search_photo(
+            embedding, request, status_filter, aggregate
+        )
         return JsonResponse(search_results, safe=False)
 
     except Exception as e:
@@ -210,3 +592,182 @@ async def photo_search(request):
             {"error": f"Error processing image: {str(e)}"},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
+
+
+PHOTO_BATCH_LIMIT = 20
+
+
+@login_required
+@require_POST
+async def photo_batch_search(request):
+    photo_files = request.FILES.getlist("photos")
+    if not photo_files:
+        return JsonResponse(
+            {"error": "At least one photo is required"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(photo_files) > PHOTO_BATCH_LIMIT:
+        return JsonResponse(
+            {"error": f"At most {PHOTO_BATCH_LIMIT} photos per request"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        qs = apply_metadata_filters(Captive.objects.all(), request.POST)
+        limit = parse_limit(request.POST.get("limit", 5), 100)
+        aggregate = request.POST.get("aggregate", "max")
+        if aggregate not in FACE_AGGREGATES:
+            raise ValueError(f"Aggregate must be one of: {', '.join(FACE_AGGREGATES)}")
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        images = [await sync_to_async(f.read)() for f in photo_files]
+        embeddings = await create_photo_embeddings(images)
+        photo_results, best = await search_photo_batch(
+            embeddings, qs, request, limit, aggregate
+        )
+        return JsonResponse(
+            {
+                "photos": [
+                    {
+                        "photo": i,
+                        "filename": photo_file.name,
+                        "face_found": bool(embedding),
+                        "results": results,
+                    }
+                    for i, (photo_file, embedding, results) in enumerate(
+                        zip(photo_files, embeddings, photo_results)
+                    )
+                ],
+                "best": best,
+            }
+        )
+    except Exception as e:
+        return JsonResponse(
+            {"error": f"Error processing images: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+@login_required
+@require_GET
+async def export_captives(request):
+    fmt = request.GET.get("format", "csv").lower()
+    status_filter = request.GET.get("status", "")
+    with_embeddings = request.GET.get("embeddings", "").lower() in ("1", "true")
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse(
+            {"error": f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        columns = resolve_columns(request.GET.get("columns"), with_embeddings)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(
+        aiter_export(columns, status_filter, fmt, EXPORT_CHUNK_SIZE),
+        content_type=CONTENT_TYPES[fmt],
+    )
+    response["Content-Disposition"] = f'attachment; filename="captives.{fmt}"'
+    return response
+
+
+@login_required
+@require_POST
+async def hybrid_search(request):
+    if request.content_type == "application/json":
+        data = json.loads(request.body or "{}")
+    else:
+        data = request.POST
+    description = str(data.get("appearance") or "").strip()
+    text = str(data.get("q") or "").strip()
+    photo_file = request.FILES.get("photo")
+    if not (description or text or photo_file):
+        return JsonResponse(
+            {"error": "At least one of appearance, q or photo is required"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        qs = apply_metadata_filters(Captive.objects.all(), data)
+        weights = {
+            name: parse_weight(name, data.get(f"w_{name}", default))
+            for name, default in HYBRID_WEIGHTS.items()
+        }
+        limit = parse_limit(data.get("limit", 5), 100)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        appearance_embedding = None
+        photo_embedding = None
+        if description:
+            appearance_embedding = await create_embedding(description, hedge=True)
+        if photo_file:
+            image_bytes = await sync_to_async(photo_file.read)()
+            photo_embedding = await create_photo_embedding(image_bytes)
+            if not photo_embedding and not (description or text):
+                return JsonResponse(
+                    {"error": "Failed to create embedding from the provided image"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        search_results = await search_hybrid(
+            qs,
+            request,
+            weights,
+            limit,
+            appearance_embedding=appearance_embedding,
+            photo_embedding=photo_embedding,
+            text=text,
+        )
+        return JsonResponse(search_results, safe=False)
+    except OpenAIUnavailable as e:
+        return openai_unavailable(e)
+    except Exception as e:
+        return JsonResponse(
+            {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@require_GET
+def derivative(request, size, name, fmt):
+    try:
+        path = derivative_cache.get(name, size, fmt)
+        response = FileResponse(
+            open(path, "rb"), content_type=DERIVATIVE_FORMATS[fmt][1]
+        )
+    except (OSError, SuspiciousFileOperation):
+        raise Http404("Image not found")
+    response["Cache-Control"] = cache_control(name)
+    return response
+
+
+@require_GET
+def ready(request):
+    state = readiness()
+    # Informational: reads fall back to the primary without replicas.
+    state["replicas"] = replica_health.status()
+    return JsonResponse(state, status=200 if state["ready"] else 503)
+
+
+def metrics_allowed(request) -> bool:
+    if request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    header = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(
+        header.encode(), f"Bearer {token}".encode()
+    )
+
+
+@require_GET
+def metrics(request):
+    # 404 rather than 403, so the public app does not advertise the endpoint.
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -28,7 +28,7 @@ export const CaptiveCard = ({ captive }: CaptiveCardProps) => {
               </div>
               {captive.picture && (
                 <img
-                  src={captive.picture}
+                  src={captive.picture_derivatives?.thumbnail || captive.picture}
                   alt={captive.name || "Фото"}
                   className="w-12 h-12 sm:w-16 sm:h-16 object-cover rounded-full border-2 border-emerald-600/50 shadow-lg flex-shrink-0"
                 />
@@ -1,7 +1,8 @@
 import base64
 import logging
 from pydantic import BaseModel
-from openai import AsyncOpenAI
+from findme_openai.client import ResilientOpenAI
+from findme_openai.errors import OpenAIUnavailable
 
 logger = logging.getLogger(__name__)
 
@@ -11,21 +12,25 @@ class FaceDescription(BaseModel):
     embedding: list
 
 
-async def create_embedding(text: str, openai_client: AsyncOpenAI) -> list:
-    embedding_response = await openai_client.embeddings.create(
-        input=[text], model="text-embedding-3-small"
-    )
+async def create_embedding(
+    text: str, openai_client: ResilientOpenAI, metrics=None
+) -> list:
+    embedding_response = await openai_client.embeddings([text])
+    if metrics is not None:
+        metrics.record_usage("embedding", embedding_response.usage)
     return embedding_response.data[0].embedding
 
 
 async def analyze_face(
-    image_data: bytes, openai_client: AsyncOpenAI
+    image_data: bytes, openai_client: ResilientOpenAI, metrics=None
 ) -> FaceDescription:
+    # OpenAIUnavailable (rate limits, outages) propagates so the message is
+    # retried on the next run instead of stored with the placeholder.
     try:
         base64_image = base64.b64encode(image_data).decode("utf-8")
         image_url = f"data:image/jpeg;base64,{base64_image}"
 
-        response = await openai_client.chat.completions.create(
+        response = await openai_client.chat(
             model="gpt-4o-mini",
             messages=[
                 {
@@ -52,14 +57,20 @@ async def analyze_face(
             max_tokens=300,
         )
 
+        if metrics is not None:
+            metrics.record_usage("face_description", response.usage)
         appearance_text = response.choices[0].message.content.strip()
-        embedding = await create_embedding(appearance_text, openai_client)
+        embedding = await create_embedding(appearance_text, openai_client, metrics)
 
         logger.info("Face analysis and embedding successful.")
         return FaceDescription(appearance=appearance_text, embedding=embedding)
 
+    except OpenAIUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Face analysis error: {e}")
+        if metrics is not None:
+            metrics.inc("face_analysis_failed")
         return FaceDescription(
             appearance="Не вдалося розпізнати обличчя на зображенні. Спробуйте інше фото.",
             embedding=[],
@@ -1,7 +1,13 @@
+import os
 from pydantic import BaseModel
 from typing import Optional
 from magentic import chatprompt, SystemMessage, UserMessage, AssistantMessage
 
+# magentic reads the same variable; used for the model's rate-limit budget.
+EXTRACT_MODEL = os.getenv("MAGENTIC_OPENAI_MODEL", "gpt-4o")
+# Instructions and few-shot examples sent with every message.
+EXTRACT_PROMPT_TOKENS = 1000
+
 
 class CaptiveInfo(BaseModel):
     name: Optional[str]
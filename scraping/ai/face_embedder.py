@@ -4,14 +4,18 @@ from PIL import Image
 import tempfile
 
 
-def get_face_embedding(image_bytes: bytes) -> list[float] | None:
+def get_faces(image_bytes: bytes) -> list[dict]:
     image = Image.open(io.BytesIO(image_bytes))
     with tempfile.NamedTemporaryFile(suffix=".jpg", delete=True) as temp_file:
         image.save(temp_file.name)
-        embedding_obj = DeepFace.represent(
+        embedding_objs = DeepFace.represent(
             img_path=temp_file.name, model_name="SFace", enforce_detection=False
         )
-    if embedding_obj:
-        return embedding_obj[0]["embedding"]
-    else:
-        return None
+    return [
+        {
+            "embedding": obj["embedding"],
+            "box": obj["facial_area"],
+            "confidence": obj.get("face_confidence"),
+        }
+        for obj in embedding_objs
+    ]
@@ -0,0 +1,42 @@
+import hashlib
+import os
+import tempfile
+
+# Same layout as the backend's ContentAddressedStorage
+# (backend/backend/media_store.py): one file per content, named by its sha256.
+# Reference counts are kept by database triggers when the row is written.
+BLOB_DIR = "blobs"
+# Like the backend's lock_blob: the blob's row stays locked until the
+# caller's transaction ends, so the backend cannot delete the file before
+# the new row referencing it is committed. If the transaction rolls back,
+# gc_media finds the file without a row and removes it.
+LOCK_BLOB_SQL = """
+INSERT INTO backend_mediablob (name, refcount) VALUES (%(name)s, 0)
+ON CONFLICT (name) DO NOTHING;
+SELECT refcount FROM backend_mediablob WHERE name = %(name)s FOR UPDATE;
+"""
+
+
+def blob_name(digest: str, ext: str) -> str:
+    return f"{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{ext.lower()}"
+
+
+def save_blob(cursor, media_root: str, data: bytes, ext: str = ".jpg") -> str:
+    name = blob_name(hashlib.sha256(data).hexdigest(), ext)
+    cursor.execute(LOCK_BLOB_SQL, {"name": name})
+    path = os.path.join(media_root, name)
+    if os.path.exists(path):
+        # A fresh mtime keeps the backend from deleting it meanwhile.
+        os.utime(path)
+        return name
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return name
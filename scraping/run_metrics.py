@@ -0,0 +1,157 @@
+import bisect
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+
+class StageHistogram:
+    def __init__(self, keep_values: bool = True):
+        self.counts = [0] * len(STAGE_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.values = [] if keep_values else None
+
+    def observe(self, seconds: float):
+        i = bisect.bisect_left(STAGE_BUCKETS, seconds)
+        if i < len(self.counts):
+            self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        if self.values is not None:
+            self.values.append(seconds)
+
+    def merge(self, other: "StageHistogram"):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        if not self.values:
+            return 0.0
+        ordered = sorted(self.values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total_seconds": round(self.sum, 4),
+            "mean_seconds": round(self.sum / self.count, 4) if self.count else 0.0,
+            "p50_seconds": round(self.percentile(0.5), 4),
+            "p95_seconds": round(self.percentile(0.95), 4),
+            "max_seconds": round(self.max, 4),
+        }
+
+
+class RunMetrics:
+    def __init__(self, keep_values: bool = True):
+        self.keep_values = keep_values
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at = None
+        self.counters = Counter()
+        self.stages = defaultdict(lambda: StageHistogram(self.keep_values))
+        self.tokens = defaultdict(Counter)
+        self.flood_wait_seconds = 0
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name].observe(time.perf_counter() - start)
+
+    def inc(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+    def record_usage(self, call_type: str, usage):
+        self.tokens[call_type]["calls"] += 1
+        if usage is None:
+            return
+        for field in USAGE_FIELDS:
+            self.tokens[call_type][field] += getattr(usage, field, 0) or 0
+
+    def record_flood_wait(self, seconds: int):
+        self.flood_wait_seconds += seconds
+        self.inc("flood_waits")
+
+    def finish(self):
+        self.finished_at = datetime.now(timezone.utc)
+
+    def merge(self, other: "RunMetrics"):
+        self.counters.update(other.counters)
+        for name, histogram in other.stages.items():
+            self.stages[name].merge(histogram)
+        for call_type, usage in other.tokens.items():
+            self.tokens[call_type].update(usage)
+        self.flood_wait_seconds += other.flood_wait_seconds
+
+    def report(self) -> dict:
+        finished_at = self.finished_at or datetime.now(timezone.utc)
+        duration = (finished_at - self.started_at).total_seconds()
+        inserted = self.counters["inserted"]
+        total_tokens = sum(usage["total_tokens"] for usage in self.tokens.values())
+        return {
+            "started_at": self.started_at.isoformat(),
+            "finished_at": finished_at.isoformat(),
+            "duration_seconds": round(duration, 3),
+            "counters": dict(self.counters),
+            "stages": {name: h.summary() for name, h in self.stages.items()},
+            "openai_tokens": {name: dict(usage) for name, usage in self.tokens.items()},
+            "flood_wait_seconds": self.flood_wait_seconds,
+            "records_per_minute": round(inserted / duration * 60, 3) if duration else 0,
+            "tokens_per_record": (
+                round(total_tokens / inserted, 1) if inserted else None
+            ),
+        }
+
+    def write_report(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        stamp = self.started_at.strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(directory, f"run-{stamp}.json")
+        with open(path, "w") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        return path
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# TYPE scraper_messages_total counter",
+            *(
+                f'scraper_messages_total{{outcome="{name}"}} {value}'
+                for name, value in sorted(self.counters.items())
+            ),
+            "# TYPE scraper_openai_tokens_total counter",
+        ]
+        for call_type, usage in sorted(self.tokens.items()):
+            for field, value in sorted(usage.items()):
+                lines.append(
+                    f'scraper_openai_tokens_total{{call_type="{call_type}",'
+                    f'kind="{field}"}} {value}'
+                )
+        lines += [
+            "# TYPE scraper_flood_wait_seconds_total counter",
+            f"scraper_flood_wait_seconds_total {self.flood_wait_seconds}",
+            "# TYPE scraper_stage_seconds histogram",
+        ]
+        for name, h in sorted(self.stages.items()):
+            cumulative = 0
+            for bound, count in zip(STAGE_BUCKETS, h.counts):
+                cumulative += count
+                lines.append(
+                    f'scraper_stage_seconds_bucket{{stage="{name}",le="{bound}"}} '
+                    f"{cumulative}"
+                )
+            lines.append(
+                f'scraper_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {h.count}'
+            )
+            lines.append(f'scraper_stage_seconds_sum{{stage="{name}"}} {h.sum}')
+            lines.append(f'scraper_stage_seconds_count{{stage="{name}"}} {h.count}')
+        return "\n".join(lines) + "\n"
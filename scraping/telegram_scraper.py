@@ -1,4 +1,5 @@
 import os
+import argparse
 import asyncio
 import logging
 from datetime import datetime
@@ -8,10 +9,14 @@ from telethon.errors import FloodWaitError, ApiIdInvalidError, PhoneNumberInvali
 import psycopg2
 import psycopg2.extras
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
+from aiohttp import web
 from ai.appearance import analyze_face
-from ai.extractor import extract_person_info
-from ai.face_embedder import get_face_embedding
+from ai.extractor import EXTRACT_MODEL, EXTRACT_PROMPT_TOKENS, extract_person_info
+from findme_openai.client import ResilientOpenAI, estimate_tokens
+from findme_openai.errors import OpenAIUnavailable
+from ai.face_embedder import get_faces
+from run_metrics import RunMetrics
+from media_store import save_blob
 import json
 
 load_dotenv()
@@ -28,6 +33,7 @@ API_HASH = os.getenv("API_HASH")
 PHONE = os.getenv("PHONE")
 CHANNEL_USERNAME = os.getenv("CHANNEL_USERNAME")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
 
 DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
@@ -35,15 +41,23 @@ DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 
+REPORTS_DIR = os.getenv("REPORTS_DIR", "reports")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+SCRAPE_INTERVAL = int(os.getenv("SCRAPE_INTERVAL", "3600"))
+
 
 class TelegramScraper:
     def __init__(self):
         self.client = TelegramClient("sessions/find_me.session", API_ID, API_HASH)
         self.conn = None
         self.cursor = None
-        self.media_path = "../data/media/captives/"
-        self.openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
-        os.makedirs(self.media_path, exist_ok=True)
+        self.media_root = "../data/media/"
+        self.openai_client = ResilientOpenAI(
+            api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL
+        )
+        self.metrics = RunMetrics()
+        os.makedirs(self.media_root, exist_ok=True)
 
     def connect_to_db(self):
         try:
@@ -60,63 +74,137 @@ class TelegramScraper:
             logger.error(f"Error connecting to the database: {e}")
             raise
 
-    async def save_photo(self, photo_data, captive_id):
-        captive_dir = os.path.join(self.media_path, str(captive_id))
-        os.makedirs(captive_dir, exist_ok=True)
-
-        photo_name = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-        photo_path = os.path.join(captive_dir, photo_name)
-        print(f"Saving photo to {photo_path}")
-        with open(photo_path, "wb") as f:
-            f.write(photo_data)
-
-        return f"captives/{captive_id}/{photo_name}"
+    async def save_photo(self, photo_data):
+        # Content-addressed, so the path does not depend on the new row's id
+        # and reposted photos are stored once. Runs in the message's
+        # transaction, which holds the blob's lock until the row is inserted.
+        photo_path = await asyncio.to_thread(
+            save_blob, self.cursor, self.media_root, photo_data
+        )
+        print(f"Saved photo to {photo_path}")
+        return photo_path
+
+    def save_faces(self, captive_id, faces):
+        psycopg2.extras.execute_values(
+            self.cursor,
+            """
+            INSERT INTO backend_captiveface
+            (captive_id, face_index, embedding, x, y, width, height, confidence)
+            VALUES %s
+            """,
+            [
+                (
+                    captive_id,
+                    i,
+                    json.dumps(face["embedding"]),
+                    face["box"]["x"],
+                    face["box"]["y"],
+                    face["box"]["w"],
+                    face["box"]["h"],
+                    face["confidence"],
+                )
+                for i, face in enumerate(faces)
+            ],
+        )
 
     async def process_message(self, message, telegram_user_id):
+        metrics = self.metrics
+        metrics.inc("messages_seen")
         try:
             if not message.message:
                 logger.info("Skipping message with no text content.")
+                metrics.inc("skipped_empty")
                 return
 
-            extracted_info = await extract_person_info(message.message)
+            with metrics.stage("extract"):
+                # magentic owns its client; the call still shares the budget.
+                extracted_info = await self.openai_client.call(
+                    EXTRACT_MODEL,
+                    lambda client: extract_person_info(message.message),
+                    estimate_tokens(message.message) + EXTRACT_PROMPT_TOKENS,
+                )
+            metrics.record_usage("extract", None)
 
             if not extracted_info.name:
                 logger.info("Skipping message - no name found.")
+                metrics.inc("skipped_irrelevant")
                 return
 
             if extracted_info == "NO_RELEVANT_INFORMATION":
                 logger.info("Skipping message - no relevant information found.")
+                metrics.inc("skipped_irrelevant")
                 return
 
-            self.cursor.execute(
-                "SELECT * FROM backend_captive WHERE name = %s", (extracted_info.name,)
-            )
-            existing_record = self.cursor.fetchone()
+            with metrics.stage("duplicate_check"):
+                self.cursor.execute(
+                    "SELECT * FROM backend_captive WHERE name = %s",
+                    (extracted_info.name,),
+                )
+                existing_record = self.cursor.fetchone()
             print(extracted_info)
             if existing_record:
                 logger.info(
                     f"Record already exists for {extracted_info.name} Skipping."
                 )
+                metrics.inc("skipped_duplicate")
                 return
 
             photo_path = None
             if message.media:
-                photo_data = await self.client.download_media(message.media, bytes)
+                with metrics.stage("download_media"):
+                    photo_data = await self.client.download_media(message.media, bytes)
                 if photo_data:
-                    result = await analyze_face(photo_data, self.openai_client)
+                    with metrics.stage("analyze_face"):
+                        result = await analyze_face(
+                            photo_data, self.openai_client, metrics
+                        )
                     appearance = result.appearance
                     appearance_embedded = json.dumps(result.embedding)
 
                     # Get face embedding using face_recognition
-                    picture_embedding = get_face_embedding(photo_data)
+                    with metrics.stage("face_embedding"):
+                        faces = get_faces(photo_data)
                     picture_embedded = (
-                        json.dumps(picture_embedding) if picture_embedding else None
+                        json.dumps(faces[0]["embedding"]) if faces else None
                     )
+                    photo_path = await self.save_photo(photo_data)
+                    with metrics.stage("db_write"):
+                        self.cursor.execute(
+                            """
+                            INSERT INTO backend_captive 
+                            (name, person_type, brigade, settlement, status, circumstances, appearance, appearance_embedded, picture_embedded, picture, last_update, user_id)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING id
+                            """,
+                            (
+                                extracted_info.name,
+                                extracted_info.person_type,
+                                extracted_info.brigade,
+                                extracted_info.settlement,
+                                extracted_info.status,
+                                extracted_info.circumstances,
+                                appearance,
+                                appearance_embedded,
+                                picture_embedded,
+                                photo_path,
+                                datetime.now(),
+                                telegram_user_id,
+                            ),
+                        )
+                        new_id = self.cursor.fetchone()[0]
+                        self.save_faces(new_id, faces)
+                        self.conn.commit()
+
+                    logger.info(
+                        f"Created new captive record: {extracted_info.name} with photo"
+                    )
+                    metrics.inc("inserted")
+            else:
+                with metrics.stage("db_write"):
                     self.cursor.execute(
                         """
                         INSERT INTO backend_captive 
-                        (name, person_type, brigade, settlement, status, circumstances, appearance, appearance_embedded, picture_embedded, last_update, user_id)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING id
+                        (name, person_type, brigade, settlement, status, circumstances, last_update, user_id) 
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
                         """,
                         (
                             extracted_info.name,
@@ -125,49 +213,26 @@ class TelegramScraper:
                             extracted_info.settlement,
                             extracted_info.status,
                             extracted_info.circumstances,
-                            appearance,
-                            appearance_embedded,
-                            picture_embedded,
                             datetime.now(),
                             telegram_user_id,
                         ),
                     )
-                    new_id = self.cursor.fetchone()[0]
-                    self.conn.commit()
-
-                    photo_path = await self.save_photo(photo_data, new_id)
-                    self.cursor.execute(
-                        "UPDATE backend_captive SET picture = %s WHERE id = %s",
-                        (photo_path, new_id),
-                    )
                     self.conn.commit()
-
-                    logger.info(
-                        f"Created new captive record: {extracted_info.name} with photo"
-                    )
-            else:
-                self.cursor.execute(
-                    """
-                    INSERT INTO backend_captive 
-                    (name, person_type, brigade, settlement, status, circumstances, last_update, user_id) 
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    """,
-                    (
-                        extracted_info.name,
-                        extracted_info.person_type,
-                        extracted_info.brigade,
-                        extracted_info.settlement,
-                        extracted_info.status,
-                        extracted_info.circumstances,
-                        datetime.now(),
-                        telegram_user_id,
-                    ),
-                )
-                self.conn.commit()
                 logger.info(f"Created new record without photo: {extracted_info.name}")
+                metrics.inc("inserted")
 
+        except OpenAIUnavailable as e:
+            # Nothing was inserted, so the next run picks the message up again.
+            logger.warning(f"OpenAI unavailable, message left for next run: {e}")
+            metrics.inc("openai_unavailable")
+            self.conn.rollback()
+        except FloodWaitError:
+            # Telegram rate limit, which scrape_channel waits out.
+            self.conn.rollback()
+            raise
         except Exception as e:
             logger.error(f"Error processing message: {str(e)}")
+            metrics.inc("failed")
             self.conn.rollback()
 
     async def scrape_channel(self):
@@ -198,12 +263,21 @@ class TelegramScraper:
                 reverse=True,
                 limit=5,
             ):
-                try:
-                    await self.process_message(message, telegram_user_id)
-                except FloodWaitError as e:
-                    logger.warning(f"Hit rate limit. Waiting {e.seconds} seconds")
-                    await asyncio.sleep(e.seconds)
-
+                # The message that hit the rate limit is processed again
+                # once the wait is over.
+                while True:
+                    try:
+                        await self.process_message(message, telegram_user_id)
+                        break
+                    except FloodWaitError as e:
+                        logger.warning(f"Hit rate limit. Waiting {e.seconds} seconds")
+                        self.metrics.record_flood_wait(e.seconds)
+                        await asyncio.sleep(e.seconds)
+
+        except FloodWaitError as e:
+            # Raised by iter_messages itself: this run stops, the next rescans.
+            logger.warning(f"Hit rate limit listing messages ({e.seconds} seconds)")
+            self.metrics.record_flood_wait(e.seconds)
         except ApiIdInvalidError:
             logger.error("Invalid API ID or API Hash")
         except PhoneNumberInvalidError:
@@ -217,9 +291,49 @@ class TelegramScraper:
                 self.cursor.close()
                 self.conn.close()
                 logger.info("Database connection closed")
+            self.metrics.finish()
+            report_path = self.metrics.write_report(REPORTS_DIR)
+            logger.info(f"Run report written to {report_path}")
+
+
+async def start_metrics_server(metrics: RunMetrics) -> web.AppRunner:
+    async def handle_metrics(request):
+        return web.Response(text=metrics.render_prometheus(), content_type="text/plain")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, METRICS_HOST, METRICS_PORT).start()
+    logger.info(f"Serving metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    return runner
+
+
+async def run_daemon():
+    totals = RunMetrics(keep_values=False)
+    runner = await start_metrics_server(totals)
+    try:
+        while True:
+            scraper = TelegramScraper()
+            await scraper.scrape_channel()
+            totals.merge(scraper.metrics)
+            await asyncio.sleep(SCRAPE_INTERVAL)
+    finally:
+        await runner.cleanup()
 
 
 async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Scrape every SCRAPE_INTERVAL seconds and serve /metrics",
+    )
+    args = parser.parse_args()
+    if args.daemon:
+        await run_daemon()
+        return
+
     scraper = TelegramScraper()
     await scraper.scrape_channel()
 
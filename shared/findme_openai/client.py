@@ -0,0 +1,319 @@
+import asyncio
+import email.utils
+import random
+import threading
+import time
+import weakref
+import openai
+from openai import AsyncOpenAI
+from .errors import OpenAIUnavailable
+
+# Used by both the backend and the scraper, so no framework imports.
+
+# (requests, tokens) per minute for each model, matching the account tier.
+DEFAULT_LIMITS = {
+    "text-embedding-3-small": (3000, 1_000_000),
+    "gpt-4o-mini": (500, 200_000),
+    "gpt-4o": (500, 30_000),
+}
+FALLBACK_LIMITS = (500, 200_000)
+EMBEDDING_MODEL = "text-embedding-3-small"
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+OVERLOAD_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+POLL_INTERVAL = 0.02
+# A burst of failures from requests already in flight counts as one overload.
+DECREASE_INTERVAL = 1.0
+IMAGE_TOKENS = 1000
+
+
+def estimate_tokens(text: str) -> int:
+    # Cyrillic averages about two characters per token.
+    return len(text) // 2 + 1
+
+
+def message_tokens(messages: list[dict]) -> int:
+    tokens = 0
+    for message in messages:
+        content = message.get("content")
+        parts = content if isinstance(content, list) else [content]
+        for part in parts:
+            if isinstance(part, str):
+                tokens += estimate_tokens(part)
+            elif isinstance(part, dict) and part.get("type") == "text":
+                tokens += estimate_tokens(part["text"])
+            elif part is not None:
+                tokens += IMAGE_TOKENS
+    return tokens
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None  # Malformed; back off as if there were no header.
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        self.refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= amount
+
+    def drain(self, seconds: float):
+        # Nobody sends for `seconds`, e.g. after a 429.
+        self.refill()
+        self.level = min(self.level, -seconds * self.rate)
+
+
+class ModelBudget:
+    # Thread-safe and loop-agnostic: callers poll instead of sharing asyncio
+    # primitives, since Django runs coroutines on several event loops.
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.lock = threading.Lock()
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    async def acquire(self, tokens: int, deadline: float):
+        while True:
+            with self.lock:
+                wait = max(self.requests.delay(1), self.tokens.delay(tokens))
+                if wait <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    return
+            if time.monotonic() + wait > deadline:
+                raise OpenAIUnavailable(f"Rate limited for {wait:.1f}s", wait)
+            await asyncio.sleep(wait)
+
+    def settle(self, estimated: int, used: int):
+        with self.lock:
+            self.tokens.take(used - estimated)
+
+    def pause(self, seconds: float):
+        with self.lock:
+            self.requests.drain(seconds)
+            self.tokens.drain(seconds)
+
+
+class AdaptiveLimiter:
+    # AIMD: each success raises the limit by 1/limit, an overload halves it.
+    def __init__(self, initial: int = 8, minimum: int = 1, maximum: int = 64):
+        self.lock = threading.Lock()
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.decreased = 0.0
+
+    async def acquire(self):
+        while True:
+            with self.lock:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+            await asyncio.sleep(POLL_INTERVAL)
+
+    def release(self, overloaded: bool | None):
+        # overloaded is None for cancelled calls, which say nothing either way.
+        with self.lock:
+            self.in_flight -= 1
+            if overloaded:
+                now = time.monotonic()
+                if now - self.decreased >= DECREASE_INTERVAL:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self.decreased = now
+            elif overloaded is not None:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+
+class ResilientOpenAI:
+    def __init__(
+        self,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        limits: dict | None = None,
+        timeout: float = 30.0,
+        max_attempts: int = 4,
+        backoff: float = 0.5,
+        max_backoff: float = 20.0,
+        retry_budget: float = 60.0,
+        concurrency: int = 8,
+        max_concurrency: int = 64,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_budget = retry_budget
+        self.limiter = AdaptiveLimiter(concurrency, 1, max_concurrency)
+        self.budgets = {}
+        self.budgets_lock = threading.Lock()
+        # httpx connection pools belong to the loop that opened them.
+        self.clients = weakref.WeakKeyDictionary()
+
+    def client(self) -> AsyncOpenAI:
+        loop = asyncio.get_running_loop()
+        client = self.clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=0,
+            )
+            self.clients[loop] = client
+        return client
+
+    def budget(self, model: str) -> ModelBudget:
+        with self.budgets_lock:
+            if model not in self.budgets:
+                self.budgets[model] = ModelBudget(
+                    *self.limits.get(model, FALLBACK_LIMITS)
+                )
+            return self.budgets[model]
+
+    async def call(
+        self, model: str, request, tokens: int, hedge_after=None, retry_budget=None
+    ):
+        # request(client) returns a coroutine for one attempt. Retryable
+        # errors back off with full jitter, or for Retry-After when given.
+        # A call waits (for the model budget or between attempts) at most
+        # retry_budget seconds in total; a longer wait raises
+        # OpenAIUnavailable at once instead of holding the caller.
+        budget = self.budget(model)
+        if retry_budget is None:
+            retry_budget = self.retry_budget
+        deadline = time.monotonic() + retry_budget
+        error = retry_after = None
+        for attempt in range(self.max_attempts):
+            try:
+                if hedge_after is not None:
+                    return await self.hedged(
+                        budget, request, tokens, hedge_after, deadline
+                    )
+                return await self.attempt(budget, request, tokens, deadline)
+            except RETRYABLE_ERRORS as e:
+                error = e
+            retry_after = retry_after_seconds(error)
+            if isinstance(error, openai.RateLimitError):
+                budget.pause(retry_after or self.backoff)
+            if attempt + 1 == self.max_attempts:
+                break
+            cap = min(self.max_backoff, self.backoff * 2**attempt)
+            delay = retry_after or random.uniform(0, cap)
+            if time.monotonic() + delay > deadline:
+                break
+            await asyncio.sleep(delay)
+        raise OpenAIUnavailable(
+            f"OpenAI {model} unavailable: {error}", retry_after
+        ) from error
+
+    async def attempt(self, budget: ModelBudget, request, tokens: int, deadline):
+        await budget.acquire(tokens, deadline)
+        await self.limiter.acquire()
+        overloaded = None
+        try:
+            response = await request(self.client())
+            overloaded = False
+        except OVERLOAD_ERRORS:
+            overloaded = True
+            raise
+        except Exception:
+            overloaded = False
+            raise
+        finally:
+            self.limiter.release(overloaded)
+        usage = getattr(response, "usage", None)
+        if usage is not None and getattr(usage, "total_tokens", None):
+            budget.settle(tokens, usage.total_tokens)
+        return response
+
+    async def hedged(
+        self, budget: ModelBudget, request, tokens: int, delay: float, deadline
+    ):
+        # A second identical request starts if the first is slower than
+        # `delay`; the first to succeed wins and the other is cancelled.
+        def start():
+            return asyncio.ensure_future(
+                self.attempt(budget, request, tokens, deadline)
+            )
+
+        tasks = {start()}
+        error = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                tasks.add(start())
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def embeddings(
+        self,
+        texts: list[str],
+        model: str = EMBEDDING_MODEL,
+        hedge_after=None,
+        retry_budget=None,
+    ):
+        return await self.call(
+            model,
+            lambda client: client.embeddings.create(input=texts, model=model),
+            sum(estimate_tokens(text) for text in texts),
+            hedge_after,
+            retry_budget,
+        )
+
+    async def chat(self, model: str, messages: list[dict], max_tokens: int, **kwargs):
+        return await self.call(
+            model,
+            lambda client: client.chat.completions.create(
+                model=model, messages=messages, max_tokens=max_tokens, **kwargs
+            ),
+            message_tokens(messages) + max_tokens,
+        )
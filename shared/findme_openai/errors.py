@@ -0,0 +1,9 @@
+# Kept apart from findme_openai.client so handlers can catch it without
+# importing the openai package.
+
+
+class OpenAIUnavailable(Exception):
+    # Raised once retries are exhausted; retry_after is a hint in seconds.
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after